@@ -0,0 +1,90 @@
+"""
+Session Memory Benchmark
+========================
+
+Measures the heap cost per session of the legacy nested-dict representation
+versus the slotted ``Session``/``ChatTurn`` model, using tracemalloc.
+
+Usage:
+    python bench_sessions.py
+    python bench_sessions.py --sizes 10000,100000 --turns 6
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from session_model import Session
+
+def build_legacy(n: int, turns: int) -> list:
+    sessions = []
+    for i in range(n):
+        now = datetime.now()
+        history = []
+        for t in range(turns):
+            role = "user" if t % 2 == 0 else "assistant"
+            history.append({"role": role, "content": f"message {t} for session {i}", "timestamp": datetime.now()})
+        sessions.append({
+            "chat_history": history,
+            "stage": "initial",
+            "created_at": now,
+            "last_active": now,
+            "message_count": turns // 2,
+            "user_preferences": {},
+            "collected_info": {},
+            "conversation_context": {
+                "current_agent": None,
+                "primary_product": None,
+                "has_greeted": False,
+                "information_collected": False,
+                "last_intent": None,
+                "error_count": 0
+            }
+        })
+    return sessions
+
+def build_slotted(n: int, turns: int) -> list:
+    sessions = []
+    for i in range(n):
+        session = Session()
+        now = int(time.time())
+        for t in range(turns):
+            role = "user" if t % 2 == 0 else "assistant"
+            session.add_turn(role, f"message {t} for session {i}", now)
+        session.message_count = turns // 2
+        sessions.append(session)
+    return sessions
+
+def measure(builder, n: int, turns: int) -> float:
+    """Return allocated bytes per session retained after building ``n`` sessions."""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    sessions = builder(n, turns)
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del sessions
+    gc.collect()
+    return (current - baseline) / n
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-session memory of legacy dicts vs slotted sessions.")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated session counts")
+    parser.add_argument("--turns", type=int, default=6, help="Chat messages per session")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    print(f"{'sessions':>10} {'legacy B/session':>18} {'slotted B/session':>18} {'saving':>8}")
+    for n in sizes:
+        legacy = measure(build_legacy, n, args.turns)
+        slotted = measure(build_slotted, n, args.turns)
+        saving = (1 - slotted / legacy) * 100 if legacy else 0.0
+        print(f"{n:>10} {legacy:>18.0f} {slotted:>18.0f} {saving:>7.1f}%")
+
+if __name__ == "__main__":
+    main()
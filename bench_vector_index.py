@@ -0,0 +1,253 @@
+"""
+Vector Index Benchmark
+======================
+
+Compares vector index profiles (see vector_index_profiles.py) on a copy of
+the knowledge base. For each profile the live objects and their vectors are
+copied into a scratch collection, the held-out queries are run the way
+rag_agent.py runs them (both named vectors, average join, product filter),
+and the results are scored against an exact brute-force search over the same
+vectors:
+
+    recall@k       overlap with the exact top k
+    p50/p95 ms     query latency
+    est. MB        approximate in-memory index size for both named vectors
+
+The cheapest profile whose mean recall reaches --min-recall is recommended.
+
+The query set is JSONL, one held-out query per line (questions not used to
+build the index):
+
+    {"query": "Am I covered if my flight is delayed?", "product": "Travel"}
+
+Usage:
+    python bench_vector_index.py --queries Admin/benchmarks/kb_queries.jsonl
+    python bench_vector_index.py --queries q.jsonl --profiles hnsw,hnsw_sq,flat_bq --k 5 --ef 64
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import numpy as np
+from dotenv import load_dotenv
+
+# Add the project root to the Python path before other imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from weaviate.classes.config import Property, DataType
+from weaviate.classes.query import Filter, TargetVectors
+from utils.llm_services import embedding_model
+from utils.weaviate_client import get_weaviate_client
+from utils.vector_index_profiles import (
+    INDEX_PROFILES, VECTOR_NAMES, QUANTIZER_TRAINING_LIMIT, named_vector_configs, estimate_index_bytes,
+)
+from app.config import KB_COLLECTION_NAME
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARK_OUTPUT_PATH = os.path.join(PROJECT_ROOT, "Admin", "benchmarks")
+
+def load_queries(path):
+    """Read the held-out query set."""
+    queries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                queries.append({"query": entry["query"], "product": entry.get("product")})
+    if not queries:
+        raise ValueError(f"No queries found in {path}")
+    return queries
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+def load_corpus(client, collection_name):
+    """Fetch every object's uuid, product and named vectors from the live collection."""
+    ids, products, vectors = [], [], {name: [] for name in VECTOR_NAMES}
+    collection = client.collections.get(collection_name)
+    for obj in collection.iterator(include_vector=True, return_properties=["product_name"]):
+        if not all(obj.vector.get(name) for name in VECTOR_NAMES):
+            continue  # The average join only scores objects that have both vectors
+        ids.append(str(obj.uuid))
+        products.append(obj.properties.get("product_name"))
+        for name in VECTOR_NAMES:
+            vectors[name].append(obj.vector[name])
+    logger.info(f"Loaded {len(ids)} objects with both named vectors from {collection_name}")
+    return ids, np.array(products, dtype=object), {name: np.asarray(v, dtype=np.float32) for name, v in vectors.items()}
+
+def embed_queries(queries, batch_size=64):
+    texts = [q["query"] for q in queries]
+    vectors = []
+    for start in range(0, len(texts), batch_size):
+        vectors.extend(embedding_model.embed_documents(texts[start:start + batch_size]))
+    return np.asarray(vectors, dtype=np.float32)
+
+def exact_top_k(query_vectors, queries, ids, products, vectors, k):
+    """Ground truth: brute-force average cosine distance over both named vectors."""
+    normalized = {name: _normalize(matrix) for name, matrix in vectors.items()}
+    query_normalized = _normalize(query_vectors)
+    truth = []
+    for query, query_vector in zip(queries, query_normalized):
+        distance = sum(1 - normalized[name] @ query_vector for name in VECTOR_NAMES) / len(VECTOR_NAMES)
+        if query["product"]:
+            distance = np.where(products == query["product"], distance, np.inf)
+        order = np.argsort(distance)[:k]
+        truth.append({ids[i] for i in order if np.isfinite(distance[i])})
+    return truth
+
+def build_profile_collection(client, name, profile, ids, products, vectors, batch_size, index_tuning):
+    """Create a scratch collection with the profile and copy the corpus into it."""
+    if client.collections.exists(name):
+        client.collections.delete(name)
+    # Same training limit as production, so the benchmark measures the index that would be built
+    if INDEX_PROFILES[profile]["quantizer"] in ("pq", "sq") and len(ids) < QUANTIZER_TRAINING_LIMIT:
+        logger.warning(f"Profile '{profile}' stays uncompressed: {len(ids)} objects is below "
+                       f"QUANTIZER_TRAINING_LIMIT={QUANTIZER_TRAINING_LIMIT}")
+    client.collections.create(
+        name=name,
+        vector_config=named_vector_configs(profile, **index_tuning),
+        properties=[Property(name="product_name", data_type=DataType.TEXT)],
+    )
+    collection = client.collections.get(name)
+    started = time.monotonic()
+    with collection.batch.fixed_size(batch_size=batch_size) as batch:
+        for i, obj_id in enumerate(ids):
+            batch.add_object(
+                properties={"product_name": products[i]},
+                uuid=obj_id,
+                vector={vector_name: vectors[vector_name][i].tolist() for vector_name in VECTOR_NAMES},
+            )
+    if collection.batch.failed_objects:
+        raise RuntimeError(f"Failed to copy {len(collection.batch.failed_objects)} objects into {name}")
+    return collection, time.monotonic() - started
+
+def run_queries(collection, queries, query_vectors, k, warmup):
+    """Run every query; returns (retrieved id sets, latencies in ms)."""
+    def search(query, query_vector):
+        vector = query_vector.tolist()
+        return collection.query.near_vector(
+            near_vector={name: vector for name in VECTOR_NAMES},
+            target_vector=TargetVectors.average(list(VECTOR_NAMES)),
+            limit=k,
+            filters=Filter.by_property("product_name").equal(query["product"]) if query["product"] else None,
+            return_properties=[],
+        )
+
+    for query, query_vector in list(zip(queries, query_vectors))[:warmup]:
+        search(query, query_vector)
+
+    retrieved, latencies = [], []
+    for query, query_vector in zip(queries, query_vectors):
+        started = time.perf_counter()
+        response = search(query, query_vector)
+        latencies.append((time.perf_counter() - started) * 1000)
+        retrieved.append({str(obj.uuid) for obj in response.objects})
+    return retrieved, latencies
+
+def score(truth, retrieved):
+    recalls = [len(t & r) / len(t) for t, r in zip(truth, retrieved) if t]
+    return float(np.mean(recalls)) if recalls else 0.0, float(np.min(recalls)) if recalls else 0.0
+
+def print_report(results, k, min_recall):
+    print(f"\n{'profile':<10} {'recall@' + str(k):>10} {'min':>6} {'p50 ms':>8} {'p95 ms':>8} {'est. MB':>9} {'load s':>7}")
+    for r in results:
+        print(f"{r['profile']:<10} {r['recall']:>10.3f} {r['min_recall']:>6.2f} {r['p50_ms']:>8.1f} "
+              f"{r['p95_ms']:>8.1f} {r['estimated_mb']:>9.1f} {r['load_seconds']:>7.1f}")
+    eligible = [r for r in results if r["recall"] >= min_recall]
+    if eligible:
+        best = min(eligible, key=lambda r: (r["estimated_mb"], r["p95_ms"]))
+        print(f"\nCheapest profile with recall@{k} >= {min_recall}: {best['profile']}")
+    else:
+        print(f"\nNo profile reached recall@{k} >= {min_recall}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector index profiles for recall and latency.")
+    parser.add_argument("--queries", required=True, help="JSONL file of held-out queries ({\"query\", \"product\"}).")
+    parser.add_argument("--profiles", default=",".join(INDEX_PROFILES), help="Comma-separated profiles to compare.")
+    parser.add_argument("--collection", default=KB_COLLECTION_NAME, help="Collection (or alias) to copy the corpus from.")
+    parser.add_argument("--k", type=int, default=5, help="Results per query (rag_agent.py uses 5).")
+    parser.add_argument("--min-recall", type=float, default=0.95, help="Recall a profile must reach to be recommended.")
+    parser.add_argument("--ef", type=int, help="HNSW query-time ef.")
+    parser.add_argument("--ef-construction", type=int, help="HNSW build-time ef.")
+    parser.add_argument("--max-connections", type=int, help="HNSW max connections per node.")
+    parser.add_argument("--batch-size", type=int, default=200, help="Objects per batch when copying the corpus.")
+    parser.add_argument("--warmup", type=int, default=5, help="Untimed queries run before measuring each profile.")
+    parser.add_argument("--settle-seconds", type=float, default=5.0, help="Wait after loading so background indexing and quantization finish.")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch collections after the run.")
+    args = parser.parse_args()
+
+    profiles = [p.strip() for p in args.profiles.split(",") if p.strip()]
+    unknown = [p for p in profiles if p not in INDEX_PROFILES]
+    if unknown:
+        parser.error(f"Unknown profiles: {', '.join(unknown)}. Choose from: {', '.join(INDEX_PROFILES)}")
+    index_tuning = {"ef": args.ef, "ef_construction": args.ef_construction, "max_connections": args.max_connections}
+
+    queries = load_queries(args.queries)
+    client = get_weaviate_client()
+    results = []
+    try:
+        ids, products, vectors = load_corpus(client, args.collection)
+        if not ids:
+            logger.error(f"No objects with vectors found in {args.collection}")
+            return
+        dimensions = vectors[VECTOR_NAMES[0]].shape[1]
+
+        logger.info(f"Embedding {len(queries)} held-out queries")
+        query_vectors = embed_queries(queries)
+        truth = exact_top_k(query_vectors, queries, ids, products, vectors, args.k)
+
+        for profile in profiles:
+            name = f"{args.collection}_bench_{profile}"
+            logger.info(f"Benchmarking profile '{profile}' in {name}")
+            try:
+                collection, load_seconds = build_profile_collection(
+                    client, name, profile, ids, products, vectors, args.batch_size, index_tuning)
+                time.sleep(args.settle_seconds)
+                retrieved, latencies = run_queries(collection, queries, query_vectors, args.k, args.warmup)
+                recall, worst = score(truth, retrieved)
+                results.append({
+                    "profile": profile,
+                    "recall": recall,
+                    "min_recall": worst,
+                    "p50_ms": float(np.percentile(latencies, 50)),
+                    "p95_ms": float(np.percentile(latencies, 95)),
+                    "estimated_mb": len(VECTOR_NAMES) * estimate_index_bytes(
+                        profile, dimensions, len(ids), max_connections=args.max_connections) / 1024 ** 2,
+                    "load_seconds": load_seconds,
+                })
+                logger.info(f"Profile '{profile}': recall@{args.k} {recall:.3f}, p95 {results[-1]['p95_ms']:.1f} ms")
+            finally:
+                if not args.keep and client.collections.exists(name):
+                    client.collections.delete(name)
+    finally:
+        client.close()
+
+    if not results:
+        return
+    print_report(results, args.k, args.min_recall)
+
+    os.makedirs(BENCHMARK_OUTPUT_PATH, exist_ok=True)
+    report_path = os.path.join(BENCHMARK_OUTPUT_PATH, f"vector_index_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "collection": args.collection,
+            "objects": len(ids),
+            "dimensions": dimensions,
+            "queries": len(queries),
+            "k": args.k,
+            "index_tuning": index_tuning,
+            "results": results,
+        }, f, indent=2)
+    logger.info(f"Benchmark report saved to: {report_path}")
+
+if __name__ == "__main__":
+    main()
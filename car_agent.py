@@ -6,7 +6,6 @@ from dotenv import load_dotenv
 from pydantic import BaseModel, Field, validator
 from typing import List, Type, Optional
 
-from app.config import llm
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.tools import tool
 from langchain.tools import Tool
@@ -18,7 +17,8 @@ from app.session_manager import set_collected_info, get_collected_info
 logger = logging.getLogger(__name__)
 
 from app.session_manager import get_session, update_session
-from utils.llm_services import llm
+from utils.llm_services import get_structured_chain
+from utils.history_renderer import render_history
 from langchain_core.messages import HumanMessage, SystemMessage
 from pydantic import BaseModel, Field
 import json
@@ -41,7 +41,7 @@ def run_car_agent(user_message: str, chat_history: list, session_id: str):
 
     required_info = ["car_model", "year_of_registration", "usage_type", "plan_type", "policy_start_date"]
 
-    chain = llm.with_structured_output(CarInfo, method="function_calling")
+    chain = get_structured_chain(CarInfo)
     today = datetime.now().strftime("%Y-%m-%d")
 
     prompt = [
@@ -59,7 +59,8 @@ Rules:
 - Normalize usage_type to "private" or "commercial".
 - Always acknowledge what they gave and ask the next missing item.
 Current collected: {collected_info}
-Conversation history: {chat_history}
+Conversation history:
+{render_history(chat_history, summary=session.get("conversation_summary"))}
 """),
         HumanMessage(content=user_message),
     ]
@@ -9,4 +9,65 @@ load_dotenv()
 # Chat History
 MAX_CONTEXT_MESSAGES = 10
 
+# Session storage ("memory" or "redis")
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# In-process LRU read tier in front of Redis; a compare-and-set conflict drops the entry
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+SESSION_CACHE_TTL_SECONDS = float(os.getenv("SESSION_CACHE_TTL_SECONDS", "5"))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(24 * 3600)))
+SESSION_EXPIRY_INTERVAL_SECONDS = float(os.getenv("SESSION_EXPIRY_INTERVAL_SECONDS", "60"))
+
+# WhatsApp dispatch
+WHATSAPP_WORKER_COUNT = int(os.getenv("WHATSAPP_WORKER_COUNT", "16"))
+WHATSAPP_QUEUE_MAXSIZE = int(os.getenv("WHATSAPP_QUEUE_MAXSIZE", "1000"))
+WHATSAPP_DRAIN_TIMEOUT_SECONDS = float(os.getenv("WHATSAPP_DRAIN_TIMEOUT_SECONDS", "30"))
+
+# Knowledge base collection read by the RAG and recommendation agents. After a
+# blue/green reindex (migrate_schema.py --blue-green) this is an alias onto the
+# live Insurance_Knowledge_Base_vN collection.
+KB_COLLECTION_NAME = os.getenv("KB_COLLECTION_NAME", "Insurance_Knowledge_Base")
+
+# Semantic cache for RAG answers
+RAG_CACHE_ENABLED = os.getenv("RAG_CACHE_ENABLED", "true").lower() == "true"
+RAG_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("RAG_CACHE_SIMILARITY_THRESHOLD", "0.95"))
+RAG_CACHE_TTL_SECONDS = float(os.getenv("RAG_CACHE_TTL_SECONDS", str(6 * 3600)))
+RAG_CACHE_MAX_ENTRIES = int(os.getenv("RAG_CACHE_MAX_ENTRIES", "500"))
+
+# Rule-based intent fast path ahead of the LLM classifier
+INTENT_FAST_PATH_ENABLED = os.getenv("INTENT_FAST_PATH_ENABLED", "true").lower() == "true"
+INTENT_FAST_PATH_MIN_CONFIDENCE = float(os.getenv("INTENT_FAST_PATH_MIN_CONFIDENCE", "0.9"))
+
+# Local nearest-prototype intent router (between the fast path and the LLM)
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() == "true"
+INTENT_ROUTER_MODEL_PATH = os.getenv(
+    "INTENT_ROUTER_MODEL_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Admin", "intent_router.npz"),
+)
+INTENT_ROUTER_MIN_SIMILARITY = float(os.getenv("INTENT_ROUTER_MIN_SIMILARITY", "0.8"))
+INTENT_ROUTER_MIN_MARGIN = float(os.getenv("INTENT_ROUTER_MIN_MARGIN", "0.15"))
+# Confidence reported for routed intents; the router's cosine similarity is not a probability
+INTENT_ROUTER_CONFIDENCE = float(os.getenv("INTENT_ROUTER_CONFIDENCE", "0.8"))
+
+# Single LLM call for flow decision, intent and confusion on turns with history
+TURN_ANALYSIS_MERGED = os.getenv("TURN_ANALYSIS_MERGED", "true").lower() == "true"
+
+# Start the likely continuation agent while routing is still being decided
+# (trades extra tokens on topic switches for lower latency on continuations)
+SPECULATIVE_ROUTING = os.getenv("SPECULATIVE_ROUTING", "false").lower() == "true"
+
+# Chat history rendered into prompts (see utils/history_renderer)
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "800"))
+HISTORY_MAX_MESSAGE_TOKENS = int(os.getenv("HISTORY_MAX_MESSAGE_TOKENS", "250"))
+# Keep a rolling summary of turns trimmed from the session history
+HISTORY_ROLLING_SUMMARY = os.getenv("HISTORY_ROLLING_SUMMARY", "true").lower() == "true"
+HISTORY_SUMMARY_MAX_TOKENS = int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", "200"))
+# Summarise evicted turns with a background LLM call (extractive fold otherwise)
+HISTORY_SUMMARY_USE_LLM = os.getenv("HISTORY_SUMMARY_USE_LLM", "true").lower() == "true"
+# Let history grow this many messages past the limit before evicting, so one summary call covers several turns
+HISTORY_SUMMARY_BATCH_MESSAGES = int(os.getenv("HISTORY_SUMMARY_BATCH_MESSAGES", "6"))
+
+# Pre-render recommendation messages for every product tier at startup
+REC_CACHE_WARM_ON_STARTUP = os.getenv("REC_CACHE_WARM_ON_STARTUP", "false").lower() == "true"
+
 from utils.llm_services import llm, embedding_model
\ No newline at end of file
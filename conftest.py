@@ -0,0 +1,26 @@
+"""
+Test setup. The bot's modules sit flat in this directory but import each
+other as ``app.*``, ``utils.*`` and ``agents.*`` (their packages in the
+deployed bot), so those package names are pointed at this directory. The
+Azure settings are placeholders: clients are built at import time but tests
+never call them.
+"""
+
+import os
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+for _package in ("app", "utils", "agents"):
+    if _package not in sys.modules:
+        module = types.ModuleType(_package)
+        module.__path__ = [ROOT]
+        sys.modules[_package] = module
+
+os.environ.setdefault("AZURE_OPENAI_ENDPOINT", "https://example.openai.azure.com")
+os.environ.setdefault("AZURE_OPENAI_API_KEY", "test-key")
+os.environ.setdefault("AZURE_OPENAI_API_VERSION", "2024-06-01")
+os.environ.setdefault("AZURE_OPENAI_CHAT_DEPLOYMENT_NAME", "chat")
+os.environ.setdefault("AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME", "embedding")
+os.environ.setdefault("SESSION_BACKEND", "memory")
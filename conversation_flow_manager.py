@@ -6,14 +6,22 @@ Uses intelligent conversation analysis to determine routing decisions
 based on conversational flow and context, not just keyword matching.
 """
 
+import hashlib
 import logging
-from typing import Dict, Any, Optional, List
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Dict, Any, Optional, List, Tuple
 from app.session_manager import get_session, update_conversation_context
 from app.config import llm
+from utils.llm_services import run_sync
 from langchain_core.prompts import ChatPromptTemplate
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on memoised flow decisions. Entries only need to live for the
+# duration of a single turn, so a small LRU is plenty.
+FLOW_DECISION_MEMO_SIZE = 256
+
 class ConversationFlowManager:
     """
     Intelligent conversation flow manager that understands conversational context
@@ -21,6 +29,7 @@ class ConversationFlowManager:
     """
     
     def __init__(self):
+        self._decision_memo: "OrderedDict[Tuple[str, str, str], Dict[str, Any]]" = OrderedDict()
         self.decision_prompt = ChatPromptTemplate.from_template("""
 You are an intelligent conversation flow analyzer for HLAS Insurance chatbot. Your task is to determine if the user is continuing the current conversation or switching to a new topic.
 
@@ -63,57 +72,126 @@ RESPONSE FORMAT (JSON):
         Analyze conversation flow to determine if user is continuing current conversation
         or switching to a new topic.
         """
+        return run_sync(self.aanalyze_conversation_flow(session_id, user_message, chat_history))
+
+    async def aanalyze_conversation_flow(
+        self,
+        session_id: str,
+        user_message: str,
+        chat_history: List
+    ) -> Dict[str, Any]:
+        """
+        Async variant of analyze_conversation_flow.
+
+        Decisions are memoised per (session_id, message, history hash), so repeat
+        calls within the same turn do not trigger another LLM round-trip.
+        """
+        memo_key = (session_id, user_message, self._history_fingerprint(chat_history))
+        cached = self._decision_memo.get(memo_key)
+        if cached is not None:
+            self._decision_memo.move_to_end(memo_key)
+            logger.debug(f"Reusing memoised flow decision for session {session_id}")
+            return dict(cached)
+
         try:
-            # Get current context
-            session = get_session(session_id)
-            context = session.get("conversation_context", {})
-            current_agent = context.get("primary_product", "None")
-            
-            # Extract last agent message and conversation history
-            last_agent_message = self._extract_last_agent_message(chat_history)
-            formatted_history = self._format_conversation_history(chat_history)
-            
-            # Only treat as new conversation if there's NO chat history at all
-            if not chat_history:
-                return {
-                    "decision": "switch",  # Classify new conversation
-                    "confidence": 1.0,
-                    "reason": "First message - needs classification"
-                }
-            
-            # If there's chat history but no specific agent yet, still analyze conversation flow
-            # The LLM should determine if user is continuing the general conversation or switching topics
-            
-            # Use LLM to analyze conversation flow
-            response = llm.invoke(self.decision_prompt.format(
-                current_agent=current_agent,
-                last_agent_message=last_agent_message,
-                user_message=user_message,
-                conversation_history=formatted_history
-            ))
-            
-            # Parse LLM response
-            decision_data = self._parse_llm_decision(response.content)
-            
-            logger.info(f"Conversation flow analysis for session {session_id}: {decision_data}")
-            return decision_data
-            
+            decision_data = await self._aanalyze_conversation_flow(session_id, user_message, chat_history)
         except Exception as e:
             logger.error(f"Error in conversation flow analysis: {str(e)}")
-            # Safe fallback - continue with current conversation if there's context
-            if current_agent and current_agent != "UNKNOWN":
-                return {
-                    "decision": "continue",
-                    "confidence": 0.6,
-                    "reason": f"Error occurred, defaulting to continue with {current_agent}"
-                }
-            else:
-                return {
-                    "decision": "switch",
-                    "confidence": 0.5,
-                    "reason": "Error occurred, defaulting to classify"
-                }
+            # Not memoised, so the next analysis of this turn tries the LLM again
+            return self._fallback_decision(session_id)
+        self.remember_decision(session_id, user_message, chat_history, decision_data)
+        return decision_data
+
+    def remember_decision(
+        self,
+        session_id: str,
+        user_message: str,
+        chat_history: List,
+        decision_data: Dict[str, Any]
+    ):
+        """
+        Memoise a flow decision made elsewhere (e.g. by the merged turn analysis)
+        so the next analysis of this turn does not call the LLM.
+        """
+        memo_key = (session_id, user_message, self._history_fingerprint(chat_history))
+        self._decision_memo[memo_key] = dict(decision_data)
+        self._decision_memo.move_to_end(memo_key)
+        if len(self._decision_memo) > FLOW_DECISION_MEMO_SIZE:
+            self._decision_memo.popitem(last=False)
+
+    async def _aanalyze_conversation_flow(
+        self,
+        session_id: str,
+        user_message: str,
+        chat_history: List
+    ) -> Dict[str, Any]:
+        """Run the actual (uncached) flow analysis. Errors propagate to the caller."""
+        # Get current context
+        session = get_session(session_id)
+        context = session.get("conversation_context", {})
+        current_agent = context.get("primary_product", "None")
+        
+        # Extract last agent message and conversation history
+        last_agent_message = self._extract_last_agent_message(chat_history)
+        formatted_history = self._format_conversation_history(chat_history)
+        
+        # Only treat as new conversation if there's NO chat history at all
+        if not chat_history:
+            return {
+                "decision": "switch",  # Classify new conversation
+                "confidence": 1.0,
+                "reason": "First message - needs classification"
+            }
+        
+        # If there's chat history but no specific agent yet, still analyze conversation flow
+        # The LLM should determine if user is continuing the general conversation or switching topics
+        
+        # Use LLM to analyze conversation flow
+        response = await llm.ainvoke(self.decision_prompt.format(
+            current_agent=current_agent,
+            last_agent_message=last_agent_message,
+            user_message=user_message,
+            conversation_history=formatted_history
+        ))
+        
+        # Parse LLM response
+        decision_data = self._parse_llm_decision(response.content)
+        
+        logger.info(f"Conversation flow analysis for session {session_id}: {decision_data}")
+        return decision_data
+
+    def _fallback_decision(self, session_id: str) -> Dict[str, Any]:
+        """Safe fallback - continue with current conversation if there's context."""
+        try:
+            current_agent = get_session(session_id).get("conversation_context", {}).get("primary_product", "None")
+        except Exception:
+            current_agent = None
+        if current_agent and current_agent != "UNKNOWN":
+            return {
+                "decision": "continue",
+                "confidence": 0.6,
+                "reason": f"Error occurred, defaulting to continue with {current_agent}"
+            }
+        else:
+            return {
+                "decision": "switch",
+                "confidence": 0.5,
+                "reason": "Error occurred, defaulting to classify"
+            }
     
+    def _history_fingerprint(self, chat_history: List) -> str:
+        """Stable hash of the chat history, used as part of the memo key."""
+        digest = hashlib.sha1()
+        for item in chat_history or []:
+            if isinstance(item, Mapping):
+                role, content = item.get("role", ""), item.get("content", "")
+            elif isinstance(item, (list, tuple)) and len(item) >= 2:
+                role, content = item[0], item[1]
+            else:
+                role, content = "", item
+            digest.update(f"{role}\x1f{content}\x1e".encode("utf-8", "replace"))
+        return f"{len(chat_history or [])}:{digest.hexdigest()}"
+
     def _extract_last_agent_message(self, chat_history: List) -> str:
         """Extract the last message from the agent."""
         try:
@@ -122,7 +200,7 @@ RESPONSE FORMAT (JSON):
             
             # Look for the last agent/AI message
             for item in reversed(chat_history):
-                if isinstance(item, dict):
+                if isinstance(item, Mapping):
                     if item.get("role") == "assistant":
                         return item.get("content", "")
                 elif isinstance(item, (list, tuple)) and len(item) >= 2:
@@ -132,7 +210,7 @@ RESPONSE FORMAT (JSON):
             
             # If no agent message found, get the last message
             last_item = chat_history[-1]
-            if isinstance(last_item, dict):
+            if isinstance(last_item, Mapping):
                 return last_item.get("content", "No previous message")
             elif isinstance(last_item, (list, tuple)) and len(last_item) >= 2:
                 return str(last_item[1])
@@ -153,7 +231,7 @@ RESPONSE FORMAT (JSON):
             recent_history = chat_history[-max_exchanges*2:]  # Get last few exchanges
             
             for item in recent_history:
-                if isinstance(item, dict):
+                if isinstance(item, Mapping):
                     role = item.get("role", "unknown")
                     content = item.get("content", "")
                     speaker = "User" if role == "user" else "Agent"
@@ -195,14 +273,18 @@ RESPONSE FORMAT (JSON):
         self, 
         session_id: str, 
         user_message: str, 
-        chat_history: List
+        chat_history: List,
+        analysis: Optional[Dict[str, Any]] = None
     ) -> bool:
         """
         Main method to determine if conversation should continue with current agent.
         Returns True if should continue, False if should reclassify.
+
+        Pass a precomputed ``analysis`` to avoid re-running the flow analysis.
         """
         try:
-            analysis = self.analyze_conversation_flow(session_id, user_message, chat_history)
+            if analysis is None:
+                analysis = self.analyze_conversation_flow(session_id, user_message, chat_history)
             
             decision = analysis["decision"]
             confidence = analysis["confidence"]
@@ -232,11 +314,13 @@ RESPONSE FORMAT (JSON):
         self, 
         session_id: str, 
         user_message: str, 
-        chat_history: List
+        chat_history: List,
+        analysis: Optional[Dict[str, Any]] = None
     ) -> str:
         """Get explanation for why conversation should continue or switch."""
         try:
-            analysis = self.analyze_conversation_flow(session_id, user_message, chat_history)
+            if analysis is None:
+                analysis = self.analyze_conversation_flow(session_id, user_message, chat_history)
             return analysis.get("reason", "Conversation flow analysis")
         except Exception as e:
             return f"Analysis error: {str(e)}"
@@ -251,17 +335,24 @@ def should_continue_with_current_agent(session_id: str, user_message: str, chat_
     Returns:
         Dict with 'should_continue', 'confidence', and 'reason'
     """
+    return run_sync(ashould_continue_with_current_agent(session_id, user_message, chat_history))
+
+async def ashould_continue_with_current_agent(session_id: str, user_message: str, chat_history: List) -> Dict[str, Any]:
+    """
+    Async variant of should_continue_with_current_agent.
+    """
     try:
-        should_continue = conversation_flow_manager.should_continue_conversation(
+        # Analyse once per turn and share the decision with every consumer
+        analysis = await conversation_flow_manager.aanalyze_conversation_flow(
             session_id, user_message, chat_history
         )
         
-        reason = conversation_flow_manager.get_continuation_reason(
-            session_id, user_message, chat_history
+        should_continue = conversation_flow_manager.should_continue_conversation(
+            session_id, user_message, chat_history, analysis=analysis
         )
         
-        analysis = conversation_flow_manager.analyze_conversation_flow(
-            session_id, user_message, chat_history
+        reason = conversation_flow_manager.get_continuation_reason(
+            session_id, user_message, chat_history, analysis=analysis
         )
         
         return {
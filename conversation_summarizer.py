@@ -0,0 +1,130 @@
+"""
+Rolling Conversation Summaries
+==============================
+
+When ``update_session`` trims old turns from ``chat_history`` it hands them to
+the summarizer instead of dropping them. The summarizer folds them into the
+session's ``conversation_summary`` with a short LLM call that runs in the
+background, so the user's response never waits for it.
+
+Each session has at most one summary job in flight; turns evicted while it
+runs are queued and folded by the same job, so summaries are applied in
+order. If the LLM call fails the turns are folded extractively instead.
+"""
+
+import logging
+import threading
+from typing import Dict, List, Set
+
+from langchain_core.messages import SystemMessage, HumanMessage
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a customer and the HLAS Insurance assistant.
+Update the existing summary with the new messages. Keep every fact the assistant may need later: products discussed,
+details the customer gave (destination, dates, travellers, plan tier, coverage needs), plans recommended, and anything
+the customer declined or corrected. Drop greetings and pleasantries. Write at most {max_words} words of plain text."""
+
+class ConversationSummarizer:
+    """
+    Background, per-session incremental summarizer.
+    """
+
+    def __init__(self):
+        self._pending: Dict[str, List] = {}
+        self._running: Set[str] = set()
+        self._jobs = set()
+        self._lock = threading.Lock()
+
+        self._scheduled = 0
+        self._completed = 0
+        self._fallbacks = 0
+
+    def schedule(self, session_id: str, evicted_turns: List):
+        """
+        Queue evicted turns for folding into the session summary.
+        """
+        from utils.llm_services import submit_background
+
+        if not evicted_turns:
+            return
+        with self._lock:
+            self._pending.setdefault(session_id, []).extend(evicted_turns)
+            self._scheduled += 1
+            if session_id in self._running:
+                return
+            self._running.add(session_id)
+        job = submit_background(self._arun(session_id))
+        self._jobs.add(job)
+        job.add_done_callback(self._jobs.discard)
+
+    async def _arun(self, session_id: str):
+        try:
+            while True:
+                with self._lock:
+                    turns = self._pending.pop(session_id, None)
+                    if not turns:
+                        self._running.discard(session_id)
+                        return
+                await self._afold(session_id, turns)
+        except Exception as e:
+            logger.error(f"Conversation summary job failed for session {session_id}: {e}")
+            with self._lock:
+                self._pending.pop(session_id, None)
+                self._running.discard(session_id)
+
+    async def _afold(self, session_id: str, turns: List):
+        from app.config import HISTORY_SUMMARY_MAX_TOKENS
+        from app.session_manager import session_store, session_turn, save_session
+        from utils.llm_services import get_llm
+        from utils.history_renderer import render_history, fold_into_summary, truncate_to_tokens
+
+        async with session_turn(session_id):
+            session = session_store.get(session_id)
+            if session is None or isinstance(session, dict):
+                return
+            previous = session.conversation_summary
+
+        try:
+            response = await get_llm().ainvoke([
+                SystemMessage(content=SUMMARY_PROMPT.format(max_words=int(HISTORY_SUMMARY_MAX_TOKENS * 0.7))),
+                HumanMessage(content=f"Existing summary:\n{previous or '(none)'}\n\nNew messages:\n"
+                                     f"{render_history(turns, max_tokens=HISTORY_SUMMARY_MAX_TOKENS * 4, max_turns=len(turns))}"),
+            ])
+            summary = truncate_to_tokens(response.content.strip(), HISTORY_SUMMARY_MAX_TOKENS)
+            with self._lock:
+                self._completed += 1
+        except Exception as e:
+            logger.warning(f"LLM summary failed for session {session_id}, folding extractively: {e}")
+            summary = fold_into_summary(previous, turns)
+            with self._lock:
+                self._fallbacks += 1
+
+        # Re-read so the write lands on the latest copy of the session
+        async with session_turn(session_id):
+            session = session_store.get(session_id)
+            if session is None or isinstance(session, dict):
+                return
+            session.conversation_summary = summary
+            save_session(session_id, session)
+        logger.debug(f"📝 Folded {len(turns)} turns into the summary for session {session_id}")
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "scheduled": self._scheduled,
+                "completed": self._completed,
+                "fallbacks": self._fallbacks,
+                "in_flight": len(self._running),
+            }
+
+_summarizer_instance = None
+
+def get_conversation_summarizer() -> ConversationSummarizer:
+    """
+    Get the singleton summarizer.
+    """
+    global _summarizer_instance
+    if _summarizer_instance is None:
+        _summarizer_instance = ConversationSummarizer()
+    return _summarizer_instance
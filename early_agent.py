@@ -6,7 +6,6 @@ from dotenv import load_dotenv
 from pydantic import BaseModel, Field, validator
 from typing import List, Type, Optional
 
-from app.config import llm
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.tools import tool
 from langchain.tools import Tool
@@ -18,7 +17,8 @@ from app.session_manager import set_collected_info, get_collected_info
 logger = logging.getLogger(__name__)
 
 from app.session_manager import get_session, update_session
-from utils.llm_services import llm
+from utils.llm_services import get_structured_chain
+from utils.history_renderer import render_history
 from langchain_core.messages import HumanMessage, SystemMessage
 from pydantic import BaseModel, Field
 import json
@@ -53,7 +53,7 @@ def run_early_agent(user_message: str, chat_history: list, session_id: str):
         "product_code",
     ]
 
-    chain = llm.with_structured_output(EarlyInfo, method="function_calling")
+    chain = get_structured_chain(EarlyInfo)
     today = datetime.now().strftime("%Y-%m-%d")
 
     prompt = [
@@ -72,7 +72,8 @@ Rules:
 - Normalize yes/no to booleans for smoker.
 - Confirm briefly and move to the next missing field.
 Current collected: {collected_info}
-Conversation: {chat_history}
+Conversation:
+{render_history(chat_history, summary=session.get("conversation_summary"))}
 """),
         HumanMessage(content=user_message),
     ]
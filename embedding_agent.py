@@ -9,17 +9,43 @@ import argparse
 from dotenv import load_dotenv
 import re
 import json
+import time
+import queue
+import random
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import weaviate
-from weaviate.classes.config import Property, DataType, Configure, VectorDistances
+from weaviate.classes.config import Property, DataType
+from weaviate.classes.query import Filter
+from weaviate.util import generate_uuid5
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.messages import SystemMessage, HumanMessage
 from utils.llm_services import llm, embedding_model
+from app.config import KB_COLLECTION_NAME
+from utils.kb_version import bump_kb_version
+from utils.ingestion_cache import IngestionCache, INGESTION_CACHE_PATH
+from utils.vector_index_profiles import INDEX_PROFILES, VECTOR_INDEX_PROFILE, named_vector_configs
 
 # Define project root and source_db path for robust execution
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SOURCE_DB_PATH = os.path.join(PROJECT_ROOT, "Admin", "source_db")
 DEBUG_OUTPUT_PATH = os.path.join(PROJECT_ROOT, "Admin", "debug_chunks")
 
+# Texts per embed_documents request and number of requests in flight
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+# Question-generation LLM calls in flight at once
+QUESTION_CONCURRENCY = int(os.getenv("QUESTION_CONCURRENCY", "8"))
+# Requests per minute across all workers for the chat and embedding deployments (0 = unlimited)
+CHAT_RPM_LIMIT = int(os.getenv("CHAT_RPM_LIMIT", "0"))
+EMBED_RPM_LIMIT = int(os.getenv("EMBED_RPM_LIMIT", "0"))
+# Retries for rate-limited (HTTP 429) or transient API errors
+API_MAX_RETRIES = int(os.getenv("EMBED_API_MAX_RETRIES", "6"))
+# Chunks enriched per pipeline window, and enriched windows buffered ahead of the Weaviate writer
+PIPELINE_WINDOW_SIZE = int(os.getenv("PIPELINE_WINDOW_SIZE", "128"))
+PIPELINE_QUEUE_WINDOWS = int(os.getenv("PIPELINE_QUEUE_WINDOWS", "2"))
+
 # Load environment variables
 load_dotenv()
 
@@ -30,7 +56,7 @@ log_file_path = os.path.join(log_directory, "embedding_agent.log")
 
 logging.basicConfig(
     level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
+    format="%(asctime)s - %(levelname)s - [%(threadName)s] %(message)s",
     handlers=[
         logging.FileHandler(log_file_path),
         logging.StreamHandler()
@@ -63,101 +89,291 @@ def get_all_products():
     logger.info(f"Discovered products: {list(products)}")
     return list(products)
 
+def _read_blocks(file_path: str, block_chars: int = 64 * 1024):
+    """Yields a text file in blocks of roughly block_chars, cut at blank lines."""
+    block = []
+    size = 0
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            block.append(line)
+            size += len(line)
+            if size >= block_chars and not line.strip():
+                yield ''.join(block)
+                block = []
+                size = 0
+    if block:
+        yield ''.join(block)
+
+def _iter_sections(file_path: str, starts_section):
+    """Yields the stripped sections of a file, a new section starting at each line where starts_section(line)."""
+    section = []
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if section and starts_section(line):
+                chunk = ''.join(section).strip()
+                if chunk:
+                    yield chunk
+                section = []
+            section.append(line)
+    chunk = ''.join(section).strip()
+    if chunk:
+        yield chunk
+
 def chunk_benefits(file_path: str, chunk_size: int = 500, chunk_overlap: int = 50):
-    """Chunks a text file with overlap."""
+    """Chunks a text file with overlap, streaming it a block at a time."""
     logger.info(f"Chunking benefits file: {file_path}")
-    with open(file_path, 'r', encoding='utf-8') as f:
-        text = f.read()
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
         length_function=len,
     )
-    chunks = text_splitter.split_text(text)
-    logger.info(f"Created {len(chunks)} chunks from {os.path.basename(file_path)}")
-    return chunks
+    count = 0
+    for block in _read_blocks(file_path):
+        for chunk in text_splitter.split_text(block):
+            count += 1
+            yield chunk
+    logger.info(f"Created {count} chunks from {os.path.basename(file_path)}")
 
 def chunk_faqs(file_path: str):
     """Chunks a FAQ file where each Q&A pair is a chunk."""
     logger.info(f"Chunking FAQ file: {file_path}")
-    with open(file_path, 'r', encoding='utf-8') as f:
-        text = f.read()
-    # Split by "Q:" but keep the delimiter
-    qa_pairs = re.split(r'(?=^Q:)', text, flags=re.MULTILINE)
-    chunks = [pair.strip() for pair in qa_pairs if pair.strip()]
-    logger.info(f"Created {len(chunks)} chunks from {os.path.basename(file_path)}")
-    return chunks
+    count = 0
+    # Each pair starts at a line beginning with "Q:"
+    for chunk in _iter_sections(file_path, lambda line: line.startswith("Q:")):
+        count += 1
+        yield chunk
+    logger.info(f"Created {count} chunks from {os.path.basename(file_path)}")
 
 def chunk_policy_md(file_path: str):
     """Chunks a markdown file by sections (headings)."""
     logger.info(f"Chunking policy file: {file_path}")
-    with open(file_path, 'r', encoding='utf-8') as f:
-        text = f.read()
-    
-    # Split by lines that start with #, ##, etc. Keep the delimiter.
-    chunks = re.split(r'(?=^#+\s)', text, flags=re.MULTILINE)
-    
-    # Filter out any empty strings that might result from the split
-    chunks = [chunk.strip() for chunk in chunks if chunk.strip()]
-        
-    logger.info(f"Created {len(chunks)} chunks from {os.path.basename(file_path)}")
-    return chunks
+    count = 0
+    # Each section starts at a line beginning with #, ##, etc.
+    for chunk in _iter_sections(file_path, lambda line: re.match(r'#+\s', line) is not None):
+        count += 1
+        yield chunk
+    logger.info(f"Created {count} chunks from {os.path.basename(file_path)}")
+
+QUESTION_PROMPT = """You are an expert at generating hypothetical questions from a given text chunk.
+Your task is to generate 10 unique questions that a user might ask, which could be answered by the provided text.
+The questions should be varied and cover different aspects of the text.
+Return the questions as a JSON object with a single key "questions" which is a list of 10 strings.
+Example: {"questions": ["What is the coverage for...?", "How do I claim for...?", ...]}"""
+# Part of the ingestion cache key, so editing the prompt regenerates questions
+QUESTION_PROMPT_VERSION = hashlib.sha256(QUESTION_PROMPT.encode("utf-8")).hexdigest()[:12]
 
 def generate_hypothetical_questions(chunk: str):
     """Generates 10 hypothetical questions for a given text chunk using an LLM."""
+    questions, _ = _generate_questions_with_usage(chunk)
+    return questions
+
+def _generate_questions_with_usage(chunk: str):
+    """Generates questions for a chunk and returns (questions, token usage)."""
     logger.info(f"Generating questions for chunk starting with: '{chunk[:80]}...'")
     
     prompt = [
-        SystemMessage(content="""You are an expert at generating hypothetical questions from a given text chunk.
-Your task is to generate 10 unique questions that a user might ask, which could be answered by the provided text.
-The questions should be varied and cover different aspects of the text.
-Return the questions as a JSON object with a single key "questions" which is a list of 10 strings.
-Example: {"questions": ["What is the coverage for...?", "How do I claim for...?", ...]}"""),
+        SystemMessage(content=QUESTION_PROMPT),
         HumanMessage(content=f"Here is the text chunk:\n\n---\n{chunk}\n---")
     ]
     
+    usage = {}
     try:
-        response = llm.invoke(prompt)
+        response = call_with_retry(llm.invoke, prompt, description="Question generation", limiter=chat_rate_limiter)
+        usage = getattr(response, "usage_metadata", None) or {}
         # Extract JSON from the response content
         json_str = response.content.strip().replace("```json", "").replace("```", "").strip()
         questions_obj = json.loads(json_str)
         questions = questions_obj.get("questions", [])
         if not isinstance(questions, list) or len(questions) == 0:
             logger.warning("LLM returned empty or invalid question list.")
-            return []
+            return [], usage
         logger.info(f"Successfully generated {len(questions)} questions.")
-        return questions
+        return questions, usage
     except json.JSONDecodeError as e:
         logger.error(f"Failed to decode JSON from LLM response: {e}\nResponse: {response.content}")
-        return []
+        return [], usage
     except Exception as e:
         logger.error(f"An error occurred during question generation: {e}")
-        return []
+        return [], usage
+
+def generate_questions_for_chunks(chunks, concurrency=None):
+    """
+    Generate hypothetical questions for many chunks with a bounded thread pool.
 
+    Results are returned in chunk order; a token and throughput report is
+    logged at the end.
+    """
+    concurrency = max(1, concurrency or QUESTION_CONCURRENCY)
+    results = [[] for _ in chunks]
+    if not chunks:
+        return results
 
-def save_chunks_to_debug_folder(product_name, all_objects):
+    started = time.monotonic()
+    totals = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+    done = 0
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(_generate_questions_with_usage, chunk): i for i, chunk in enumerate(chunks)}
+        for future in as_completed(futures):
+            questions, usage = future.result()
+            results[futures[future]] = questions
+            for key in totals:
+                totals[key] += usage.get(key, 0) or 0
+            done += 1
+            if done % 10 == 0 or done == len(chunks):
+                logger.info(f"Generated questions for {done}/{len(chunks)} chunks")
+
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"Question generation finished: {len(chunks)} chunks in {elapsed:.1f}s "
+        f"({len(chunks) / elapsed if elapsed else 0:.2f} chunks/s, concurrency {concurrency}); "
+        f"tokens: {totals['input_tokens']} in, {totals['output_tokens']} out, {totals['total_tokens']} total "
+        f"({totals['total_tokens'] / elapsed if elapsed else 0:.0f} tokens/s)"
+    )
+    return results
+
+
+def _retry_after_seconds(error):
+    """Return the server's Retry-After hint for a rate-limit error, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+def _is_retryable(error):
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status in (429, 500, 502, 503, 504):
+        return True
+    message = str(error).lower()
+    return "rate limit" in message or "429" in message or "timed out" in message
+
+class RateLimiter:
     """
-    Save chunks and metadata to debug folder for analysis.
+    Token bucket of requests per minute, shared by every ingestion thread
+    that calls the same Azure deployment. A limit of 0 disables it.
     """
-    # Create debug folder structure
-    product_debug_path = os.path.join(DEBUG_OUTPUT_PATH, product_name)
-    os.makedirs(product_debug_path, exist_ok=True)
-    
-    logger.info(f"Saving {len(all_objects)} chunks to debug folder: {product_debug_path}")
-    
-    # Save detailed chunk analysis
-    chunk_analysis = {
-        "product_name": product_name,
-        "total_chunks": len(all_objects),
-        "chunks_by_doc_type": {},
-        "chunks_by_source": {},
-        "empty_chunks": [],
-        "valid_chunks": [],
-        "chunk_details": []
-    }
-    
-    for i, obj in enumerate(all_objects):
-        chunk_id = f"{product_name}_{obj['doc_type']}_{i+1}"
+
+    def __init__(self, per_minute=0):
+        self._lock = threading.Lock()
+        self.configure(per_minute)
+
+    def configure(self, per_minute):
+        with self._lock:
+            self.rate = per_minute / 60.0
+            # Allow bursts of up to ten seconds' worth of requests
+            self.capacity = max(1.0, self.rate * 10)
+            self.tokens = self.capacity
+            self.updated = time.monotonic()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                if self.rate <= 0:
+                    return
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+chat_rate_limiter = RateLimiter(CHAT_RPM_LIMIT)
+embedding_rate_limiter = RateLimiter(EMBED_RPM_LIMIT)
+
+def call_with_retry(fn, *args, description="API call", max_retries=None, limiter=None, **kwargs):
+    """
+    Call fn, retrying rate-limited and transient failures with exponential
+    backoff and jitter (honouring Retry-After when the API sends it). Each
+    attempt first takes a token from the limiter, if one is given.
+    """
+    max_retries = API_MAX_RETRIES if max_retries is None else max_retries
+    for attempt in range(max_retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt >= max_retries or not _is_retryable(e):
+                raise
+            delay = _retry_after_seconds(e) or min(60.0, 2 ** attempt) + random.uniform(0, 1)
+            logger.warning(f"{description} failed ({e}); retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+def embed_texts(texts, batch_size=None, concurrency=None):
+    """
+    Embed texts with batched embed_documents requests, several in flight at once.
+
+    Returns a list aligned with texts; entries of batches that still fail after
+    retries are None.
+    """
+    batch_size = max(1, batch_size or EMBED_BATCH_SIZE)
+    concurrency = max(1, concurrency or EMBED_CONCURRENCY)
+    vectors = [None] * len(texts)
+    if not texts:
+        return vectors
+
+    batches = [(start, texts[start:start + batch_size]) for start in range(0, len(texts), batch_size)]
+    started = time.monotonic()
+    done = 0
+    failed = 0
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {
+            executor.submit(call_with_retry, embedding_model.embed_documents, batch,
+                            description=f"Embedding batch at {start}", limiter=embedding_rate_limiter): (start, batch)
+            for start, batch in batches
+        }
+        for future in as_completed(futures):
+            start, batch = futures[future]
+            try:
+                vectors[start:start + len(batch)] = future.result()
+            except Exception as e:
+                failed += len(batch)
+                logger.error(f"Failed to embed batch of {len(batch)} texts starting at {start}: {e}")
+            done += len(batch)
+            elapsed = time.monotonic() - started
+            logger.info(f"Embedded {done}/{len(texts)} texts ({done / elapsed if elapsed else 0:.1f} texts/s)")
+
+    logger.info(
+        f"Embedding finished: {len(texts) - failed}/{len(texts)} texts in {len(batches)} batches "
+        f"({time.monotonic() - started:.1f}s, batch size {batch_size}, concurrency {concurrency})"
+    )
+    return vectors
+
+class DebugChunkWriter:
+    """
+    Writes chunk debug files as chunks stream through ingestion, keeping only
+    counters in memory. Per-chunk details go to a JSONL file; the analysis
+    summary is written on close().
+    """
+
+    def __init__(self, product_name):
+        self.product_name = product_name
+        self.path = os.path.join(DEBUG_OUTPUT_PATH, product_name)
+        os.makedirs(self.path, exist_ok=True)
+        logger.info(f"Saving chunks to debug folder: {self.path}")
+
+        self.chunk_analysis = {
+            "product_name": product_name,
+            "total_chunks": 0,
+            "chunks_by_doc_type": {},
+            "chunks_by_source": {},
+            "empty_chunks": [],
+            "valid_chunks": [],
+            "chunk_details_file": f"{product_name}_chunk_details.jsonl",
+        }
+        self._details = open(os.path.join(self.path, self.chunk_analysis["chunk_details_file"]), 'w', encoding='utf-8')
+
+    def add(self, obj):
+        """Record one chunk (with its questions, if generated)."""
+        chunk_analysis = self.chunk_analysis
+        chunk_analysis["total_chunks"] += 1
+        index = chunk_analysis["total_chunks"]
+        chunk_id = f"{self.product_name}_{obj['doc_type']}_{index}"
         content = obj.get('content', '')
         
         # Analyze chunk
@@ -166,7 +382,7 @@ def save_chunks_to_debug_folder(product_name, all_objects):
         
         chunk_detail = {
             "chunk_id": chunk_id,
-            "chunk_index": i + 1,
+            "chunk_index": index,
             "doc_type": obj.get('doc_type', 'unknown'),
             "source_file": obj.get('source_file', 'unknown'),
             "content_length": content_length,
@@ -175,8 +391,7 @@ def save_chunks_to_debug_folder(product_name, all_objects):
             "questions_count": len(obj.get('questions', [])),
             "content_preview": content[:200] + "..." if content and len(content) > 200 else content
         }
-        
-        chunk_analysis["chunk_details"].append(chunk_detail)
+        self._details.write(json.dumps(chunk_detail, ensure_ascii=False) + "\n")
         
         # Track by doc_type
         doc_type = obj.get('doc_type', 'unknown')
@@ -201,9 +416,7 @@ def save_chunks_to_debug_folder(product_name, all_objects):
             chunk_analysis["chunks_by_source"][source_file]["valid"] += 1
         
         # Save individual chunk file
-        chunk_filename = f"{chunk_id}.json"
-        chunk_filepath = os.path.join(product_debug_path, chunk_filename)
-        
+        chunk_filepath = os.path.join(self.path, f"{chunk_id}.json")
         with open(chunk_filepath, 'w', encoding='utf-8') as f:
             json.dump({
                 "chunk_id": chunk_id,
@@ -211,64 +424,99 @@ def save_chunks_to_debug_folder(product_name, all_objects):
                     "product_name": obj.get('product_name', ''),
                     "doc_type": obj.get('doc_type', ''),
                     "source_file": obj.get('source_file', ''),
-                    "chunk_index": i + 1,
+                    "chunk_index": index,
                     "content_length": content_length,
                     "is_empty": is_empty
                 },
                 "content": content,
                 "questions": obj.get('questions', [])
             }, f, indent=2, ensure_ascii=False)
-    
-    # Save summary analysis
-    summary_filepath = os.path.join(product_debug_path, f"{product_name}_chunk_analysis.json")
-    with open(summary_filepath, 'w', encoding='utf-8') as f:
-        json.dump(chunk_analysis, f, indent=2, ensure_ascii=False)
-    
-    # Save human-readable summary
-    summary_txt_filepath = os.path.join(product_debug_path, f"{product_name}_summary.txt")
-    with open(summary_txt_filepath, 'w', encoding='utf-8') as f:
-        f.write(f"CHUNK ANALYSIS SUMMARY FOR {product_name}\n")
-        f.write("=" * 50 + "\n\n")
-        f.write(f"Total Chunks: {chunk_analysis['total_chunks']}\n")
-        f.write(f"Empty Chunks: {len(chunk_analysis['empty_chunks'])}\n")
-        f.write(f"Valid Chunks: {len(chunk_analysis['valid_chunks'])}\n\n")
+
+    def close(self):
+        """Write the analysis summary files and return the analysis."""
+        self._details.close()
+        chunk_analysis = self.chunk_analysis
+        product_name = self.product_name
+
+        # Save summary analysis
+        summary_filepath = os.path.join(self.path, f"{product_name}_chunk_analysis.json")
+        with open(summary_filepath, 'w', encoding='utf-8') as f:
+            json.dump(chunk_analysis, f, indent=2, ensure_ascii=False)
         
-        f.write("BREAKDOWN BY DOCUMENT TYPE:\n")
-        f.write("-" * 30 + "\n")
-        for doc_type, stats in chunk_analysis["chunks_by_doc_type"].items():
-            f.write(f"{doc_type}: {stats['total']} total, {stats['valid']} valid, {stats['empty']} empty\n")
+        # Save human-readable summary
+        summary_txt_filepath = os.path.join(self.path, f"{product_name}_summary.txt")
+        with open(summary_txt_filepath, 'w', encoding='utf-8') as f:
+            f.write(f"CHUNK ANALYSIS SUMMARY FOR {product_name}\n")
+            f.write("=" * 50 + "\n\n")
+            f.write(f"Total Chunks: {chunk_analysis['total_chunks']}\n")
+            f.write(f"Empty Chunks: {len(chunk_analysis['empty_chunks'])}\n")
+            f.write(f"Valid Chunks: {len(chunk_analysis['valid_chunks'])}\n\n")
+            
+            f.write("BREAKDOWN BY DOCUMENT TYPE:\n")
+            f.write("-" * 30 + "\n")
+            for doc_type, stats in chunk_analysis["chunks_by_doc_type"].items():
+                f.write(f"{doc_type}: {stats['total']} total, {stats['valid']} valid, {stats['empty']} empty\n")
+            
+            f.write("\nBREAKDOWN BY SOURCE FILE:\n")
+            f.write("-" * 30 + "\n")
+            for source_file, stats in chunk_analysis["chunks_by_source"].items():
+                f.write(f"{source_file}: {stats['total']} total, {stats['valid']} valid, {stats['empty']} empty\n")
+            
+            if chunk_analysis['empty_chunks']:
+                f.write("\nEMPTY CHUNKS:\n")
+                f.write("-" * 15 + "\n")
+                for chunk_id in chunk_analysis['empty_chunks']:
+                    f.write(f"- {chunk_id}\n")
         
-        f.write("\nBREAKDOWN BY SOURCE FILE:\n")
-        f.write("-" * 30 + "\n")
-        for source_file, stats in chunk_analysis["chunks_by_source"].items():
-            f.write(f"{source_file}: {stats['total']} total, {stats['valid']} valid, {stats['empty']} empty\n")
+        logger.info(f"Debug analysis saved to: {summary_filepath}")
+        logger.info(f"Found {len(chunk_analysis['empty_chunks'])} empty chunks out of {chunk_analysis['total_chunks']} total chunks")
         
-        if chunk_analysis['empty_chunks']:
-            f.write("\nEMPTY CHUNKS:\n")
-            f.write("-" * 15 + "\n")
-            for chunk_id in chunk_analysis['empty_chunks']:
-                f.write(f"- {chunk_id}\n")
-    
-    logger.info(f"Debug analysis saved to: {summary_filepath}")
-    logger.info(f"Found {len(chunk_analysis['empty_chunks'])} empty chunks out of {chunk_analysis['total_chunks']} total chunks")
-    
-    return chunk_analysis
-
+        return chunk_analysis
 
-def embed_product(product_name, weaviate_client):
+def save_chunks_to_debug_folder(product_name, all_objects):
     """
-    Processes documents for a single product and embeds them into the 'Insurance_Knowledge_Base' collection using raw Weaviate.
+    Save chunks and metadata to debug folder for analysis.
     """
-    logger.info(f"Starting embedding process for product: {product_name}")
-    
-    collection_name = "Insurance_Knowledge_Base"
-    
-    try:
-        docs_collection = weaviate_client.collections.get(collection_name)
-    except Exception as e:
-        logger.error(f"Failed to get Weaviate collection '{collection_name}': {e}")
-        return
+    writer = DebugChunkWriter(product_name)
+    for obj in all_objects:
+        writer.add(obj)
+    return writer.close()
 
+
+def chunk_object_id(obj):
+    """Deterministic object uuid from product, doc type, source file and chunk content."""
+    content_hash = hashlib.sha256(obj["content"].encode("utf-8")).hexdigest()
+    return generate_uuid5(f"{obj['product_name']}|{obj['doc_type']}|{obj['source_file']}|{content_hash}")
+
+def fetch_product_object_ids(collection, product_name, page_size=1000):
+    """Return the uuids of all objects currently stored for a product."""
+    ids = set()
+    product_filter = Filter.by_property("product_name").equal(product_name)
+    # Filtered server-side; Weaviate's cursor (after=) cannot be combined with filters, so page by offset
+    offset = 0
+    while True:
+        response = collection.query.fetch_objects(filters=product_filter, limit=page_size, offset=offset,
+                                                  return_properties=[])
+        ids.update(str(obj.uuid) for obj in response.objects)
+        if len(response.objects) < page_size:
+            return ids
+        offset += page_size
+
+def delete_objects(collection, object_ids, batch_size=1000):
+    """Delete objects by uuid in batches; returns the number deleted."""
+    deleted = 0
+    for start in range(0, len(object_ids), batch_size):
+        result = collection.data.delete_many(where=Filter.by_id().contains_any(object_ids[start:start + batch_size]))
+        deleted += result.successful
+        if result.failed:
+            logger.error(f"Failed to delete {result.failed} stale objects")
+    return deleted
+
+def iter_product_objects(product_name):
+    """
+    Yields the knowledge base objects for a product, file by file and chunk
+    by chunk, without reading whole files into memory.
+    """
     # Define file paths and their corresponding chunking functions and doc_types
     files_to_process = [
         {"path": os.path.join(SOURCE_DB_PATH, "benefits", f"{product_name}_benefits.txt"), "chunker": chunk_benefits, "doc_type": "benefits"},
@@ -276,123 +524,357 @@ def embed_product(product_name, weaviate_client):
         {"path": os.path.join(SOURCE_DB_PATH, "policy", f"{product_name}_policy.md"), "chunker": chunk_policy_md, "doc_type": "policy"},
     ]
 
-    all_objects = []
-    
     for file_info in files_to_process:
         file_path = file_info["path"]
-        if os.path.exists(file_path):
-            logger.info(f"Processing file: {file_path}")
-            chunks = file_info["chunker"](file_path)
-            logger.info(f"Generated {len(chunks)} chunks from {os.path.basename(file_path)}")
-            
-            valid_chunks_count = 0
-            empty_chunks_count = 0
-            
-            for i, chunk in enumerate(chunks):
-                chunk_id = f"{product_name}_{file_info['doc_type']}_{i+1}"
-                
-                if not chunk or not chunk.strip():
-                    logger.warning(f"Skipping empty chunk {chunk_id} from file: {os.path.basename(file_path)}")
-                    empty_chunks_count += 1
+        if not os.path.exists(file_path):
+            logger.warning(f"File not found, skipping: {file_path}")
+            continue
+
+        logger.info(f"Processing file: {file_path}")
+        valid_chunks_count = 0
+        empty_chunks_count = 0
+
+        for i, chunk in enumerate(file_info["chunker"](file_path)):
+            chunk_id = f"{product_name}_{file_info['doc_type']}_{i+1}"
+
+            if not chunk or not chunk.strip():
+                logger.warning(f"Skipping empty chunk {chunk_id} from file: {os.path.basename(file_path)}")
+                empty_chunks_count += 1
+                continue
+
+            valid_chunks_count += 1
+            logger.debug(f"Processing valid chunk {chunk_id}: {len(chunk)} characters")
+
+            yield {
+                "content": chunk,
+                "questions": [], # Filled in when the chunk's window is enriched
+                "product_name": product_name,
+                "doc_type": file_info["doc_type"],
+                "source_file": os.path.basename(file_path)
+            }
+
+        logger.info(f"File {os.path.basename(file_path)} processing complete: {valid_chunks_count} valid chunks, {empty_chunks_count} empty chunks skipped")
+
+def enrich_window(objects, cache=None, embed_batch_size=None, embed_concurrency=None, question_concurrency=None, stop=None):
+    """
+    Fill in questions for a window of objects and return their
+    (content_vector, questions_vector) pairs, in order.
+
+    Cached chunks reuse their questions and vectors; the rest get generated
+    questions and embeddings, and complete results are written back to the cache.
+    Returns None, without embedding or caching, once ``stop`` is set.
+    """
+    cached = cache.get_many(obj["content"] for obj in objects) if cache else {}
+    pending = [obj for obj in objects if obj["content"] not in cached]
+    if cache:
+        logger.info(f"Ingestion cache: {len(objects) - len(pending)} hits, {len(pending)} misses")
+
+    object_vectors = {}
+    for i, obj in enumerate(objects):
+        if obj["content"] in cached:
+            obj["questions"] = cached[obj["content"]]["questions"]
+            object_vectors[i] = (cached[obj["content"]]["content_vector"], cached[obj["content"]]["questions_vector"])
+
+    # Generate hypothetical questions for each new chunk
+    all_questions = generate_questions_for_chunks([obj["content"] for obj in pending], question_concurrency)
+    for obj, questions in zip(pending, all_questions):
+        obj["questions"] = questions
+    if stop is not None and stop.is_set():
+        return None
+
+    # Content and questions texts are embedded together, in batches
+    to_embed = [i for i in range(len(objects)) if i not in object_vectors]
+    texts = [objects[i]["content"] for i in to_embed]
+    questions_positions = {}
+    for i in to_embed:
+        questions_text = ' '.join(objects[i].get('questions', []))
+        if questions_text.strip():
+            questions_positions[i] = len(texts)
+            texts.append(questions_text)
+    embeddings = embed_texts(texts, embed_batch_size, embed_concurrency)
+    for position, i in enumerate(to_embed):
+        questions_embedding = embeddings[questions_positions[i]] if i in questions_positions else None
+        object_vectors[i] = (embeddings[position], questions_embedding)
+
+    if cache:
+        # Only cache complete results, so failed calls are retried on the next run
+        cache.put_many({
+            objects[i]["content"]: {
+                "questions": objects[i]["questions"],
+                "content_vector": object_vectors[i][0],
+                "questions_vector": object_vectors[i][1],
+            }
+            for i in to_embed
+            if object_vectors[i][0] is not None and objects[i]["questions"] and object_vectors[i][1] is not None
+        })
+
+    return [object_vectors[i] for i in range(len(objects))]
+
+def _produce_windows(product_name, existing_ids, seen_ids, output, stop, window_size, force, enrich_kwargs):
+    """
+    Producer side of the ingestion pipeline: chunk, diff and enrich windows
+    of objects and hand them to the writer through a bounded queue.
+
+    Each queued item is a list of (object, uuid, vectors) in chunk order,
+    with vectors None for unchanged chunks. None marks the end of the
+    stream; an exception is passed through for the writer to raise.
+    """
+    def put(item):
+        # Blocks while the writer is behind; gives up if the writer has stopped
+        while not stop.is_set():
+            try:
+                output.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        window = []
+        objects = iter_product_objects(product_name)
+        while True:
+            obj = next(objects, None)
+            if obj is not None:
+                # Deterministic ids: unchanged chunks keep their object, edited chunks get a new one
+                obj_id = chunk_object_id(obj)
+                if obj_id in seen_ids:
+                    logger.info(f"Dropped duplicate chunk from {obj['source_file']}")
                     continue
+                seen_ids.add(obj_id)
+                window.append((obj, obj_id))
 
-                valid_chunks_count += 1
-                logger.debug(f"Processing valid chunk {chunk_id}: {len(chunk)} characters")
-
-                # Generate hypothetical questions for each chunk
-                questions = generate_hypothetical_questions(chunk)
-                
-                all_objects.append({
-                    "content": chunk,
-                    "questions": questions, # Add generated questions
-                    "product_name": product_name,
-                    "doc_type": file_info["doc_type"],
-                    "source_file": os.path.basename(file_path)
-                })
-            
-            logger.info(f"File {os.path.basename(file_path)} processing complete: {valid_chunks_count} valid chunks, {empty_chunks_count} empty chunks skipped")
-        else:
-            logger.warning(f"File not found, skipping: {file_path}")
+            if window and (obj is None or len(window) >= window_size):
+                to_write = [i for i, (_, obj_id) in enumerate(window) if force or obj_id not in existing_ids]
+                vectors = {}
+                if to_write:
+                    enriched = enrich_window([window[i][0] for i in to_write], stop=stop, **enrich_kwargs)
+                    if enriched is None:
+                        return  # The writer stopped while questions were being generated
+                    vectors = dict(zip(to_write, enriched))
+                if not put([(o, obj_id, vectors.get(i)) for i, (o, obj_id) in enumerate(window)]):
+                    return
+                window = []
 
-    if not all_objects:
-        logger.warning(f"No chunks generated for product: {product_name}")
-        return
+            if obj is None:
+                break
+        put(None)
+    except Exception as e:
+        put(e)
 
-    # Save chunks to debug folder for analysis
-    logger.info(f"Generated {len(all_objects)} data objects for product: {product_name}")
-    chunk_analysis = save_chunks_to_debug_folder(product_name, all_objects)
-    
-    # Log analysis summary
-    logger.info(f"Chunk Analysis Summary - Total: {chunk_analysis['total_chunks']}, Valid: {len(chunk_analysis['valid_chunks'])}, Empty: {len(chunk_analysis['empty_chunks'])}")
-    
-    # Only proceed with Weaviate ingestion if we have valid chunks
-    valid_objects = [obj for obj in all_objects if obj.get('content') and obj.get('content').strip()]
-    
-    if not valid_objects:
-        logger.error(f"No valid chunks found for product: {product_name}. Skipping Weaviate ingestion.")
-        return
+def embed_product(product_name, weaviate_client, embed_batch_size=None, embed_concurrency=None, question_concurrency=None, cache=None, force=False,
+                  window_size=None, queue_windows=None):
+    """
+    Processes documents for a single product and embeds them into the knowledge base collection (KB_COLLECTION_NAME) using raw Weaviate.
+
+    Objects get deterministic uuids, so a re-run only writes new or edited
+    chunks and deletes chunks that disappeared from the source (force=True
+    rewrites every chunk).
+
+    Chunks stream through a read -> chunk -> enrich -> embed -> write pipeline
+    in windows of window_size, with at most queue_windows enriched windows
+    waiting for the writer, so memory does not grow with document size and
+    the first objects are written while later ones are still being enriched.
+    """
+    logger.info(f"Starting embedding process for product: {product_name}")
+    summary = {"product": product_name, "status": "failed", "chunks": 0, "written": 0, "unchanged": 0, "incomplete": 0, "stale_deleted": 0}
+    window_size = max(1, window_size or PIPELINE_WINDOW_SIZE)
+    queue_windows = max(1, queue_windows or PIPELINE_QUEUE_WINDOWS)
     
-    if len(valid_objects) != len(all_objects):
-        logger.warning(f"Filtering out {len(all_objects) - len(valid_objects)} empty chunks before Weaviate ingestion")
+    collection_name = KB_COLLECTION_NAME
     
-    logger.info(f"Ingesting {len(valid_objects)} valid chunks into Weaviate...")
+    try:
+        docs_collection = weaviate_client.collections.get(collection_name)
+    except Exception as e:
+        logger.error(f"Failed to get Weaviate collection '{collection_name}': {e}")
+        return summary
 
     try:
-        logger.info(f"Generating embeddings and ingesting {len(valid_objects)} objects...")
-        
+        existing_ids = fetch_product_object_ids(docs_collection, product_name)
+    except Exception as e:
+        logger.error(f"Failed to list existing objects for {product_name}: {e}")
+        return summary
+
+    seen_ids = set()
+    windows = queue.Queue(maxsize=queue_windows)
+    stop = threading.Event()
+    producer = threading.Thread(
+        target=_produce_windows,
+        args=(product_name, existing_ids, seen_ids, windows, stop, window_size, force, {
+            "cache": cache,
+            "embed_batch_size": embed_batch_size,
+            "embed_concurrency": embed_concurrency,
+            "question_concurrency": question_concurrency,
+        }),
+        name=f"{threading.current_thread().name}-enrich",
+        daemon=True,
+    )
+
+    debug_writer = DebugChunkWriter(product_name)
+    queued = 0
+    failed_count = 0
+    stale_ids = []
+    started = time.monotonic()
+
+    try:
+        producer.start()
         with docs_collection.batch.dynamic() as batch:
-            for i, item in enumerate(valid_objects):
-                try:
-                    # Generate SEPARATE embeddings for content and questions
-                    content_text = item.get('content', '')
-                    questions_text = ' '.join(item.get('questions', []))
-                    
-                    if content_text:
-                        # Generate separate embeddings (3072-dim each)
-                        logger.debug(f"Generating content embedding for chunk {i+1}")
-                        content_embedding = embedding_model.embed_query(content_text)
-                        
-                        # Prepare vectors dictionary
-                        vectors = {"content_vector": content_embedding}
-                        
-                        # Generate questions embedding if questions exist
-                        if questions_text and questions_text.strip():
-                            logger.debug(f"Generating questions embedding for chunk {i+1}")
-                            questions_embedding = embedding_model.embed_query(questions_text)
-                            vectors["questions_vector"] = questions_embedding
-                        
-                        # Store with named vectors
-                        batch.add_object(
-                            properties=item,  # Same metadata structure
-                            vector=vectors    # Multiple named vectors
-                        )
-                        
-                        if (i + 1) % 10 == 0:
-                            logger.info(f"Processed {i + 1}/{len(valid_objects)} objects with embeddings")
-                    else:
-                        logger.warning(f"Skipping object {i+1} - no content to embed")
-                        
-                except Exception as embed_error:
-                    logger.error(f"Failed to generate embedding for object {i+1}: {embed_error}")
-                    # Add without embedding as fallback
-                    batch.add_object(properties=item)
-        
+            while True:
+                window = windows.get()
+                if window is None:
+                    break
+                if isinstance(window, Exception):
+                    raise window
+
+                for item, obj_id, vectors in window:
+                    debug_writer.add(item)
+                    if vectors is None:
+                        summary["unchanged"] += 1
+                        continue
+
+                    content_embedding, questions_embedding = vectors
+                    if content_embedding is None or questions_embedding is None or not item["questions"]:
+                        # Its deterministic uuid would mark it unchanged forever, so leave it out for the next run to retry
+                        logger.error(f"Incomplete enrichment for object {obj_id}; not ingesting it this run")
+                        summary["incomplete"] += 1
+                        continue
+                    queued += 1
+
+                    # Separate named vectors for content and questions
+                    named_vectors = {"content_vector": content_embedding, "questions_vector": questions_embedding}
+
+                    # Adding with an existing uuid replaces the object (upsert)
+                    batch.add_object(
+                        properties=item,  # Same metadata structure
+                        uuid=obj_id,
+                        vector=named_vectors    # Multiple named vectors
+                    )
+
+                elapsed = time.monotonic() - started
+                logger.info(
+                    f"Pipeline progress for {product_name}: {debug_writer.chunk_analysis['total_chunks']} chunks, "
+                    f"{queued} queued for Weaviate, {summary['unchanged']} unchanged ({elapsed:.1f}s)"
+                )
+
+        summary["chunks"] = len(seen_ids)
+        stale_ids = sorted(existing_ids - seen_ids)
+        logger.info(
+            f"Ingestion diff for {product_name}: {summary['unchanged']} unchanged, "
+            f"{queued} written, {summary['incomplete']} incomplete, {len(stale_ids)} stale"
+        )
+
+        if not seen_ids:
+            logger.warning(f"No chunks generated for product: {product_name}")
+            summary["status"] = "no_chunks"
+            return summary
+
+        if not queued and not stale_ids and not summary["incomplete"]:
+            logger.info(f"Knowledge base for {product_name} is already up to date.")
+            summary["status"] = "up_to_date"
+            return summary
+
+        failed_count = len(docs_collection.batch.failed_objects)
+        summary["written"] = queued - failed_count
         if docs_collection.batch.failed_objects:
-             logger.error(f"Failed to ingest {len(docs_collection.batch.failed_objects)} objects for {product_name}.")
+             logger.error(f"Failed to ingest {failed_count} objects for {product_name}.")
              for failed_obj in docs_collection.batch.failed_objects:
                  logger.error(f"Failed object: {failed_obj}")
+             if stale_ids:
+                 logger.warning(f"Keeping {len(stale_ids)} stale objects for {product_name} until ingestion succeeds")
+        elif summary["incomplete"] and stale_ids:
+            logger.warning(f"Keeping {len(stale_ids)} stale objects for {product_name} until every chunk is enriched")
+        elif stale_ids:
+            # Removed only after the replacements are in, so searches never see a gap
+            deleted = delete_objects(docs_collection, stale_ids)
+            summary["stale_deleted"] = deleted
+            logger.info(f"Deleted {deleted} stale objects for {product_name}")
         
-        logger.info(f"Successfully ingested {len(valid_objects)} valid objects for {product_name} into Weaviate collection: {collection_name}")
+        logger.info(f"Successfully ingested {queued} valid objects for {product_name} into Weaviate collection: {collection_name}")
+        # Let running bots drop answers cached against the old content
+        bump_kb_version(product_name)
+        summary["status"] = "partial" if failed_count or summary["incomplete"] else "ok"
 
     except Exception as e:
         logger.error(f"Failed to ingest documents for {product_name}: {e}")
+    finally:
+        stop.set()
+        # The producer uses the shared cache and API clients, which the caller closes after this returns
+        producer.join()
+        chunk_analysis = debug_writer.close()
         
     # Log final summary
     logger.info(f"Embedding process completed for {product_name}:")
     logger.info(f"  - Total chunks processed: {chunk_analysis['total_chunks']}")
-    logger.info(f"  - Valid chunks ingested: {len(valid_objects)}")
+    logger.info(f"  - Unchanged chunks skipped: {summary['unchanged']}")
+    logger.info(f"  - New or changed chunks ingested: {queued}")
+    logger.info(f"  - Incomplete chunks left for the next run: {summary['incomplete']}")
+    logger.info(f"  - Stale chunks removed: {summary['stale_deleted']}")
     logger.info(f"  - Empty chunks filtered out: {len(chunk_analysis['empty_chunks'])}")
     logger.info(f"  - Debug files saved to: {os.path.join(DEBUG_OUTPUT_PATH, product_name)}")
+    return summary
+
+def ingest_product_worker(product, args):
+    """
+    Ingest one product on a worker thread with its own Weaviate client and
+    cache connection; API calls share the module-level rate limiters.
+    """
+    from utils.weaviate_client import create_weaviate_client
+
+    threading.current_thread().name = product
+    started = time.monotonic()
+    client = None
+    cache = None
+    try:
+        client = create_weaviate_client()
+        cache = None if args.no_cache else open_ingestion_cache(args.cache_path)
+        summary = embed_product(product, client, args.embed_batch_size, args.embed_concurrency,
+                                args.question_concurrency, cache, args.force, args.window_size, args.queue_windows)
+    except Exception as e:
+        logger.error(f"Ingestion failed for {product}: {e}")
+        summary = {"product": product, "status": "failed", "chunks": 0, "written": 0, "unchanged": 0, "incomplete": 0, "stale_deleted": 0}
+    finally:
+        if cache:
+            cache.close()
+        if client and client.is_connected():
+            client.close()
+    summary["seconds"] = round(time.monotonic() - started, 1)
+    return summary
+
+def log_ingestion_summary(summaries, elapsed):
+    """Log one line per product plus totals."""
+    logger.info("INGESTION SUMMARY")
+    logger.info(f"{'product':<16} {'status':<11} {'chunks':>7} {'written':>8} {'unchanged':>10} {'incomplete':>11} {'stale':>6} {'seconds':>8}")
+    for summary in summaries:
+        logger.info(
+            f"{summary['product']:<16} {summary['status']:<11} {summary['chunks']:>7} {summary['written']:>8} "
+            f"{summary['unchanged']:>10} {summary['incomplete']:>11} {summary['stale_deleted']:>6} {summary.get('seconds', 0):>8}"
+        )
+    failed = [summary['product'] for summary in summaries if summary['status'] == "failed"]
+    logger.info(
+        f"{len(summaries)} products in {elapsed:.1f}s: {sum(s['written'] for s in summaries)} objects written, "
+        f"{sum(s['unchanged'] for s in summaries)} unchanged, "
+        f"{sum(s['incomplete'] for s in summaries)} incomplete, {sum(s['stale_deleted'] for s in summaries)} stale deleted"
+        + (f"; failed: {', '.join(failed)}" if failed else "")
+    )
+
+def collection_or_alias_exists(client, name):
+    """True if name is an existing collection or an alias pointing at one."""
+    if client.collections.exists(name):
+        return True
+    try:
+        return client.alias.get(alias_name=name) is not None
+    except Exception:
+        return False
+
+def open_ingestion_cache(path=INGESTION_CACHE_PATH):
+    """
+    Open the ingestion cache keyed to the configured models and question prompt.
+    """
+    return IngestionCache(
+        path,
+        chat_model=os.getenv("AZURE_OPENAI_CHAT_DEPLOYMENT_NAME", ""),
+        embedding_model=os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME", ""),
+        prompt_version=QUESTION_PROMPT_VERSION,
+    )
 
 def main():
     """
@@ -400,40 +882,56 @@ def main():
     """
     parser = argparse.ArgumentParser(description="Embedding agent for processing product documents.")
     parser.add_argument("--product", type=str, help="The name of the product to process. If not provided, all products will be processed.")
+    parser.add_argument("--embed-batch-size", type=int, default=EMBED_BATCH_SIZE, help="Texts per embedding request.")
+    parser.add_argument("--embed-concurrency", type=int, default=EMBED_CONCURRENCY, help="Embedding requests in flight at once.")
+    parser.add_argument("--question-concurrency", type=int, default=QUESTION_CONCURRENCY, help="Question-generation LLM calls in flight at once.")
+    parser.add_argument("--window-size", type=int, default=PIPELINE_WINDOW_SIZE, help="Chunks enriched and written per pipeline window.")
+    parser.add_argument("--queue-windows", type=int, default=PIPELINE_QUEUE_WINDOWS, help="Enriched windows buffered ahead of the Weaviate writer.")
+    parser.add_argument("--index-profile", choices=list(INDEX_PROFILES), default=VECTOR_INDEX_PROFILE, help="Vector index profile for a newly created collection.")
+    parser.add_argument("--ef", type=int, help="HNSW query-time ef for a newly created collection.")
+    parser.add_argument("--ef-construction", type=int, help="HNSW build-time ef for a newly created collection.")
+    parser.add_argument("--max-connections", type=int, help="HNSW max connections per node for a newly created collection.")
+    parser.add_argument("--workers", type=int, default=1, help="Products ingested concurrently when no --product is given.")
+    parser.add_argument("--chat-rpm", type=int, default=CHAT_RPM_LIMIT, help="Chat requests per minute across all workers (0 = unlimited).")
+    parser.add_argument("--embed-rpm", type=int, default=EMBED_RPM_LIMIT, help="Embedding requests per minute across all workers (0 = unlimited).")
+    parser.add_argument("--force", action="store_true", help="Rewrite every chunk, not just new or edited ones.")
+    parser.add_argument("--no-cache", action="store_true", help="Regenerate questions and embeddings for every chunk.")
+    parser.add_argument("--cache-path", type=str, default=INGESTION_CACHE_PATH, help="SQLite file for the ingestion cache.")
+    parser.add_argument("--cache-stats", action="store_true", help="Print ingestion cache statistics and exit.")
+    parser.add_argument("--cache-prune", type=float, metavar="DAYS", help="Delete cache entries unused for DAYS days and exit.")
     args = parser.parse_args()
 
+    if args.cache_stats or args.cache_prune is not None:
+        cache = open_ingestion_cache(args.cache_path)
+        if args.cache_prune is not None:
+            deleted = cache.prune(args.cache_prune)
+            logger.info(f"Pruned {deleted} ingestion cache entries unused for {args.cache_prune} days")
+        print(json.dumps(cache.stats(), indent=2))
+        cache.close()
+        return
+
+    chat_rate_limiter.configure(args.chat_rpm)
+    embedding_rate_limiter.configure(args.embed_rpm)
+
     # Create debug output directory
     os.makedirs(DEBUG_OUTPUT_PATH, exist_ok=True)
     logger.info(f"Debug output will be saved to: {DEBUG_OUTPUT_PATH}")
 
     from utils.weaviate_client import get_weaviate_client
     client = None
+    cache = None if args.no_cache else open_ingestion_cache(args.cache_path)
     try:
         client = get_weaviate_client()
-        collection_name = "Insurance_Knowledge_Base"
+        collection_name = KB_COLLECTION_NAME
+        index_tuning = {"ef": args.ef, "ef_construction": args.ef_construction, "max_connections": args.max_connections}
 
-        # Idempotent collection creation
-        if not client.collections.exists(collection_name):
-            logger.info(f"Collection '{collection_name}' does not exist. Creating it now.")
+        # Idempotent collection creation (the name may be an alias onto a versioned collection)
+        if not collection_or_alias_exists(client, collection_name):
+            logger.info(f"Collection '{collection_name}' does not exist. Creating it now with index profile '{args.index_profile}'.")
             client.collections.create(
                 name=collection_name,
                 # Configure NAMED VECTORS for separate semantic spaces (MANUAL EMBEDDINGS)
-                vector_config=[
-                    {
-                        "name": "content_vector",
-                        "vectorizer": Configure.Vectorizer.none(),  # Manual embeddings
-                        "vector_index_config": Configure.VectorIndex.hnsw(
-                            distance_metric=VectorDistances.COSINE
-                        )
-                    },
-                    {
-                        "name": "questions_vector",
-                        "vectorizer": Configure.Vectorizer.none(),  # Manual embeddings
-                        "vector_index_config": Configure.VectorIndex.hnsw(
-                            distance_metric=VectorDistances.COSINE
-                        )
-                    }
-                ],
+                vector_config=named_vector_configs(args.index_profile, **index_tuning),
                 properties=[
                     # KEEP EXACT SAME METADATA (for rec_retriever_agent compatibility)
                     Property(name="content", data_type=DataType.TEXT),
@@ -446,17 +944,34 @@ def main():
             logger.info(f"Successfully created collection: {collection_name}")
         else:
             logger.info(f"Using existing Weaviate collection: {collection_name}")
+            if args.index_profile != VECTOR_INDEX_PROFILE or any(index_tuning.values()):
+                logger.warning("Index profile options only apply to new collections; "
+                               "rebuild with migrate_schema.py --blue-green --index-profile to change the index")
 
         if args.product:
-            embed_product(args.product, client)
+            products = [args.product]
         else:
             logger.info("No specific product specified. Processing all available products.")
             products = get_all_products()
             if not products:
                 logger.warning("No product directories found in source_db.")
                 return
+
+        started = time.monotonic()
+        if args.workers > 1 and len(products) > 1:
+            # Each worker gets its own Weaviate client and cache connection
+            logger.info(f"Ingesting {len(products)} products with {args.workers} workers")
+            with ThreadPoolExecutor(max_workers=args.workers) as executor:
+                summaries = list(executor.map(lambda product: ingest_product_worker(product, args), products))
+        else:
+            summaries = []
             for product in products:
-                embed_product(product, client)
+                product_started = time.monotonic()
+                summary = embed_product(product, client, args.embed_batch_size, args.embed_concurrency, args.question_concurrency, cache, args.force,
+                                        args.window_size, args.queue_windows)
+                summary["seconds"] = round(time.monotonic() - product_started, 1)
+                summaries.append(summary)
+        log_ingestion_summary(summaries, time.monotonic() - started)
     
     except Exception as e:
         logger.error(f"An error occurred in the main process: {e}")
@@ -464,6 +979,8 @@ def main():
         if client and client.is_connected():
             client.close()
             logger.info("Weaviate client closed.")
+        if cache:
+            cache.close()
 
 if __name__ == "__main__":
     main()
@@ -10,10 +10,16 @@ import logging
 import random
 from typing import Dict, List, Optional, Any
 from datetime import datetime
+from pydantic import BaseModel, Field
 from app.session_manager import increment_error_count, get_session, update_conversation_context
 
 logger = logging.getLogger(__name__)
 
+class ConfusionAnalysis(BaseModel):
+    is_confused: bool = Field(description="Whether the user appears confused or needs help")
+    confusion_type: str = Field(description="Type of confusion: what, how, help, unclear, repeat, or none")
+    confidence: float = Field(description="Confidence score 0.0-1.0")
+
 class FallbackManager:
     """
     Manages fallback responses and error recovery for the chatbot.
@@ -162,26 +168,35 @@ class FallbackManager:
             logger.error(f"Error in agent failure handler: {str(e)}")
             return self.get_fallback_response("general_error", session_id)
     
-    def detect_confusion_patterns(self, session_id: str, user_message: str) -> Optional[str]:
+    def detect_confusion_patterns(self, session_id: str, user_message: str, analysis: Optional[ConfusionAnalysis] = None) -> Optional[str]:
         """
         Uses LLM to detect patterns that indicate user confusion and provide helpful responses.
         """
+        from utils.llm_services import run_sync
+        return run_sync(self.adetect_confusion_patterns(session_id, user_message, analysis))
+    
+    async def adetect_confusion_patterns(self, session_id: str, user_message: str, analysis: Optional[ConfusionAnalysis] = None) -> Optional[str]:
+        """
+        Async variant of detect_confusion_patterns.
+
+        Pass a precomputed ``analysis`` (e.g. from the merged turn analysis) to skip the LLM call.
+        """
+        if analysis is not None:
+            if analysis.is_confused and analysis.confidence > 0.7:
+                return self.get_confusion_response(analysis.confusion_type, session_id)
+            return None
+
         try:
-            from app.config import llm
             from langchain_core.messages import SystemMessage, HumanMessage
-            from pydantic import BaseModel, Field
-            
-            class ConfusionAnalysis(BaseModel):
-                is_confused: bool = Field(description="Whether the user appears confused or needs help")
-                confusion_type: str = Field(description="Type of confusion: what, how, help, unclear, repeat, or none")
-                confidence: float = Field(description="Confidence score 0.0-1.0")
+            from utils.llm_services import get_structured_chain
+            from utils.history_renderer import render_history
             
             # Get conversation context
             session = get_session(session_id)
             chat_history = session.get("chat_history", [])
-            last_few_messages = chat_history[-6:] if len(chat_history) > 6 else chat_history
+            last_few_messages = render_history(chat_history, max_turns=6)
             
-            confusion_chain = llm.with_structured_output(ConfusionAnalysis, method="function_calling")
+            confusion_chain = get_structured_chain(ConfusionAnalysis)
             
             prompt = [
                 SystemMessage(content="""You are an expert at detecting user confusion in insurance conversations.
@@ -202,10 +217,10 @@ IMPORTANT CONTEXT RULES:
 - Short contextual responses like "2", "Japan", "yes", or date ranges are normal continuations, not confusion.
 - Only flag as confused if the user genuinely seems lost or explicitly asks for clarification.
 - If user was asked to fix something and provides different information, treat as correction attempt, not confusion."""),
-                HumanMessage(content=f"Recent conversation: {last_few_messages}\n\nUser message: {user_message}")
+                HumanMessage(content=f"Recent conversation:\n{last_few_messages}\n\nUser message: {user_message}")
             ]
             
-            result = confusion_chain.invoke(prompt)
+            result = await confusion_chain.ainvoke(prompt)
             
             if result.is_confused and result.confidence > 0.7:
                 return self.get_confusion_response(result.confusion_type, session_id)
@@ -267,7 +282,10 @@ def handle_agent_failure(session_id: str, agent_type: str, error_message: str) -
     """Convenience function to handle agent failures."""
     return fallback_manager.handle_agent_failure(session_id, agent_type, error_message)
 
-def detect_confusion(session_id: str, user_message: str) -> Optional[str]:
+def detect_confusion(session_id: str, user_message: str, analysis: Optional[ConfusionAnalysis] = None) -> Optional[str]:
     """Convenience function to detect user confusion."""
-    return fallback_manager.detect_confusion_patterns(session_id, user_message)
+    return fallback_manager.detect_confusion_patterns(session_id, user_message, analysis)
 
+async def adetect_confusion(session_id: str, user_message: str, analysis: Optional[ConfusionAnalysis] = None) -> Optional[str]:
+    """Async convenience function to detect user confusion."""
+    return await fallback_manager.adetect_confusion_patterns(session_id, user_message, analysis)
@@ -0,0 +1,145 @@
+"""
+Chat History Renderer
+=====================
+
+Renders chat history into prompts in one compact, token-bounded format:
+
+    Earlier conversation (summary): ...
+    User: ...
+    Assistant: ...
+
+Timestamps and dict/repr noise are dropped, turns are taken newest-first until
+the token budget is spent, and a single oversize message is shortened from
+the middle so the start and the closing question both survive. Token counts
+use tiktoken when it is available and a 4-characters-per-token estimate
+otherwise.
+"""
+
+import logging
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ROLE_LABELS = {"user": "User", "assistant": "Assistant", "system": "System"}
+TRUNCATION_MARKER = " … "
+
+try:
+    import tiktoken
+    try:
+        _encoding = tiktoken.get_encoding("o200k_base")
+    except Exception:
+        _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception as e:  # tiktoken missing or encoding files unavailable offline
+    logger.warning(f"tiktoken unavailable, estimating prompt tokens from length: {e}")
+    _encoding = None
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """
+    Count tokens in a piece of text (cached, since the same turns are
+    rendered on every message of a conversation).
+    """
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Shorten text to roughly max_tokens by cutting out the middle.
+    """
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    if _encoding is not None:
+        tokens = _encoding.encode(text, disallowed_special=())
+        head = max_tokens // 2
+        tail = max_tokens - head
+        return _encoding.decode(tokens[:head]).rstrip() + TRUNCATION_MARKER + _encoding.decode(tokens[-tail:]).lstrip()
+    head = max_tokens * 2
+    tail = max_tokens * 4 - head
+    return text[:head].rstrip() + TRUNCATION_MARKER + text[-tail:].lstrip()
+
+def format_turn(turn) -> str:
+    """
+    Render one turn as 'Role: content' on a single line.
+    """
+    if isinstance(turn, Mapping):
+        role = turn.get("role", "")
+        content = turn.get("content", "")
+    elif isinstance(turn, (tuple, list)) and len(turn) >= 2:
+        role, content = turn[0], turn[1]
+    else:
+        role, content = "", turn
+    label = ROLE_LABELS.get(str(role).lower(), str(role).capitalize() or "Message")
+    return f"{label}: {' '.join(str(content).split())}"
+
+def render_history(
+    chat_history: Optional[Iterable],
+    max_tokens: Optional[int] = None,
+    max_turns: Optional[int] = None,
+    summary: Optional[str] = None,
+    max_message_tokens: Optional[int] = None,
+) -> str:
+    """
+    Render chat history for a prompt within a token budget.
+
+    max_turns limits how many of the newest messages are considered, the
+    summary (if any) is placed first and counts against the budget, and
+    older turns are dropped once the budget is spent.
+    """
+    from app.config import HISTORY_TOKEN_BUDGET, HISTORY_MAX_MESSAGE_TOKENS
+
+    budget = HISTORY_TOKEN_BUDGET if max_tokens is None else max_tokens
+    message_budget = HISTORY_MAX_MESSAGE_TOKENS if max_message_tokens is None else max_message_tokens
+
+    turns = list(chat_history or [])
+    if max_turns is not None:
+        turns = turns[-max_turns:] if max_turns > 0 else []
+
+    header = ""
+    if summary:
+        header = f"Earlier conversation (summary): {truncate_to_tokens(' '.join(summary.split()), budget // 3)}"
+        budget -= count_tokens(header)
+
+    lines: List[str] = []
+    for turn in reversed(turns):
+        line = truncate_to_tokens(format_turn(turn), message_budget)
+        cost = count_tokens(line) + 1  # newline
+        if cost > budget:
+            if not lines and budget > 0:
+                # Always keep (part of) the latest message
+                lines.append(truncate_to_tokens(line, budget))
+            break
+        lines.append(line)
+        budget -= cost
+    lines.reverse()
+
+    if header:
+        lines.insert(0, header)
+    return "\n".join(lines) if lines else "(no previous messages)"
+
+def fold_into_summary(summary: str, evicted_turns: Iterable, max_tokens: Optional[int] = None) -> str:
+    """
+    Extend a rolling summary with turns that are being trimmed from history.
+
+    Extractive: each evicted turn contributes its first sentence, and the
+    oldest lines are dropped once the summary exceeds max_tokens.
+    """
+    from app.config import HISTORY_SUMMARY_MAX_TOKENS
+
+    limit = HISTORY_SUMMARY_MAX_TOKENS if max_tokens is None else max_tokens
+    lines = [line for line in (summary or "").split("\n") if line]
+    for turn in evicted_turns:
+        line = format_turn(turn)
+        label, _, content = line.partition(": ")
+        first_sentence = content.split(". ")[0]
+        lines.append(truncate_to_tokens(f"{label}: {first_sentence}", 60))
+
+    while len(lines) > 1 and count_tokens("\n".join(lines)) > limit:
+        lines.pop(0)
+    return "\n".join(lines)
@@ -0,0 +1,125 @@
+"""
+Ingestion Cache
+===============
+
+Content-addressed SQLite cache for the knowledge base ingestion scripts.
+
+Each row is keyed by the SHA-256 of a chunk's text together with the chat
+model, the embedding model and the question prompt version, and stores the
+chunk's generated questions and both named vectors. Re-running ingestion on
+unchanged source files therefore costs no LLM or embedding calls; editing a
+chunk, switching a model or changing the prompt produces a new key.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import numpy as np
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INGESTION_CACHE_PATH = os.getenv("INGESTION_CACHE_PATH", os.path.join(PROJECT_ROOT, "Admin", "ingestion_cache.sqlite"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    key TEXT PRIMARY KEY,
+    questions TEXT NOT NULL,
+    content_vector BLOB NOT NULL,
+    questions_vector BLOB,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+)
+"""
+
+def _to_blob(vector: Optional[List[float]]) -> Optional[bytes]:
+    return None if vector is None else np.asarray(vector, dtype=np.float32).tobytes()
+
+def _from_blob(blob: Optional[bytes]) -> Optional[List[float]]:
+    return None if blob is None else np.frombuffer(blob, dtype=np.float32).tolist()
+
+class IngestionCache:
+    """
+    Chunk -> (questions, content vector, questions vector) cache.
+    """
+
+    def __init__(self, path: str = INGESTION_CACHE_PATH, chat_model: str = "", embedding_model: str = "", prompt_version: str = ""):
+        self.path = path
+        self.fingerprint = f"{chat_model}\x1f{embedding_model}\x1f{prompt_version}"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Several ingestion workers may share the file: WAL plus a busy timeout.
+        # The connection is used from the worker's pipeline producer thread.
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def key(self, chunk: str) -> str:
+        return hashlib.sha256(f"{self.fingerprint}\x1f{chunk}".encode("utf-8")).hexdigest()
+
+    def get_many(self, chunks: Iterable[str]) -> Dict[str, dict]:
+        """
+        Look up chunks; returns {chunk: {"questions", "content_vector", "questions_vector"}} for hits.
+        """
+        keys = {self.key(chunk): chunk for chunk in chunks}
+        hits = {}
+        key_list = list(keys)
+        for start in range(0, len(key_list), 500):
+            batch = key_list[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT key, questions, content_vector, questions_vector FROM chunks WHERE key IN ({','.join('?' * len(batch))})",
+                batch,
+            ).fetchall()
+            for key, questions, content_vector, questions_vector in rows:
+                hits[keys[key]] = {
+                    "questions": json.loads(questions),
+                    "content_vector": _from_blob(content_vector),
+                    "questions_vector": _from_blob(questions_vector),
+                }
+        if hits:
+            now = time.time()
+            self._conn.executemany("UPDATE chunks SET last_used = ? WHERE key = ?", [(now, self.key(c)) for c in hits])
+            self._conn.commit()
+        return hits
+
+    def put_many(self, entries: Dict[str, dict]):
+        """
+        Store {chunk: {"questions", "content_vector", "questions_vector"}}.
+        """
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO chunks (key, questions, content_vector, questions_vector, created, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (self.key(chunk), json.dumps(entry["questions"], ensure_ascii=False),
+                 _to_blob(entry["content_vector"]), _to_blob(entry.get("questions_vector")), now, now)
+                for chunk, entry in entries.items()
+            ],
+        )
+        self._conn.commit()
+
+    def stats(self) -> Dict[str, object]:
+        count, oldest, newest_use = self._conn.execute("SELECT COUNT(*), MIN(created), MAX(last_used) FROM chunks").fetchone()
+        return {
+            "path": self.path,
+            "entries": count,
+            "size_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            "oldest_entry": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(oldest)) if oldest else None,
+            "last_used": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(newest_use)) if newest_use else None,
+        }
+
+    def prune(self, older_than_days: float) -> int:
+        """
+        Delete entries not used for older_than_days and compact the file.
+        """
+        cutoff = time.time() - older_than_days * 86400
+        deleted = self._conn.execute("DELETE FROM chunks WHERE last_used < ?", (cutoff,)).rowcount
+        self._conn.commit()
+        self._conn.execute("VACUUM")
+        return deleted
+
+    def close(self):
+        self._conn.close()
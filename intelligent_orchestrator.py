@@ -1,38 +1,109 @@
 #region
 
 import os
+import asyncio
 import logging
 from typing import Dict, List, Any, Optional
 from app.session_manager import (
     get_session, update_session, get_chat_history, get_stage, set_stage,
-    update_conversation_context, increment_error_count
+    update_conversation_context, increment_error_count, snapshot_session, restore_session, session_turn
 )
-from .primary_intent_agent import get_primary_intent, Product, validate_user_input
-from .conversation_flow_manager import should_continue_with_current_agent
-from .travel_agent import run_travel_agent
-from .maid_agent import run_maid_agent
-from .payment_agent import run_payment_agent
-from .fallback_system import get_fallback_response, handle_agent_failure, detect_confusion
+from .primary_intent_agent import aget_primary_intent, local_intent, Product, Intent, validate_user_input
+from .conversation_flow_manager import ashould_continue_with_current_agent
+from .travel_agent import arun_travel_agent
+from .maid_agent import arun_maid_agent
+from .payment_agent import arun_payment_agent
+from .fallback_system import get_fallback_response, handle_agent_failure, adetect_confusion
+from .turn_analysis import aanalyze_turn
 from langchain.schema.messages import HumanMessage, AIMessage, SystemMessage
-from app.config import llm
+from app.config import TURN_ANALYSIS_MERGED, SPECULATIVE_ROUTING
+from utils.llm_services import run_sync, get_structured_chain
+from utils.history_renderer import render_history
+from pydantic import BaseModel, Field
 
 logger = logging.getLogger(__name__)
 
+class RecommendationStageIntent(BaseModel):
+    intent: str = Field(..., description="User's intent: 'purchase' (wants to buy/proceed), 'plan_comparison' (wants different/other plans), 'policy_question' (has questions about coverage), or 'other'")
+    confidence: float = Field(..., description="Confidence in classification (0.0 to 1.0)")
+    reasoning: str = Field(..., description="Brief explanation of the classification")
+
+class _Speculation:
+    """
+    A continuation agent call started before the routing decision is known,
+    plus the session snapshot needed to undo its writes if it is discarded.
+    """
+    def __init__(self, product: Product, task: asyncio.Task, snapshot: Dict[str, Any]):
+        self.product = product
+        self.task = task
+        self.snapshot = snapshot
+        self.consumed = False
+        self.discarded = False
+
+def _start_speculation(user_message: str, chat_history: list, session_id: str) -> Optional[_Speculation]:
+    """
+    Start the agent for the session's current product, if it has one.
+    """
+    current_product = get_session(session_id).get("conversation_context", {}).get("primary_product")
+    try:
+        product = Product(current_product.value if hasattr(current_product, "value") else str(current_product).upper())
+    except ValueError:
+        return None
+    if product not in (Product.TRAVEL, Product.MAID):
+        return None
+
+    snapshot = snapshot_session(session_id)
+    intent_result = Intent(product=product, intent="product_inquiry", confidence=1.0)
+    task = asyncio.create_task(aprocess_normal_intent(intent_result, user_message, chat_history, session_id))
+    logger.info(f"🏎️ Speculatively started {product.value} agent for session {session_id}")
+    return _Speculation(product, task, snapshot)
+
+async def _adiscard_speculation(speculation: Optional[_Speculation], session_id: str, reason: str):
+    """
+    Cancel an unused speculative agent call and roll back its session writes.
+    """
+    if speculation is None or speculation.consumed or speculation.discarded:
+        return
+    speculation.discarded = True
+    speculation.task.cancel()
+    await asyncio.gather(speculation.task, return_exceptions=True)
+    restore_session(session_id, speculation.snapshot)
+    logger.info(f"🗑️ Discarded speculative {speculation.product.value} agent call for session {session_id}: {reason}")
+
+async def _aprocess_or_reuse(speculation: Optional[_Speculation], intent_result, user_message: str, chat_history: list, session_id: str) -> str:
+    """
+    Use the speculative agent response when it matches the routed intent,
+    otherwise discard it and run the routed agent.
+    """
+    if (speculation is not None and not speculation.discarded
+            and intent_result.intent == "product_inquiry" and intent_result.product == speculation.product):
+        speculation.consumed = True
+        logger.info(f"⚡ Using speculative {speculation.product.value} agent response for session {session_id}")
+        return await speculation.task
+    await _adiscard_speculation(speculation, session_id, "routed elsewhere")
+    return await aprocess_normal_intent(intent_result, user_message, chat_history, session_id)
+
 def handle_unknown_product_intelligently(user_message: str, chat_history: list, session_id: str) -> str:
     """
     LLM-powered intelligent routing for UNKNOWN product states.
     Uses context and conversation analysis instead of keyword matching.
     """
+    return run_sync(ahandle_unknown_product_intelligently(user_message, chat_history, session_id))
+
+async def ahandle_unknown_product_intelligently(user_message: str, chat_history: list, session_id: str) -> str:
+    """
+    Async variant of handle_unknown_product_intelligently.
+    """
     try:
         # Use the primary intent agent to classify the user's message
-        intent_result = get_primary_intent(user_message, chat_history)
+        intent_result = await aget_primary_intent(user_message, chat_history)
         
         # If a specific product is detected, route to that agent
         if hasattr(intent_result, 'product') and intent_result.product != Product.UNKNOWN:
             if intent_result.product == Product.TRAVEL:
                 logger.info(f"LLM routing to TRAVEL agent for session {session_id}")
                 update_conversation_context(session_id, primary_product=Product.TRAVEL, last_intent="product_inquiry")
-                travel_response = run_travel_agent(user_message, chat_history, session_id)
+                travel_response = await arun_travel_agent(user_message, chat_history, session_id)
                 if isinstance(travel_response, dict):
                     return travel_response.get("output", "I'd be happy to help with travel insurance! 🌍✈️")
                 else:
@@ -41,7 +112,7 @@ def handle_unknown_product_intelligently(user_message: str, chat_history: list,
             elif intent_result.product == Product.MAID:
                 logger.info(f"LLM routing to MAID agent for session {session_id}")
                 update_conversation_context(session_id, primary_product=Product.MAID, last_intent="product_inquiry")
-                maid_response = run_maid_agent(user_message, chat_history, session_id)
+                maid_response = await arun_maid_agent(user_message, chat_history, session_id)
                 if isinstance(maid_response, dict):
                     return maid_response.get("output", "I'd be happy to help with maid insurance! 🏠")
                 else:
@@ -57,7 +128,7 @@ def handle_unknown_product_intelligently(user_message: str, chat_history: list,
                 if collected_info:
                     logger.info(f"LLM routing to PAYMENT agent for session {session_id}")
                     set_stage(session_id, "payment")
-                    payment_response = run_payment_agent(user_message, chat_history)
+                    payment_response = await arun_payment_agent(user_message, chat_history, session_id)
                     if isinstance(payment_response, dict):
                         return payment_response.get("output", "I'll help you with the payment process! 💳")
                     else:
@@ -193,6 +264,8 @@ def orchestrate_chat(user_message: str, session_id: str) -> str:
     Enhanced central router for directing user messages to the appropriate agent with 
     comprehensive error handling and intelligent conversation management.
 
+    Thin synchronous wrapper around aorchestrate_chat().
+
     Args:
         user_message: The message from the user.
         session_id: A unique identifier for the conversation session.
@@ -200,6 +273,28 @@ def orchestrate_chat(user_message: str, session_id: str) -> str:
     Returns:
         The response from the appropriate agent.
     """
+    return run_sync(aorchestrate_chat(user_message, session_id))
+
+async def aorchestrate_chat(user_message: str, session_id: str) -> str:
+    """
+    Async central router. Every LLM and Weaviate call is awaited, so a single
+    worker can keep many conversations in flight while they wait on I/O.
+
+    Args:
+        user_message: The message from the user.
+        session_id: A unique identifier for the conversation session.
+
+    Returns:
+        The response from the appropriate agent.
+    """
+    # The session is loaded once here and written back when the turn ends
+    async with session_turn(session_id):
+        return await _aorchestrate_turn(user_message, session_id)
+
+async def _aorchestrate_turn(user_message: str, session_id: str) -> str:
+    # Speculative work started below; cleaned up however the turn ends
+    speculation = None
+    intent_task = None
     try:
         logger.info(f"Processing message from session {session_id}: {user_message[:100]}...")
         
@@ -221,7 +316,7 @@ def orchestrate_chat(user_message: str, session_id: str) -> str:
         if stage == "payment":
             try:
                 logger.info(f"Processing payment stage message for session {session_id}")
-                response_data = run_payment_agent(user_message, chat_history, session_id)
+                response_data = await arun_payment_agent(user_message, chat_history, session_id)
                 
                 if isinstance(response_data, dict):
                     agent_response = response_data.get("output", "I'm processing your payment information. Please provide your details.")
@@ -240,7 +335,7 @@ def orchestrate_chat(user_message: str, session_id: str) -> str:
                 
         elif stage == "awaiting_product_for_rag":
             logger.info(f"🎯 STAGE HANDLER: Processing 'awaiting_product_for_rag' stage for session {session_id}")
-            product_intent = get_primary_intent(user_message, chat_history)
+            product_intent = await aget_primary_intent(user_message, chat_history)
             
             if hasattr(product_intent, 'product') and product_intent.product != Product.UNKNOWN:
                 # Product has been identified, answer the pending question
@@ -248,8 +343,8 @@ def orchestrate_chat(user_message: str, session_id: str) -> str:
                 pending_question = conversation_context.get("pending_rag_question")
                 if pending_question:
                     logger.info(f"Product '{product_intent.product.value}' identified. Answering pending question: '{pending_question}'")
-                    from .rag_agent import get_rag_response
-                    agent_response = get_rag_response(pending_question, chat_history, product_intent.product.value)
+                    from .rag_agent import aget_rag_response
+                    agent_response = await aget_rag_response(pending_question, chat_history, product_intent.product.value)
                     
                     # Reset stage and clear pending question
                     set_stage(session_id, "initial")
@@ -258,7 +353,7 @@ def orchestrate_chat(user_message: str, session_id: str) -> str:
                     # This case should not happen, but as a fallback, route to the agent
                     logger.warning(f"In 'awaiting_product_for_rag' stage but no pending question found. Routing to agent.")
                     set_stage(session_id, "initial") # Reset stage
-                    agent_response = process_normal_intent(product_intent, user_message, chat_history, session_id)
+                    agent_response = await aprocess_normal_intent(product_intent, user_message, chat_history, session_id)
             else:
                 # Product still not identified, re-prompt
                 logger.info(f"Product still not identified. Re-prompting.")
@@ -269,20 +364,12 @@ def orchestrate_chat(user_message: str, session_id: str) -> str:
             try:
                 logger.info(f"Processing recommendation stage message for session {session_id}")
                 
-                # Use LLM to understand user intent in recommendation stage
-                from pydantic import BaseModel, Field
-                
-                class RecommendationStageIntent(BaseModel):
-                    intent: str = Field(..., description="User's intent: 'purchase' (wants to buy/proceed), 'plan_comparison' (wants different/other plans), 'policy_question' (has questions about coverage), or 'other'")
-                    confidence: float = Field(..., description="Confidence in classification (0.0 to 1.0)")
-                    reasoning: str = Field(..., description="Brief explanation of the classification")
-                
                 # Get current context
                 session = get_session(session_id)
                 current_product = session.get("conversation_context", {}).get("primary_product", "UNKNOWN")
                 
                 # LLM-powered intent classification for recommendation stage
-                intent_chain = llm.with_structured_output(RecommendationStageIntent, method="function_calling")
+                intent_chain = get_structured_chain(RecommendationStageIntent)
                 
                 intent_prompt = [
                     SystemMessage(content=f"""You are analyzing user intent in the recommendation stage of {current_product} insurance conversation.
@@ -296,37 +383,37 @@ The user has just received a plan recommendation with benefits and options to:
 Analyze the user's message and conversation history to determine their intent.
 
 Chat History:
-{chat_history[-6:] if len(chat_history) > 6 else chat_history}"""),
+{render_history(chat_history, max_turns=6)}"""),
                     HumanMessage(content=f"User message: {user_message}")
                 ]
                 
-                intent_result = intent_chain.invoke(intent_prompt)
+                intent_result = await intent_chain.ainvoke(intent_prompt)
                 logger.info(f"Recommendation stage intent: {intent_result.intent} (confidence: {intent_result.confidence})")
                 
                 # Route based on LLM-determined intent
                 if intent_result.intent == "purchase" and intent_result.confidence > 0.6:
                     logger.info(f"User wants to proceed to purchase for session {session_id}")
                     set_stage(session_id, "payment")
-                    agent_response = run_payment_agent(user_message, chat_history, session_id)
+                    agent_response = await arun_payment_agent(user_message, chat_history, session_id)
                     if isinstance(agent_response, dict):
                         agent_response = agent_response.get("output", "Let me help you with the payment process! 💳")
                 
                 elif intent_result.intent == "plan_comparison" and intent_result.confidence > 0.6:
                     logger.info(f"User asking for plan comparison for session {session_id}")
-                    from .rag_agent import get_rag_response
+                    from .rag_agent import aget_rag_response
                     # Use the user's message directly as the query to get specific comparisons
                     query = user_message
                     # Convert product enum to string for collection lookup
                     product_str = current_product.value if hasattr(current_product, 'value') else str(current_product)
-                    agent_response = get_rag_response(query, chat_history, product_str)
+                    agent_response = await aget_rag_response(query, chat_history, product_str)
                     agent_response += "\n\nWould you like to proceed with a different plan or continue with the current recommendation? Or do you have other questions about the coverage?"
                 
                 else:  # policy_question or other - use RAG
                     logger.info(f"User asking question about policy/coverage for session {session_id}")
-                    from .rag_agent import get_rag_response
+                    from .rag_agent import aget_rag_response
                     # Convert product enum to string for collection lookup
                     product_str = current_product.value if hasattr(current_product, 'value') else str(current_product)
-                    agent_response = get_rag_response(user_message, chat_history, product_str)
+                    agent_response = await aget_rag_response(user_message, chat_history, product_str)
                     agent_response += "\n\nDo you have any other questions about the coverage, or would you like to proceed with purchasing this plan?"
                     
             except Exception as e:
@@ -335,8 +422,25 @@ Chat History:
                 
         else:
             # *** ROBUST LLM-POWERED CONVERSATION FLOW ROUTING ***
+            # The fast path and router classify first; only when they defer does
+            # one merged LLM call answer flow, intent and confusion (seeding the
+            # flow manager so the call below does not hit the LLM again)
+            turn_analysis = None
+            # Classified locally up front only when that decides whether to start LLM calls;
+            # otherwise aget_primary_intent runs the local pass itself if it is needed
+            local_checked = bool(chat_history) and (SPECULATIVE_ROUTING or TURN_ANALYSIS_MERGED)
+            local_result = local_intent(user_message, chat_history) if local_checked else None
+            if SPECULATIVE_ROUTING and chat_history:
+                # Run the likely continuation (and, without the merged call, the
+                # intent classification) while the flow decision is pending
+                speculation = _start_speculation(user_message, chat_history, session_id)
+                if not TURN_ANALYSIS_MERGED and local_result is None:
+                    intent_task = asyncio.create_task(aget_primary_intent(user_message, chat_history, local_checked=True))
+            if TURN_ANALYSIS_MERGED and chat_history and local_result is None:
+                turn_analysis = await aanalyze_turn(session_id, user_message, chat_history)
+            
             # Use intelligent conversation flow analysis
-            flow_analysis = should_continue_with_current_agent(session_id, user_message, chat_history)
+            flow_analysis = await ashould_continue_with_current_agent(session_id, user_message, chat_history)
             
             should_continue = flow_analysis["should_continue"]
             flow_confidence = flow_analysis["confidence"]
@@ -368,12 +472,19 @@ Conversation context: The agent just offered help with Travel or Maid insurance.
 Analyze if the user's message indicates a specific product choice.
 
 Chat History:
-{chat_history[-3:] if len(chat_history) > 3 else chat_history}"""),
+{render_history(chat_history, max_turns=3)}"""),
                         HumanMessage(content=f"User message: {user_message}")
                     ]
                     
                     try:
-                        product_intent = get_primary_intent(user_message, chat_history)
+                        if local_result:
+                            product_intent = local_result
+                        elif turn_analysis:
+                            product_intent = turn_analysis.to_intent()
+                        elif intent_task:
+                            product_intent = await intent_task
+                        else:
+                            product_intent = await aget_primary_intent(user_message, chat_history, local_checked=local_checked)
                         if hasattr(product_intent, 'product') and product_intent.product != Product.UNKNOWN:
                             current_product = product_intent.product
                             update_conversation_context(session_id, primary_product=current_product, last_intent="product_inquiry")
@@ -406,12 +517,24 @@ Chat History:
                 product = intent_result.product
                 intent = intent_result.intent
                 
+                if speculation is not None and product != speculation.product:
+                    await _adiscard_speculation(speculation, session_id, f"continuing with {product}")
+                
                 logger.info(f"CONVERSATION CONTINUATION - Product: {product}, Reason: {flow_reason}")
                 
             else:
                 logger.info(f"🆕 NEW CLASSIFICATION for session {session_id}")
+                # The flow decision invalidated the continuation branch
+                await _adiscard_speculation(speculation, session_id, "topic switch")
                 # Classify new message or topic switch
-                intent_result = get_primary_intent(user_message, chat_history)
+                if local_result:
+                    intent_result = local_result
+                elif turn_analysis:
+                    intent_result = turn_analysis.to_intent()
+                elif intent_task:
+                    intent_result = await intent_task
+                else:
+                    intent_result = await aget_primary_intent(user_message, chat_history, local_checked=local_checked)
                 product = intent_result.product
                 intent = intent_result.intent
                 confidence = intent_result.confidence
@@ -435,7 +558,7 @@ Chat History:
                 else:
                     # Continue with normal processing for medium confidence
                     logger.info(f"📝 Calling process_normal_intent for medium confidence")
-                    agent_response = process_normal_intent(intent_result, user_message, chat_history, session_id)
+                    agent_response = await _aprocess_or_reuse(speculation, intent_result, user_message, chat_history, session_id)
             elif intent == "greeting":
                 logger.info(f"👋 GREETING handler for session {session_id}")
                 # Update conversation context
@@ -453,8 +576,8 @@ Chat History:
                 if hasattr(intent_result, 'product') and intent_result.product != Product.UNKNOWN:
                     # Product specified - route to RAG with specific product
                     logger.info(f"Routing informational question to RAG agent for {intent_result.product.value} product")
-                    from .rag_agent import get_rag_response
-                    agent_response = get_rag_response(user_message, chat_history, intent_result.product.value)
+                    from .rag_agent import aget_rag_response
+                    agent_response = await aget_rag_response(user_message, chat_history, intent_result.product.value)
                 else:
                     # Product not specified - set stage and ask user to choose
                     logger.info(f"🎯 MAIN HANDLER: Informational question without product - setting stage to 'awaiting_product_for_rag'")
@@ -468,16 +591,21 @@ Chat History:
                 agent_response = """*Policy/Claim Status Check*\n\nCurrently under development.\n\nWill require NRIC number when available.\n\nCan I help with:\n• Coverage questions\n• Benefits information\n• New insurance purchase"""
             else:
                 # Check for user confusion patterns as fallback
-                confusion_response = detect_confusion(session_id, user_message)
+                confusion_response = await adetect_confusion(
+                    session_id, user_message, analysis=turn_analysis.to_confusion() if turn_analysis else None
+                )
                 if confusion_response:
                     logger.info(f"🤔 CONFUSION detected for session {session_id}")
                     agent_response = confusion_response
                 # *** INTELLIGENT AGENT-BASED ROUTING FOR UNKNOWN PRODUCTS ***
                 # If continuing with UNKNOWN, use intelligent content-based routing
                 elif should_continue and product == Product.UNKNOWN:
-                    agent_response = handle_unknown_product_intelligently(user_message, chat_history, session_id)
+                    agent_response = await ahandle_unknown_product_intelligently(user_message, chat_history, session_id)
                 else:
-                    agent_response = process_normal_intent(intent_result, user_message, chat_history, session_id)
+                    agent_response = await _aprocess_or_reuse(speculation, intent_result, user_message, chat_history, session_id)
+            
+            # Speculative work that ended up unused (e.g. confusion or low confidence)
+            await _adiscard_speculation(speculation, session_id, "not used")
             
             # Update conversation context with current intent
             update_conversation_context(session_id, last_intent=intent, primary_product=product)
@@ -492,6 +620,12 @@ Chat History:
         logger.error(f"Critical error in orchestrate_chat for session {session_id}: {str(e)}")
         error_response = get_fallback_response("general_error", session_id)
         
+        # Roll back speculative writes first, so they do not overwrite the error turn
+        try:
+            await _adiscard_speculation(speculation, session_id, "turn failed")
+        except Exception as discard_error:
+            logger.error(f"Failed to discard speculative call for session {session_id}: {discard_error}")
+
         # Still try to update session even on error
         try:
             update_session(session_id, user_message, error_response)
@@ -499,25 +633,36 @@ Chat History:
             pass  # Don't let session update failure break the response
             
         return error_response
+    finally:
+        # Covers cancellation too; both are no-ops once the turn has used them
+        await _adiscard_speculation(speculation, session_id, "turn ended")
+        if intent_task is not None and not intent_task.done():
+            intent_task.cancel()
 
 def process_normal_intent(intent_result, user_message: str, chat_history: list, session_id: str) -> str:
     """
     Process normal intents with proper error handling and agent routing.
     """
+    return run_sync(aprocess_normal_intent(intent_result, user_message, chat_history, session_id))
+
+async def aprocess_normal_intent(intent_result, user_message: str, chat_history: list, session_id: str) -> str:
+    """
+    Async variant of process_normal_intent.
+    """
     try:
         product = intent_result.product
         intent = intent_result.intent
         
         agent_map = {
-            Product.TRAVEL: run_travel_agent,
-            Product.MAID: run_maid_agent,
+            Product.TRAVEL: arun_travel_agent,
+            Product.MAID: arun_maid_agent,
         }
 
         if intent == "payment_inquiry":
             logger.info(f"Setting session {session_id} to payment stage")
             set_stage(session_id, "payment")
             try:
-                response_data = run_payment_agent(user_message, chat_history)
+                response_data = await arun_payment_agent(user_message, chat_history, session_id)
                 if isinstance(response_data, dict):
                     return response_data.get("output", "Let me help you with the payment process! 💳")
                 else:
@@ -533,11 +678,11 @@ def process_normal_intent(intent_result, user_message: str, chat_history: list,
                 
                 # Pass session_id to agents that support it
                 if product == Product.TRAVEL:
-                    response_data = agent_function(user_message, chat_history, session_id)
+                    response_data = await agent_function(user_message, chat_history, session_id)
                 elif product == Product.MAID:
-                    response_data = agent_function(user_message, chat_history, session_id)
+                    response_data = await agent_function(user_message, chat_history, session_id)
                 else:
-                    response_data = agent_function(user_message, chat_history)
+                    response_data = await agent_function(user_message, chat_history)
                 
                 if isinstance(response_data, dict):
                     return response_data.get("output", f"I'm here to help with {product.value.lower()} insurance! 😊 What specific information do you need?")
@@ -0,0 +1,304 @@
+"""
+Local Intent Router
+===================
+
+Nearest-prototype classifier that sits between input validation and the LLM
+intent chain. Utterances are embedded locally with hashed character n-grams
+(no network call), each (intent, product) label is represented by the
+normalised mean of its example vectors plus the examples themselves, and a
+message is classified with a single matrix-vector product against the
+prototype matrix.
+
+The router only answers when the best label is similar enough and clearly
+ahead of the runner-up, and it always defers to the LLM for negated or
+cancellation requests and for messages naming a product other than the
+routed one; lexical similarity cannot tell "I need travel insurance" from
+"I don't need travel insurance".
+
+The prototype matrix is trained offline and stored as an ``.npz`` file.
+Retrain it from logged LLM decisions with:
+
+    python intent_router.py --logs logs/app.log --output Admin/intent_router.npz
+"""
+
+import os
+import re
+import sys
+import glob
+import json
+import zlib
+import logging
+import argparse
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODEL_PATH = os.path.join(PROJECT_ROOT, "Admin", "intent_router.npz")
+
+EMBEDDING_DIM = 4096
+NGRAM_RANGE = (3, 5)
+LABEL_SEPARATOR = "|"
+# Examples kept as prototypes per label, besides the centroid
+MAX_PROTOTYPES_PER_LABEL = 200
+
+_LOG_LINE_RE = re.compile(r"PRIMARY INTENT AGENT RESULT: (\{.*\})\s*$")
+_WORD_RE = re.compile(r"\w+")
+# Matched against normalised text, where "don't" becomes "don t"
+_NEGATION_RE = re.compile(
+    r"\b(no|not|never|none|nothing|without|instead|\w+n t|dont|doesnt|didnt|wont|cant|cannot|isnt|arent|"
+    r"cancel\w*|terminat\w*|stop\w*|refund\w*|withdraw\w*|unsubscrib\w*|remove|end)\b"
+)
+_PRODUCT_MENTION_RES = {
+    "TRAVEL": re.compile(r"\b(travel\w*|trip|holiday|vacation|flight|overseas)\b"),
+    "MAID": re.compile(r"\b(maid|helper|fdw|domestic)\b"),
+    "CAR": re.compile(r"\b(car|motor|vehicle|auto)\b"),
+    "FAMILY": re.compile(r"\bfamily\b"),
+    "CHOICE": re.compile(r"\bchoice\b"),
+    "EARLY": re.compile(r"\b(early|critical illness)\b"),
+}
+
+# Hand-written examples so the router is usable before any logs are collected
+SEED_EXAMPLES: Dict[Tuple[str, str], List[str]] = {
+    ("greeting", "UNKNOWN"): [
+        "hi", "hello", "hey there", "good morning", "good afternoon", "good evening", "hi hlas", "hello, anyone there?",
+    ],
+    ("product_inquiry", "TRAVEL"): [
+        "i need travel insurance", "travel insurance please", "i want to buy travel insurance",
+        "get a quote for my trip", "insurance for my holiday to japan", "cover for my overseas trip",
+        "i am going on vacation and need insurance", "travel protect360",
+    ],
+    ("product_inquiry", "MAID"): [
+        "i need maid insurance", "maid insurance please", "insurance for my domestic helper",
+        "i want to insure my helper", "fdw insurance", "buy maid cover",
+    ],
+    ("product_inquiry", "CAR"): [
+        "i need car insurance", "motor insurance quote", "insure my vehicle", "car insurance please",
+    ],
+    ("product_inquiry", "FAMILY"): [
+        "family protect", "i want family insurance", "insurance for my family",
+    ],
+    ("product_inquiry", "CHOICE"): [
+        "choice protect", "tell me about choice protect plan", "i want choice protect",
+    ],
+    ("product_inquiry", "EARLY"): [
+        "early protect", "critical illness insurance", "i want critical illness cover",
+    ],
+    ("informational", "TRAVEL"): [
+        "what countries are covered by travel insurance", "is covid covered for travel", "what is trip curtailment on travel insurance",
+        "does travel insurance cover flight delay", "what is the overseas medical coverage for travel",
+        "are pre-existing conditions covered when travelling",
+    ],
+    ("informational", "MAID"): [
+        "what does maid insurance cover", "is the security bond covered", "what is the hospitalisation benefit for my helper",
+        "does maid insurance cover repatriation",
+    ],
+    ("policy_claim_status", "POLICY_CLAIM_STATUS"): [
+        "check my claim status", "what is the status of my policy", "has my claim been approved",
+        "i want to check my policy", "where is my claim",
+    ],
+    ("unwanted", "UNKNOWN"): [
+        "tell me a joke", "what is the weather today", "who won the football match", "write me a poem",
+    ],
+}
+
+def _normalise(text: str) -> str:
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+def embed_text(text: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """
+    Embed a message as an L2-normalised hashed bag of character n-grams and words.
+
+    crc32 is used instead of ``hash`` so vectors are stable across processes.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    normalised = _normalise(text)
+    if not normalised:
+        return vector
+    padded = f" {normalised} "
+    for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+        for i in range(len(padded) - n + 1):
+            vector[zlib.crc32(padded[i:i + n].encode("utf-8")) % dim] += 1.0
+    for word in normalised.split():
+        vector[zlib.crc32(f"w:{word}".encode("utf-8")) % dim] += 2.0
+    np.sqrt(vector, out=vector)  # sublinear term frequency
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+def _guard_reason(normalised: str, product: str) -> Optional[str]:
+    """
+    Why a routed decision must go to the LLM instead, or None.
+    """
+    if _NEGATION_RE.search(normalised):
+        return "negation or cancellation"
+    mentioned = {name for name, pattern in _PRODUCT_MENTION_RES.items() if pattern.search(normalised)}
+    if product in _PRODUCT_MENTION_RES and mentioned - {product}:
+        return f"also mentions {', '.join(sorted(mentioned - {product}))}"
+    if product == "UNKNOWN" and mentioned:
+        return f"mentions {', '.join(sorted(mentioned))}"
+    return None
+
+class IntentRouter:
+    """
+    Nearest-prototype router over (intent, product) labels. ``labels`` has
+    one entry per row of ``centroids``; a label may own several rows.
+    """
+
+    def __init__(self, labels: List[str], centroids: np.ndarray, min_similarity: float = 0.8, min_margin: float = 0.15):
+        self.labels = labels
+        self.centroids = centroids.astype(np.float32)
+        self.dim = self.centroids.shape[1]
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.label_names = sorted(set(labels))
+        index = {label: i for i, label in enumerate(self.label_names)}
+        self._row_labels = np.array([index[label] for label in labels], dtype=np.intp)
+
+    @classmethod
+    def train(cls, examples: Dict[Tuple[str, str], List[str]], dim: int = EMBEDDING_DIM, **kwargs) -> "IntentRouter":
+        """
+        Build prototypes from labelled example utterances: each label's
+        centroid plus up to MAX_PROTOTYPES_PER_LABEL of its examples.
+        """
+        labels = []
+        centroids = []
+        for (intent, product), utterances in sorted(examples.items()):
+            unique = list(dict.fromkeys(_normalise(u) for u in utterances if u and u.strip()))
+            vectors = [embed_text(u, dim) for u in unique if u]
+            if not vectors:
+                continue
+            centroid = np.mean(vectors, axis=0)
+            norm = float(np.linalg.norm(centroid))
+            label = f"{intent}{LABEL_SEPARATOR}{product}"
+            rows = [centroid / norm if norm else centroid] + vectors[:MAX_PROTOTYPES_PER_LABEL]
+            labels.extend([label] * len(rows))
+            centroids.extend(rows)
+        return cls(labels, np.vstack(centroids), **kwargs)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "IntentRouter":
+        with np.load(path, allow_pickle=False) as data:
+            return cls([str(label) for label in data["labels"]], data["centroids"], **kwargs)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez_compressed(path, labels=np.array(self.labels), centroids=self.centroids)
+
+    def classify(self, message: str) -> Optional[Tuple[str, str, float]]:
+        """
+        Return (intent, product, similarity) when the best label is both
+        similar enough and clearly ahead of the runner-up label and no guard
+        applies, otherwise None. The similarity is a cosine score, not a
+        probability.
+        """
+        normalised = _normalise(message)
+        vector = embed_text(normalised, self.dim)
+        if not vector.any():
+            return None
+        # Each label scores as its closest prototype
+        similarities = np.full(len(self.label_names), -1.0, dtype=np.float32)
+        np.maximum.at(similarities, self._row_labels, self.centroids @ vector)
+        if len(similarities) > 1:
+            second, best = np.argpartition(similarities, -2)[-2:]
+            if similarities[second] > similarities[best]:
+                best, second = second, best
+            margin = float(similarities[best] - similarities[second])
+        else:
+            best, margin = 0, 1.0
+        score = float(similarities[best])
+        if score < self.min_similarity or margin < self.min_margin:
+            return None
+        intent, product = self.label_names[best].split(LABEL_SEPARATOR, 1)
+        reason = _guard_reason(normalised, product)
+        if reason:
+            logger.debug(f"Intent router deferring to the LLM ({reason}): {message[:50]}")
+            return None
+        return intent, product, score
+
+_router_instance = None
+_router_loaded = False
+
+def get_intent_router() -> Optional[IntentRouter]:
+    """
+    Get the singleton router, loaded from INTENT_ROUTER_MODEL_PATH or built
+    from the seed examples when no trained model exists yet.
+    """
+    global _router_instance, _router_loaded
+    if not _router_loaded:
+        _router_loaded = True
+        from app.config import INTENT_ROUTER_MODEL_PATH, INTENT_ROUTER_MIN_SIMILARITY, INTENT_ROUTER_MIN_MARGIN
+        kwargs = {"min_similarity": INTENT_ROUTER_MIN_SIMILARITY, "min_margin": INTENT_ROUTER_MIN_MARGIN}
+        try:
+            if os.path.exists(INTENT_ROUTER_MODEL_PATH):
+                _router_instance = IntentRouter.load(INTENT_ROUTER_MODEL_PATH, **kwargs)
+                logger.info(f"Loaded intent router with {len(_router_instance.labels)} prototypes from {INTENT_ROUTER_MODEL_PATH}")
+            else:
+                _router_instance = IntentRouter.train(SEED_EXAMPLES, **kwargs)
+                logger.info(f"No trained intent router at {INTENT_ROUTER_MODEL_PATH}; using {len(_router_instance.labels)} seed prototypes")
+        except Exception as e:
+            logger.error(f"Failed to initialise intent router: {e}")
+            _router_instance = None
+    return _router_instance
+
+def read_logged_decisions(paths: Iterable[str], min_confidence: float) -> Dict[Tuple[str, str], List[str]]:
+    """
+    Collect (intent, product) -> messages from logged LLM intent decisions.
+    """
+    examples: Dict[Tuple[str, str], List[str]] = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                match = _LOG_LINE_RE.search(line)
+                if not match:
+                    continue
+                try:
+                    record = json.loads(match.group(1))
+                except json.JSONDecodeError:
+                    continue
+                message = record.get("message")
+                if not message or record.get("confidence", 0.0) < min_confidence:
+                    continue
+                key = (record.get("intent", "unwanted"), record.get("product", "UNKNOWN"))
+                examples.setdefault(key, []).append(message)
+    return examples
+
+def main():
+    """
+    Retrain the prototype matrix from logged decisions.
+    """
+    parser = argparse.ArgumentParser(description="Train the local intent router from logged LLM intent decisions.")
+    parser.add_argument("--logs", nargs="+", required=True, help="Log files or glob patterns containing 'PRIMARY INTENT AGENT RESULT' lines")
+    parser.add_argument("--output", default=DEFAULT_MODEL_PATH, help="Where to write the prototype .npz file")
+    parser.add_argument("--min-confidence", type=float, default=0.8, help="Ignore logged decisions below this LLM confidence")
+    parser.add_argument("--min-examples", type=int, default=3, help="Skip labels with fewer logged examples than this")
+    parser.add_argument("--no-seed", action="store_true", help="Do not include the built-in seed examples")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    paths = sorted({p for pattern in args.logs for p in glob.glob(pattern)})
+    if not paths:
+        logger.error(f"No log files matched: {args.logs}")
+        sys.exit(1)
+
+    logged = read_logged_decisions(paths, args.min_confidence)
+    examples: Dict[Tuple[str, str], List[str]] = {} if args.no_seed else {k: list(v) for k, v in SEED_EXAMPLES.items()}
+    for key, messages in logged.items():
+        if len(messages) < args.min_examples:
+            logger.info(f"Skipping {key}: only {len(messages)} logged example(s)")
+            continue
+        # De-duplicate so a few very common messages do not dominate the centroid
+        examples.setdefault(key, []).extend(dict.fromkeys(messages))
+
+    router = IntentRouter.train(examples)
+    router.save(args.output)
+
+    logger.info(f"Read {sum(len(v) for v in logged.values())} logged decisions from {len(paths)} file(s)")
+    for label in router.label_names:
+        intent, product = label.split(LABEL_SEPARATOR, 1)
+        logger.info(f"  {label}: {len(examples[(intent, product)])} examples")
+    logger.info(f"Saved {len(router.labels)} prototypes for {len(router.label_names)} labels to {args.output}")
+
+if __name__ == "__main__":
+    main()
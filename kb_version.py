@@ -0,0 +1,89 @@
+"""
+Knowledge Base Version Marker
+=============================
+
+The ingestion scripts run in a separate process from the bot, so they record
+each re-ingest in a small JSON marker file (``{product: version}``). Caches
+derived from the knowledge base include the product's version in their keys
+and treat a change as invalidation.
+
+Product names are upper-cased on both sides, so the ingestion folder name
+("Travel") and the routing enum value ("TRAVEL") share one version.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KB_VERSION_FILE = os.getenv("KB_VERSION_FILE", os.path.join(PROJECT_ROOT, "Admin", "kb_version.json"))
+
+# How often readers re-stat the marker file
+CHECK_INTERVAL_SECONDS = 5.0
+
+_versions: Dict[str, str] = {}
+_mtime = None
+_last_check = 0.0
+_lock = threading.Lock()
+
+def _product_key(product) -> str:
+    return str(getattr(product, "value", product) or "").strip().upper()
+
+def _load_versions() -> Dict[str, str]:
+    try:
+        with open(KB_VERSION_FILE, "r", encoding="utf-8") as f:
+            versions = json.load(f)
+        # Markers written before keys were normalised may hold "Travel"; keep the newest per product
+        normalised: Dict[str, str] = {}
+        for product, version in versions.items():
+            key = _product_key(product)
+            if int(version) > int(normalised.get(key, "0")):
+                normalised[key] = str(version)
+        return normalised
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f"Could not read knowledge base version file {KB_VERSION_FILE}: {e}")
+        return {}
+
+def get_kb_version(product: str) -> str:
+    """
+    Return the current knowledge base version for a product ("0" if never bumped).
+    """
+    global _versions, _mtime, _last_check
+    now = time.monotonic()
+    if now - _last_check >= CHECK_INTERVAL_SECONDS:
+        with _lock:
+            if now - _last_check >= CHECK_INTERVAL_SECONDS:
+                _last_check = now
+                try:
+                    mtime = os.stat(KB_VERSION_FILE).st_mtime_ns
+                except OSError:
+                    mtime = None
+                if mtime != _mtime:
+                    _mtime = mtime
+                    _versions = _load_versions()
+    return str(_versions.get(_product_key(product), "0"))
+
+def bump_kb_version(product: str) -> str:
+    """
+    Record that a product was re-ingested. Called by the ingestion scripts.
+    """
+    global _last_check
+    with _lock:
+        versions = _load_versions()
+        version = str(time.time_ns())
+        versions[_product_key(product)] = version
+        os.makedirs(os.path.dirname(KB_VERSION_FILE), exist_ok=True)
+        tmp_path = f"{KB_VERSION_FILE}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(versions, f, indent=2)
+        os.replace(tmp_path, KB_VERSION_FILE)
+        _last_check = 0.0
+    logger.info(f"Knowledge base version for {product} bumped to {version}")
+    return version
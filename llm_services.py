@@ -1,5 +1,7 @@
 import os
+import asyncio
 import logging
+import threading
 from dotenv import load_dotenv
 from langchain_openai import AzureChatOpenAI
 from langchain_openai import AzureOpenAIEmbeddings
@@ -13,6 +15,16 @@ logger = logging.getLogger(__name__)
 _llm_instance = None
 _embedding_model_instance = None
 
+# Structured-output chains, built once per (schema, method)
+_structured_chains = {}
+_structured_chains_lock = threading.Lock()
+
+# Background event loop used to drive async agents from synchronous callers
+_sync_loop = None
+_sync_loop_lock = threading.Lock()
+# The serving application's loop; when set, it replaces the background loop
+_app_loop = None
+
 def get_llm():
     """
     Get a singleton instance of the AzureChatOpenAI LLM.
@@ -53,6 +65,84 @@ def get_embedding_model():
             raise
     return _embedding_model_instance
 
+def get_structured_chain(schema, method: str = "function_calling"):
+    """
+    Get the cached ``llm.with_structured_output(schema, method=method)`` runnable.
+
+    Building the chain converts the pydantic schema to a tool/JSON definition,
+    so it is done once per (schema, method) instead of on every turn.
+    """
+    key = (schema, method)
+    chain = _structured_chains.get(key)
+    if chain is None:
+        with _structured_chains_lock:
+            chain = _structured_chains.get(key)
+            if chain is None:
+                chain = get_llm().with_structured_output(schema, method=method)
+                _structured_chains[key] = chain
+                logger.debug(f"Built structured-output chain for {schema.__name__} ({method})")
+    return chain
+
+def use_app_loop(loop: asyncio.AbstractEventLoop = None):
+    """
+    Run synchronous entry points on the application's event loop instead of
+    a private background loop. Call it from the app's startup hook.
+
+    The async LLM, Weaviate and Redis clients bind to the loop they are first
+    used on, so a process that serves on one loop must not drive agents from
+    a second one.
+    """
+    global _app_loop
+    _app_loop = loop or asyncio.get_running_loop()
+    logger.info("Synchronous agent calls now run on the application event loop.")
+
+def _get_sync_loop() -> asyncio.AbstractEventLoop:
+    """
+    Get the loop used by run_sync(): the application's loop while it is
+    running, otherwise a background loop started on first use.
+    """
+    global _sync_loop
+    if _app_loop is not None and _app_loop.is_running():
+        return _app_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_sync_loop.run_forever, name="agents-sync-loop", daemon=True)
+            thread.start()
+            logger.info("Started background event loop for synchronous agent calls.")
+    return _sync_loop
+
+def run_sync(coro):
+    """
+    Run an agent coroutine to completion from synchronous code.
+
+    All synchronous calls share one long-lived loop (the application's loop
+    once use_app_loop() was called, otherwise a background loop), so async
+    clients (LLM, Weaviate) that bind to the loop they were first used on stay
+    valid between calls. From inside a running event loop, await the async
+    variant instead; calling this there would block the loop and is rejected.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run_coroutine_threadsafe(coro, _get_sync_loop()).result()
+    coro.close()
+    raise RuntimeError("run_sync() cannot be used inside a running event loop; await the async variant instead.")
+
+def submit_background(coro):
+    """
+    Schedule a coroutine without waiting for it.
+
+    Inside a running event loop it becomes a task on that loop; from synchronous
+    code it runs on the run_sync() loop. Returns the task/future so
+    callers can keep a reference until it finishes.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run_coroutine_threadsafe(coro, _get_sync_loop())
+    return loop.create_task(coro)
+
 # Initialize the models at startup
 llm = get_llm()
 embedding_model = get_embedding_model()
\ No newline at end of file
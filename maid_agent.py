@@ -6,7 +6,6 @@ from dotenv import load_dotenv
 from pydantic import BaseModel, Field, validator
 from typing import List, Type, Optional
 
-from app.config import llm
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.tools import tool
 from langchain.tools import Tool
@@ -20,7 +19,8 @@ logger = logging.getLogger(__name__)
 
 
 from app.session_manager import get_session, update_session
-from utils.llm_services import llm
+from utils.llm_services import run_sync, get_structured_chain
+from utils.history_renderer import render_history
 from langchain_core.messages import HumanMessage, SystemMessage
 from pydantic import BaseModel, Field
 import json
@@ -35,6 +35,12 @@ def run_maid_agent(user_message: str, chat_history: list, session_id: str):
     """
     Handles the conversation for maid insurance inquiries using an LLM.
     """
+    return run_sync(arun_maid_agent(user_message, chat_history, session_id))
+
+async def arun_maid_agent(user_message: str, chat_history: list, session_id: str):
+    """
+    Async variant of run_maid_agent.
+    """
     session = get_session(session_id)
     collected_info = session.get("collected_info", {})
     
@@ -42,14 +48,15 @@ def run_maid_agent(user_message: str, chat_history: list, session_id: str):
     required_info = ["contract_duration", "personal_accident_coverage"]
     
     # Use an LLM to have a conversation and collect the information
-    chain = llm.with_structured_output(MaidInfo, method="function_calling")
+    chain = get_structured_chain(MaidInfo)
     
     prompt = [
         SystemMessage(
             content=f"""You are a friendly and helpful maid insurance assistant. Your goal is to collect the following information from the user: {', '.join(required_info)}.
 
 Current collected information: {collected_info}
-Conversation history: {chat_history}
+Conversation history:
+{render_history(chat_history, summary=session.get("conversation_summary"))}
 
 IMPORTANT EXTRACTION RULES:
 - If user just says a number (like "12", "24", "36") when you asked about contract duration, extract it as contract_duration (in months)
@@ -62,7 +69,7 @@ Ask for the next piece of information in a conversational way. If the user provi
         HumanMessage(content=user_message),
     ]
     
-    response = chain.invoke(prompt)
+    response = await chain.ainvoke(prompt)
     
     # Update the collected information
     for key, value in response.model_dump().items():
@@ -85,11 +92,11 @@ Ask for the next piece of information in a conversational way. If the user provi
         
         # Automatically move to recommendation flow
         try:
-            from .recommendation_agent import get_recommendation
-            from .rec_retriever_agent import get_recommendation_message
+            from .recommendation_agent import aget_recommendation
+            from .rec_retriever_agent import aget_recommendation_message
             
             # Get AI recommendation
-            recommendation = get_recommendation(session_id, "MAID")
+            recommendation = await aget_recommendation(session_id, "MAID")
             
             plan_tier = recommendation.get("plan", "Standard")
             
@@ -98,7 +105,7 @@ Ask for the next piece of information in a conversational way. If the user provi
             update_conversation_context(session_id, recommended_plan=plan_tier)
             
             # Get comprehensive recommendation message with benefits
-            recommendation_message = get_recommendation_message("MAID", plan_tier)
+            recommendation_message = await aget_recommendation_message("MAID", plan_tier)
             
             # Add purchase guidance to the recommendation
             recommendation_message += "\n\n" + """**What's Next?**
@@ -1,6 +1,7 @@
 import logging
 import sys
 import os
+import asyncio
 from fastapi import FastAPI
 
 # Configure logging at the very beginning
@@ -10,10 +11,18 @@ from pydantic import BaseModel
 # Add the root directory of the Bot project to the system path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from agents.intelligent_orchestrator import orchestrate_chat
+from agents.intelligent_orchestrator import aorchestrate_chat
+from utils.weaviate_client import close_async_weaviate_client
+from utils.llm_services import use_app_loop
+from app.session_manager import start_session_expiry, stop_session_expiry
+from app.config import REC_CACHE_WARM_ON_STARTUP
+from agents.rec_retriever_agent import awarm_recommendation_cache
 
 app = FastAPI()
 
+# Background startup jobs, kept referenced until they finish
+_background_tasks = set()
+
 class ChatRequest(BaseModel):
     session_id: str
     message: str
@@ -23,10 +32,34 @@ def health_check():
     return {"status": "ok"}
 
 @app.post("/chat")
-def chat(request: ChatRequest):
-    agent_response = orchestrate_chat(request.message, request.session_id)
+async def chat(request: ChatRequest):
+    agent_response = await aorchestrate_chat(request.message, request.session_id)
     return {"response": agent_response}
 
+@app.on_event("startup")
+async def startup():
+    """
+    Start background workers.
+    """
+    # Sync endpoints and helpers share this loop's async clients
+    use_app_loop()
+    await whatsapp_handler.start()
+    start_session_expiry()
+    if REC_CACHE_WARM_ON_STARTUP:
+        # Warm in the background so the app starts serving immediately
+        task = asyncio.create_task(awarm_recommendation_cache())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+@app.on_event("shutdown")
+async def shutdown():
+    """
+    Drain background workers and release shared async clients on shutdown.
+    """
+    await whatsapp_handler.shutdown()
+    await stop_session_expiry()
+    await close_async_weaviate_client()
+
 from fastapi import Request, Response
 from utils.whatsapp_handler import whatsapp_handler
 import os
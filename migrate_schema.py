@@ -9,17 +9,47 @@ This script will:
 2. Copy all existing data to the new collection with empty possible_queries
 3. Replace the old collection with the new one
 
+Objects are streamed with a cursor and written in fixed-size batches that keep
+their uuids and named vectors. Progress is checkpointed to a JSON file after
+every page, so an interrupted run resumes where it stopped (re-copying a
+partially written page is harmless because uuids are preserved). The original
+collection is only deleted once the copy's object count has been verified.
+
+Blue/green mode (--blue-green) never takes the live data offline: it copies
+into a new versioned collection (<name>_vN), validates it (object counts,
+vector self-queries on a sample, keyword sample queries) and then repoints
+the <name> alias that the bot reads through. Previous versions are kept for
+--rollback.
+
+The first blue/green run converts the plain <name> collection into an alias.
+The collection is copied unchanged into <name>_v1 and validated. It is then
+deleted and the alias created, pointing at the copy. Reads through <name>
+fail for the moment between the delete and the alias creation, so run it in a
+quiet period. This switch-over cannot be undone with --rollback; <name>_v1
+is what a later rollback returns to.
+
 Usage:
-    python migrate_schema.py
+    python migrate_schema.py [--batch-size 500] [--concurrency 4] [--restart]
+    python migrate_schema.py --blue-green [--keep-versions 2] [--sample-query "..."]
+    python migrate_schema.py --blue-green --index-profile hnsw_sq [--ef 128] [--max-connections 32]
+    python migrate_schema.py --rollback
 """
 
 import os
+import re
 import sys
+import json
+import time
 import logging
+import argparse
 from dotenv import load_dotenv
 import weaviate
 from weaviate.classes.config import Property, DataType
-from weaviate.classes.query import Filter
+from weaviate.classes.query import Filter, MetadataQuery
+
+# Add the project root to the Python path for the shared index profiles
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.vector_index_profiles import INDEX_PROFILES, vector_index_dict
 
 # Load environment variables
 load_dotenv()
@@ -28,6 +58,38 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+DEFAULT_CHECKPOINT_PATH = "migrate_schema_checkpoint.json"
+# Objects copied between checkpoints (each page is flushed before its checkpoint is written)
+CHECKPOINT_EVERY = 5000
+
+# Keyword queries that must still return results from a blue/green candidate
+DEFAULT_SAMPLE_QUERIES = ["travel insurance coverage", "maid insurance benefits", "how do I make a claim"]
+# Objects whose vectors are queried back against a blue/green candidate
+VALIDATION_SAMPLE_SIZE = 20
+
+# Properties the migrated collection must have, added if the source lacks them
+NEW_SCHEMA_PROPERTIES = [
+    Property(name="product_name", data_type=DataType.TEXT, description="Name of the insurance product"),
+    Property(name="document_type", data_type=DataType.TEXT, description="Type of document (Policy, FAQ, Benefits)"),
+    Property(name="source_file", data_type=DataType.TEXT, description="Source file path"),
+    Property(name="content", data_type=DataType.TEXT, description="Content of the chunk"),
+    Property(name="possible_queries", data_type=DataType.TEXT_ARRAY, description="List of possible user queries this chunk can answer"),
+    Property(name="section_hierarchy", data_type=DataType.TEXT_ARRAY, description="Hierarchical section path"),
+    Property(name="question", data_type=DataType.TEXT, description="Question for FAQ chunks"),
+    Property(name="chunk_id", data_type=DataType.TEXT, description="Unique chunk identifier"),
+    # Product metadata
+    Property(name="product_category", data_type=DataType.TEXT, description="Category of the insurance product"),
+    Property(name="all_products", data_type=DataType.TEXT_ARRAY, description="List of all available products"),
+    # Product flags for easy filtering
+    Property(name="is_car_product", data_type=DataType.BOOL, description="True if this is Car insurance content"),
+    Property(name="is_early_product", data_type=DataType.BOOL, description="True if this is Early insurance content"),
+    Property(name="is_family_product", data_type=DataType.BOOL, description="True if this is Family insurance content"),
+    Property(name="is_home_product", data_type=DataType.BOOL, description="True if this is Home insurance content"),
+    Property(name="is_hospital_product", data_type=DataType.BOOL, description="True if this is Hospital insurance content"),
+    Property(name="is_maid_product", data_type=DataType.BOOL, description="True if this is Maid insurance content"),
+    Property(name="is_travel_product", data_type=DataType.BOOL, description="True if this is Travel insurance content")
+]
+
 def get_weaviate_client():
     """Get Weaviate client"""
     url = os.getenv("WEAVIATE_URL")
@@ -39,10 +101,10 @@ def get_weaviate_client():
     host = parsed_url.hostname
     port = parsed_url.port
     scheme = parsed_url.scheme
-
+    
     if not host or not port or not scheme:
         raise ValueError("Invalid WEAVIATE_URL format")
-
+    
     return weaviate.connect_to_custom(
         http_host=host,
         http_port=port,
@@ -52,106 +114,347 @@ def get_weaviate_client():
         grpc_secure=False
     )
 
-def create_new_collection(client, collection_name):
-    """Create new collection with possible_queries field"""
-    new_collection_name = f"{collection_name}_new"
+def create_new_collection(client, collection_name, target_name=None, index_profile=None, **index_tuning):
+    """
+    Create a collection with the new schema. The source collection's
+    configuration (named vectors, vector index, vectorizer) is cloned and any
+    missing properties are added. With index_profile, only the named vectors'
+    index settings are swapped for that vector index profile; properties
+    (tokenization, inverted indexes) and the vectorizers are kept.
+    """
+    new_collection_name = target_name or f"{collection_name}_new"
     
     logger.info(f"Creating new collection: {new_collection_name}")
     
-    client.collections.create(
-        name=new_collection_name,
-        description="Insurance product content chunks with metadata and possible queries",
-        properties=[
-            Property(name="product_name", data_type=DataType.TEXT, description="Name of the insurance product"),
-            Property(name="document_type", data_type=DataType.TEXT, description="Type of document (Policy, FAQ, Benefits)"),
-            Property(name="source_file", data_type=DataType.TEXT, description="Source file path"),
-            Property(name="content", data_type=DataType.TEXT, description="Content of the chunk"),
-            Property(name="possible_queries", data_type=DataType.TEXT_ARRAY, description="List of possible user queries this chunk can answer"),
-            Property(name="section_hierarchy", data_type=DataType.TEXT_ARRAY, description="Hierarchical section path"),
-            Property(name="question", data_type=DataType.TEXT, description="Question for FAQ chunks"),
-            Property(name="chunk_id", data_type=DataType.TEXT, description="Unique chunk identifier"),
-            # Product metadata
-            Property(name="product_category", data_type=DataType.TEXT, description="Category of the insurance product"),
-            Property(name="all_products", data_type=DataType.TEXT_ARRAY, description="List of all available products"),
-            # Product flags for easy filtering
-            Property(name="is_car_product", data_type=DataType.BOOL, description="True if this is Car insurance content"),
-            Property(name="is_early_product", data_type=DataType.BOOL, description="True if this is Early insurance content"),
-            Property(name="is_family_product", data_type=DataType.BOOL, description="True if this is Family insurance content"),
-            Property(name="is_home_product", data_type=DataType.BOOL, description="True if this is Home insurance content"),
-            Property(name="is_hospital_product", data_type=DataType.BOOL, description="True if this is Hospital insurance content"),
-            Property(name="is_maid_product", data_type=DataType.BOOL, description="True if this is Maid insurance content"),
-            Property(name="is_travel_product", data_type=DataType.BOOL, description="True if this is Travel insurance content")
-        ],
-    )
+    config = client.collections.get(collection_name).config.get().to_dict()
+    config["class"] = new_collection_name
+    config["description"] = "Insurance product content chunks with metadata and possible queries"
+    if index_profile:
+        logger.info(f"Using vector index profile '{index_profile}' for {new_collection_name}")
+        index = vector_index_dict(index_profile, **index_tuning)
+        if config.get("vectorConfig"):
+            for vector in config["vectorConfig"].values():
+                vector.update(index)
+        else:
+            config.update(index)
+    client.collections.create_from_dict(config)
+    existing = {prop.get("name") for prop in config.get("properties", [])}
+    
+    new_collection = client.collections.get(new_collection_name)
+    for prop in NEW_SCHEMA_PROPERTIES:
+        if prop.name not in existing:
+            new_collection.config.add_property(prop)
     
     logger.info(f"Created new collection: {new_collection_name}")
     return new_collection_name
 
-def migrate_data(client, old_collection_name, new_collection_name):
+def count_objects(client, collection_name):
+    """Total number of objects in a collection."""
+    return client.collections.get(collection_name).aggregate.over_all(total_count=True).total_count
+
+def load_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+def save_checkpoint(path, checkpoint):
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, path)
+
+def _object_vector(obj):
+    """Vector in the shape batch.add_object expects (dict of named vectors, or a list for the default vector)."""
+    vector = obj.vector
+    if isinstance(vector, dict) and set(vector) == {"default"}:
+        return vector["default"]
+    return vector or None
+
+def copy_objects(client, source_name, target_name, transform=None, checkpoint=None, checkpoint_path=None,
+                 batch_size=500, concurrency=4):
+    """
+    Stream every object from source to target, preserving uuids and vectors.
+
+    Pages of CHECKPOINT_EVERY objects are written through a fixed-size batch.
+    After each page the batch is flushed, any failure aborts the copy, and the
+    last copied uuid is checkpointed so a rerun resumes after it.
+    """
+    checkpoint = checkpoint if checkpoint is not None else {}
+    source = client.collections.get(source_name)
+    target = client.collections.get(target_name)
+    after = checkpoint.get("last_uuid")
+    copied = checkpoint.get("copied", 0)
+    total = count_objects(client, source_name)
+    if after:
+        logger.info(f"Resuming copy {source_name} -> {target_name} after {after} ({copied} already copied)")
+    
+    objects = iter(source.iterator(include_vector=True, after=after, cache_size=1000))
+    while True:
+        page_started = time.monotonic()
+        page_last = None
+        page_count = 0
+        with target.batch.fixed_size(batch_size=batch_size, concurrent_requests=concurrency) as batch:
+            for obj in objects:
+                properties = dict(obj.properties)
+                if transform:
+                    properties = transform(properties)
+                batch.add_object(properties=properties, uuid=obj.uuid, vector=_object_vector(obj))
+                page_last = str(obj.uuid)
+                page_count += 1
+                if page_count >= CHECKPOINT_EVERY:
+                    break
+    
+        failed = target.batch.failed_objects
+        if failed:
+            for failed_obj in failed[:10]:
+                logger.error(f"Failed object: {failed_obj}")
+            raise RuntimeError(f"{len(failed)} objects failed to copy to {target_name}; rerun to resume from the last checkpoint")
+    
+        if page_count == 0:
+            break
+        copied += page_count
+        checkpoint.update({"last_uuid": page_last, "copied": copied})
+        save_checkpoint(checkpoint_path, checkpoint)
+        elapsed = time.monotonic() - page_started
+        logger.info(f"Copied {copied}/{total} objects to {target_name} ({page_count / elapsed if elapsed else 0:.0f} objects/s)")
+        if page_count < CHECKPOINT_EVERY:
+            break
+    
+    target_count = count_objects(client, target_name)
+    if target_count < total:
+        raise RuntimeError(f"Copy verification failed: {target_name} has {target_count} objects, {source_name} has {total}")
+    logger.info(f"Verified {target_count} objects in {target_name}")
+    return target_count
+
+def _add_possible_queries(properties):
+    # Add empty possible_queries field
+    properties.setdefault("possible_queries", [])
+    return properties
+
+def migrate_data(client, old_collection_name, new_collection_name, checkpoint=None, checkpoint_path=None, **batch_options):
     """Migrate data from old collection to new collection"""
     logger.info(f"Migrating data from {old_collection_name} to {new_collection_name}")
     
-    old_collection = client.collections.get(old_collection_name)
-    new_collection = client.collections.get(new_collection_name)
-    
-    # Get all objects from old collection
-    result = old_collection.query.fetch_objects(limit=10000)  # Adjust limit as needed
-    
-    migrated_count = 0
-    for obj in result.objects:
-        # Get properties and vector
-        properties = obj.properties
-        vector = obj.vector
-        
-        # Add empty possible_queries field
-        properties["possible_queries"] = []
-        
-        # Insert into new collection
-        new_collection.data.insert(
-            properties=properties,
-            vector=vector
-        )
-        migrated_count += 1
-        
-        if migrated_count % 100 == 0:
-            logger.info(f"Migrated {migrated_count} objects...")
+    migrated_count = copy_objects(
+        client, old_collection_name, new_collection_name, transform=_add_possible_queries,
+        checkpoint=checkpoint, checkpoint_path=checkpoint_path, **batch_options
+    )
     
     logger.info(f"Successfully migrated {migrated_count} objects")
     return migrated_count
 
-def replace_collection(client, old_collection_name, new_collection_name):
+def replace_collection(client, old_collection_name, new_collection_name, checkpoint=None, checkpoint_path=None, **batch_options):
     """Replace old collection with new collection"""
+    checkpoint = checkpoint if checkpoint is not None else {}
     backup_name = f"{old_collection_name}_backup"
     
     logger.info(f"Renaming {old_collection_name} to {backup_name}")
     # Note: Weaviate doesn't support renaming, so we'll delete the old one
     # In production, you might want to keep a backup
     
-    logger.info(f"Deleting old collection: {old_collection_name}")
-    client.collections.delete(old_collection_name)
+    if checkpoint.get("phase") != "copy_back":
+        # Recorded before the delete, so a rerun never looks for the original collection again
+        checkpoint.update({"phase": "copy_back", "last_uuid": None, "copied": 0})
+        save_checkpoint(checkpoint_path, checkpoint)
     
-    logger.info(f"Creating final collection: {old_collection_name}")
-    # Create the final collection with the original name
-    create_new_collection(client, old_collection_name.replace("_new", ""))
+    if not checkpoint.get("last_uuid") and client.collections.exists(old_collection_name):
+        # The original, or a final collection no page has been checkpointed into yet;
+        # either way the verified copy in the new collection is what gets copied back
+        logger.info(f"Deleting old collection: {old_collection_name}")
+        client.collections.delete(old_collection_name)
     
-    # Migrate data from new collection to final collection
-    final_collection = client.collections.get(old_collection_name)
-    temp_collection = client.collections.get(new_collection_name)
+    if not client.collections.exists(old_collection_name):
+        logger.info(f"Creating final collection: {old_collection_name}")
+        # Create the final collection with the original name
+        create_new_collection(client, new_collection_name, target_name=old_collection_name)
     
-    result = temp_collection.query.fetch_objects(limit=10000)
-    for obj in result.objects:
-        final_collection.data.insert(
-            properties=obj.properties,
-            vector=obj.vector
-        )
+    # Migrate data from new collection to final collection
+    copy_objects(client, new_collection_name, old_collection_name,
+                 checkpoint=checkpoint, checkpoint_path=checkpoint_path, **batch_options)
     
     # Delete temporary collection
     client.collections.delete(new_collection_name)
     
     logger.info("Schema migration completed successfully!")
 
+def resolve_alias(client, alias_name):
+    """Collection an alias points at, or None if there is no such alias."""
+    try:
+        alias = client.alias.get(alias_name=alias_name)
+    except Exception:
+        return None
+    return alias.collection if alias else None
+
+def list_versions(client, base_name):
+    """Versioned collections for a base name, as {version: collection_name} in version order."""
+    pattern = re.compile(rf"{re.escape(base_name)}_v(\d+)")
+    versions = {}
+    for name in client.collections.list_all(simple=True):
+        match = pattern.fullmatch(name)
+        if match:
+            versions[int(match.group(1))] = name
+    return dict(sorted(versions.items()))
+
+def validate_collection(client, live_name, candidate_name, sample_queries):
+    """
+    Check that a candidate collection can replace the live one: it holds at
+    least as many objects, sampled objects are their own nearest neighbour on
+    every named vector, and keyword sample queries still return results.
+    """
+    live = client.collections.get(live_name)
+    candidate = client.collections.get(candidate_name)
+
+    live_count = count_objects(client, live_name)
+    candidate_count = count_objects(client, candidate_name)
+    if candidate_count < live_count:
+        logger.error(f"Validation failed: {candidate_name} has {candidate_count} objects, {live_name} has {live_count}")
+        return False
+
+    sample = candidate.query.fetch_objects(limit=VALIDATION_SAMPLE_SIZE, include_vector=True)
+    for obj in sample.objects:
+        for vector_name, vector in (obj.vector or {}).items():
+            response = candidate.query.near_vector(
+                near_vector=vector,
+                target_vector=None if vector_name == "default" else vector_name,
+                limit=1,
+                return_metadata=MetadataQuery(distance=True),
+            )
+            if not response.objects or response.objects[0].metadata.distance > 1e-3:
+                logger.error(f"Validation failed: object {obj.uuid} is not found by its own {vector_name}")
+                return False
+
+    for query in sample_queries:
+        live_hits = len(live.query.bm25(query=query, limit=5).objects)
+        candidate_hits = len(candidate.query.bm25(query=query, limit=5).objects)
+        logger.info(f"Sample query '{query}': {live_hits} live hits, {candidate_hits} candidate hits")
+        if live_hits and not candidate_hits:
+            logger.error(f"Validation failed: '{query}' returns nothing from {candidate_name}")
+            return False
+
+    logger.info(f"Validated {candidate_name}: {candidate_count} objects, {len(sample.objects)} vector samples, {len(sample_queries)} sample queries")
+    return True
+
+def point_alias(client, alias_name, target_name):
+    """Atomically repoint the alias readers use."""
+    if resolve_alias(client, alias_name) is None:
+        raise ValueError(f"{alias_name} is not an alias; run --blue-green to convert the collection first")
+    client.alias.update(alias_name=alias_name, new_target_collection=target_name)
+    logger.info(f"Alias {alias_name} now points at {target_name}")
+
+def bootstrap_alias(client, alias_name, sample_queries, checkpoint=None, checkpoint_path=None, **batch_options):
+    """
+    One-time switch-over from a plain collection to an alias: copy the
+    collection unchanged into <alias>_v1, validate the copy, then replace the
+    collection with an alias pointing at it. Resumable from its checkpoint,
+    but not reversible: once the plain collection is deleted, <alias>_v1 is
+    the oldest version --rollback can return to.
+    """
+    checkpoint = checkpoint if checkpoint is not None else {}
+    target_name = f"{alias_name}_v1"
+    resuming = checkpoint.get("phase") == "bootstrap" and client.collections.exists(target_name)
+
+    if client.collections.exists(alias_name):
+        if not resuming:
+            if client.collections.exists(target_name):
+                raise ValueError(f"{target_name} already exists; inspect or delete it before converting {alias_name} to an alias")
+            create_new_collection(client, alias_name, target_name=target_name)
+            checkpoint.clear()
+            checkpoint.update({"collection": alias_name, "phase": "bootstrap", "target": target_name, "last_uuid": None, "copied": 0})
+            save_checkpoint(checkpoint_path, checkpoint)
+
+        logger.info(f"Alias switch-over: copying {alias_name} into {target_name}")
+        copy_objects(client, alias_name, target_name, checkpoint=checkpoint, checkpoint_path=checkpoint_path, **batch_options)
+        if not validate_collection(client, alias_name, target_name, sample_queries):
+            raise RuntimeError(f"{target_name} failed validation; {alias_name} is unchanged")
+
+        logger.warning(f"Replacing collection {alias_name} with an alias to {target_name} (one-time switch-over, cannot be rolled back)")
+        client.collections.delete(alias_name)
+    elif not resuming:
+        raise ValueError(f"Neither a collection nor an alias named {alias_name} exists")
+
+    # Resuming after the delete only has the alias left to create
+    client.alias.create(alias_name=alias_name, target_collection=target_name)
+    checkpoint.clear()
+    save_checkpoint(checkpoint_path, checkpoint)
+    logger.info(f"Alias {alias_name} now points at {target_name}")
+    return target_name
+
+def prune_versions(client, alias_name, keep):
+    """Delete all but the newest `keep` versions, never the live one."""
+    live = resolve_alias(client, alias_name)
+    versions = list_versions(client, alias_name)
+    for version, name in list(versions.items())[:-keep] if keep > 0 else versions.items():
+        if name != live:
+            logger.info(f"Deleting old version: {name}")
+            client.collections.delete(name)
+
+def reindex_blue_green(client, alias_name, sample_queries, keep_versions=2, checkpoint=None, checkpoint_path=None,
+                       index_profile=None, index_tuning=None, **batch_options):
+    """
+    Build the next <alias>_vN from the live data, validate it and swap the alias.
+    An index_profile rebuilds the vector indexes with that profile.
+    """
+    checkpoint = checkpoint if checkpoint is not None else {}
+    live_name = resolve_alias(client, alias_name)
+    if live_name is None:
+        live_name = bootstrap_alias(client, alias_name, sample_queries, checkpoint=checkpoint,
+                                    checkpoint_path=checkpoint_path, **batch_options)
+
+    target_name = checkpoint.get("target")
+    if checkpoint.get("phase") != "blue_green" or not target_name or not client.collections.exists(target_name):
+        versions = list_versions(client, alias_name)
+        target_name = f"{alias_name}_v{max(versions, default=0) + 1}"
+        create_new_collection(client, live_name, target_name=target_name,
+                              index_profile=index_profile, **(index_tuning or {}))
+        checkpoint.clear()
+        checkpoint.update({"collection": alias_name, "phase": "blue_green", "target": target_name, "last_uuid": None, "copied": 0})
+        save_checkpoint(checkpoint_path, checkpoint)
+
+    logger.info(f"Blue/green reindex: {live_name} (live) -> {target_name}")
+    copy_objects(client, live_name, target_name, transform=_add_possible_queries,
+                 checkpoint=checkpoint, checkpoint_path=checkpoint_path, **batch_options)
+
+    if not validate_collection(client, live_name, target_name, sample_queries):
+        raise RuntimeError(f"{target_name} failed validation; {alias_name} still points at {live_name}")
+
+    point_alias(client, alias_name, target_name)
+    prune_versions(client, alias_name, keep_versions)
+    return target_name
+
+def rollback(client, alias_name):
+    """Point the alias back at the newest version older than the live one."""
+    live = resolve_alias(client, alias_name)
+    if live is None:
+        raise ValueError(f"{alias_name} is not an alias; nothing to roll back")
+    versions = list_versions(client, alias_name)
+    live_version = next((version for version, name in versions.items() if name == live), None)
+    previous = [name for version, name in versions.items() if live_version is not None and version < live_version]
+    if not previous:
+        raise ValueError(f"No version older than {live} is available for rollback")
+    point_alias(client, alias_name, previous[-1])
+    logger.info(f"Rolled back {alias_name} from {live} to {previous[-1]}")
+
 def main():
     """Main migration function"""
+    parser = argparse.ArgumentParser(description="Migrate the Weaviate collection to the new schema.")
+    parser.add_argument("--batch-size", type=int, default=500, help="Objects per batch request.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Batch requests in flight at once.")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT_PATH, help="Checkpoint file used to resume an interrupted migration.")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint and start over.")
+    parser.add_argument("--blue-green", action="store_true", help="Build a new versioned collection and swap the alias instead of replacing in place.")
+    parser.add_argument("--rollback", action="store_true", help="Point the alias back at the previous version.")
+    parser.add_argument("--keep-versions", type=int, default=2, help="Versioned collections to keep after a blue/green swap (live included).")
+    parser.add_argument("--index-profile", choices=list(INDEX_PROFILES), help="Rebuild the vector indexes with this profile (blue/green only).")
+    parser.add_argument("--ef", type=int, help="HNSW query-time ef for --index-profile.")
+    parser.add_argument("--ef-construction", type=int, help="HNSW build-time ef for --index-profile.")
+    parser.add_argument("--max-connections", type=int, help="HNSW max connections per node for --index-profile.")
+    parser.add_argument("--sample-query", action="append", dest="sample_queries", help="Keyword query used to validate a blue/green candidate (repeatable).")
+    args = parser.parse_args()
+    batch_options = {"batch_size": args.batch_size, "concurrency": args.concurrency}
+    
     collection_name = os.getenv("WEAVIATE_COLLECTION_NAME")
     if not collection_name:
         raise ValueError("Missing WEAVIATE_COLLECTION_NAME in environment")
@@ -159,28 +462,79 @@ def main():
     logger.info("Starting schema migration...")
     logger.info(f"Collection: {collection_name}")
     
+    checkpoint = {} if args.restart else load_checkpoint(args.checkpoint)
+    if checkpoint and checkpoint.get("collection") != collection_name:
+        logger.warning(f"Ignoring checkpoint for a different collection: {checkpoint.get('collection')}")
+        checkpoint = {}
+    if checkpoint:
+        logger.info(f"Resuming from checkpoint: phase {checkpoint.get('phase')}, {checkpoint.get('copied', 0)} objects copied")
+    
     client = get_weaviate_client()
     
     try:
-        # Check if collection exists
-        if not client.collections.exists(collection_name):
-            logger.error(f"Collection {collection_name} does not exist!")
+        if args.rollback:
+            rollback(client, collection_name)
             return
-        
-        # Create new collection with updated schema
-        new_collection_name = create_new_collection(client, collection_name)
-        
-        # Migrate data
-        migrated_count = migrate_data(client, collection_name, new_collection_name)
-        
-        if migrated_count > 0:
-            # Replace old collection with new one
-            replace_collection(client, collection_name, new_collection_name)
-            logger.info("✅ Schema migration completed successfully!")
-        else:
-            logger.warning("No data to migrate. Cleaning up...")
-            client.collections.delete(new_collection_name)
-            
+
+        if args.index_profile and not args.blue_green:
+            logger.error("--index-profile requires --blue-green")
+            return
+
+        if args.blue_green:
+            reindex_blue_green(client, collection_name, args.sample_queries or DEFAULT_SAMPLE_QUERIES,
+                               keep_versions=args.keep_versions, checkpoint=checkpoint,
+                               checkpoint_path=args.checkpoint, index_profile=args.index_profile,
+                               index_tuning={"ef": args.ef, "ef_construction": args.ef_construction,
+                                             "max_connections": args.max_connections},
+                               **batch_options)
+            if os.path.exists(args.checkpoint):
+                os.remove(args.checkpoint)
+            logger.info("✅ Blue/green reindex completed successfully!")
+            return
+
+        if resolve_alias(client, collection_name) is not None:
+            logger.error(f"{collection_name} is an alias; use --blue-green to migrate it")
+            return
+
+        new_collection_name = f"{collection_name}_new"
+    
+        if checkpoint.get("phase") in ("blue_green", "bootstrap"):
+            logger.error("Checkpoint belongs to a blue/green reindex; rerun with --blue-green or --restart")
+            return
+
+        if checkpoint.get("phase", "copy_to_new") == "copy_to_new":
+            # Check if collection exists
+            if not client.collections.exists(collection_name):
+                logger.error(f"Collection {collection_name} does not exist!")
+                return
+    
+            # Create new collection with updated schema (kept when resuming)
+            if not (checkpoint and client.collections.exists(new_collection_name)):
+                if client.collections.exists(new_collection_name):
+                    logger.info(f"Removing leftover collection from an earlier run: {new_collection_name}")
+                    client.collections.delete(new_collection_name)
+                create_new_collection(client, collection_name)
+                checkpoint = {"collection": collection_name, "phase": "copy_to_new", "last_uuid": None, "copied": 0}
+                save_checkpoint(args.checkpoint, checkpoint)
+    
+            # Migrate data
+            migrated_count = migrate_data(client, collection_name, new_collection_name,
+                                          checkpoint=checkpoint, checkpoint_path=args.checkpoint, **batch_options)
+    
+            if migrated_count == 0:
+                logger.warning("No data to migrate. Cleaning up...")
+                client.collections.delete(new_collection_name)
+                if os.path.exists(args.checkpoint):
+                    os.remove(args.checkpoint)
+                return
+    
+        # Replace old collection with new one
+        replace_collection(client, collection_name, new_collection_name,
+                           checkpoint=checkpoint, checkpoint_path=args.checkpoint, **batch_options)
+        if os.path.exists(args.checkpoint):
+            os.remove(args.checkpoint)
+        logger.info("✅ Schema migration completed successfully!")
+    
     except Exception as e:
         logger.error(f"Migration failed: {e}")
         raise
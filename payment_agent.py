@@ -4,7 +4,8 @@ import logging
 import requests
 import json
 from pydantic import BaseModel, Field, validator
-from app.config import llm
+from utils.llm_services import run_sync, get_structured_chain
+from utils.history_renderer import render_history
 from langchain_core.messages import SystemMessage, HumanMessage
 from app.session_manager import get_session, set_collected_info, get_collected_info
 from typing import Optional, Dict, Any
@@ -57,6 +58,12 @@ def run_payment_agent(user_message: str, chat_history: list, session_id: str) ->
     """
     LLM-powered payment agent that handles plan confirmation and payment processing.
     """
+    return run_sync(arun_payment_agent(user_message, chat_history, session_id))
+
+async def arun_payment_agent(user_message: str, chat_history: list, session_id: str) -> Dict[str, Any]:
+    """
+    Async variant of run_payment_agent.
+    """
     try:
         session = get_session(session_id)
         collected_info = session.get("collected_info", {})
@@ -80,7 +87,7 @@ def run_payment_agent(user_message: str, chat_history: list, session_id: str) ->
         
         # Use LLM to analyze payment stage and user intent
         try:
-            payment_chain = llm.with_structured_output(PaymentStage, method="json_mode")
+            payment_chain = get_structured_chain(PaymentStage, method="json_mode")
     
             prompt = [
                 SystemMessage(content=f"""You are a payment processing assistant for HLAS Insurance. 
@@ -89,7 +96,8 @@ CONTEXT:
 - Product: {product_name} Insurance
 - Recommended Plan: {recommended_plan}
 - Current payment info collected: {payment_info}
-- Chat history: {chat_history[-4:] if len(chat_history) > 4 else chat_history}
+- Chat history:
+{render_history(chat_history, max_turns=4)}
 
 PAYMENT STAGES:
 1. 'plan_confirmation' - User needs to confirm they want to purchase the recommended plan
@@ -119,7 +127,7 @@ IMPORTANT: `confidence` must be a number between 0.0 and 1.0 (e.g., 0.95, 0.8, 0
                 HumanMessage(content=f"User message: {user_message}")
             ]
             
-            result = payment_chain.invoke(prompt)
+            result = await payment_chain.ainvoke(prompt)
             
             # Fallback: Fix confidence if it's not a valid float
             if not isinstance(result.confidence, (int, float)) or not (0.0 <= result.confidence <= 1.0):
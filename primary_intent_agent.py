@@ -165,11 +165,18 @@
 
 import os
 import re
+import json
 from enum import Enum
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field, validator
 from langchain_core.messages import HumanMessage, SystemMessage
-from utils.llm_services import llm
+from utils.llm_services import run_sync, get_structured_chain
+from utils.history_renderer import render_history
+from app.config import (
+    INTENT_FAST_PATH_ENABLED, INTENT_FAST_PATH_MIN_CONFIDENCE, INTENT_ROUTER_ENABLED, INTENT_ROUTER_CONFIDENCE,
+)
+from agents.intent_router import get_intent_router
+from typing import Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -217,8 +224,8 @@ def validate_user_input(user_message: str) -> dict:
                 "message": "That's quite a long message! Could you please summarize your insurance question in a shorter message? 📝"}
     return {"is_valid": True, "message": "Input is valid"}
 
-# Create the Langchain Chain using structured output
-chain = llm.with_structured_output(Intent, method="function_calling")
+# Create the Langchain Chain using structured output (shared via the chain registry)
+chain = get_structured_chain(Intent)
 
 # ---- Keyword backstop if LLM returns UNKNOWN (keeps routing robust) ----
 def _keyword_backstop_product(user_message: str, chat_history: list) -> Product:
@@ -237,16 +244,175 @@ def _keyword_backstop_product(user_message: str, chat_history: list) -> Product:
         return Product.EARLY
     return Product.UNKNOWN
 
+# ---- Rule-based fast path: handles unambiguous messages without an LLM call ----
+_GREETING_RE = re.compile(
+    r"^(hi+|hello+|hey+|hiya|helo|good\s+(morning|afternoon|evening)|greetings|yo)"
+    r"(\s+(there|hlas|team|bot))?[\s!.,😊👋🙂]*$",
+    re.IGNORECASE,
+)
+_PRODUCT_TERMS = [
+    (Product.TRAVEL, r"travel(\s+protect\s*(360)?)?"),
+    (Product.MAID, r"maid|domestic\s+helper|fdw|helper"),
+    (Product.CAR, r"car|motor|vehicle"),
+    (Product.FAMILY, r"family(\s+protect)?"),
+    (Product.CHOICE, r"choice(\s+protect)?"),
+    (Product.EARLY, r"early(\s+protect)?|critical\s+illness"),
+]
+_EXPLICIT_PRODUCT_RES = [
+    (product, re.compile(
+        r"^((i\s+)?(want|need|would\s+like|am\s+looking\s+for|looking\s+for|interested\s+in)"
+        r"(\s+to\s+(buy|get|purchase))?(\s+(a|an|some))?\s+)?"
+        rf"({terms})(\s+(insurance|policy|plan|cover|coverage))?(\s+(please|pls|plz))?[\s.!]*$",
+        re.IGNORECASE,
+    ))
+    for product, terms in _PRODUCT_TERMS
+]
+# Product names an affirmative reply can refer to ("choice protect", "maid insurance"),
+# never bare words like "car" or "family" that appear in ordinary sentences
+_PRODUCT_NAME_RES = [
+    (product, re.compile(rf"\b({names})\s+(insurance|protect(\s*360)?|policy|cover(age)?)\b", re.IGNORECASE))
+    for product, names in [
+        (Product.TRAVEL, r"travel"),
+        (Product.MAID, r"maid|domestic\s+helper|fdw"),
+        (Product.CAR, r"car|motor"),
+        (Product.FAMILY, r"family"),
+        (Product.CHOICE, r"choice"),
+        (Product.EARLY, r"early|critical\s+illness"),
+    ]
+]
+_AFFIRMATIVE_RE = re.compile(r"^(yes|yeah|yep|yup|ok|okay|sure|y|correct|please do)[\s.!]*$", re.IGNORECASE)
+_MENU_REPLY_RE = re.compile(r"^\s*(\d{1,2})\s*[.)]?\s*$")
+_MENU_OPTION_RE = re.compile(r"^\s*(?:[•\-\*]|\d{1,2}[.)])\s*(.+?)\s*$")
+
+_fast_path_stats = {"classified": 0, "short_circuited": 0, "routed": 0}
+
+def _last_assistant_message(chat_history: list) -> str:
+    for item in reversed(chat_history or []):
+        if hasattr(item, "get") and item.get("role") == "assistant":
+            return item.get("content", "") or ""
+    return ""
+
+def _fast_path_intent(user_message: str, chat_history: list):
+    """
+    Classify greetings, explicit product requests and menu/affirmative replies
+    with compiled patterns. Returns None when no rule is confident.
+    """
+    text = user_message.strip()
+    if len(text) > 60:
+        return None
+
+    if _GREETING_RE.match(text):
+        return Intent(product=Product.UNKNOWN, intent="greeting", confidence=0.97)
+
+    for product, pattern in _EXPLICIT_PRODUCT_RES:
+        if pattern.match(text):
+            return Intent(product=product, intent="product_inquiry", confidence=0.95)
+
+    last_agent_message = _last_assistant_message(chat_history)
+    if not last_agent_message:
+        return None
+
+    # "2" in reply to a bulleted/numbered list of products
+    menu_match = _MENU_REPLY_RE.match(text)
+    if menu_match:
+        options = [m.group(1) for m in map(_MENU_OPTION_RE.match, last_agent_message.splitlines()) if m]
+        index = int(menu_match.group(1)) - 1
+        if 0 <= index < len(options):
+            product = _keyword_backstop_product(options[index], [])
+            if product != Product.UNKNOWN:
+                return Intent(product=product, intent="product_inquiry", confidence=0.92)
+        return None
+
+    # "yes" to a question about exactly one product
+    if _AFFIRMATIVE_RE.match(text):
+        mentioned = {product for product, pattern in _PRODUCT_NAME_RES if pattern.search(last_agent_message)}
+        if len(mentioned) == 1:
+            return Intent(product=mentioned.pop(), intent="product_inquiry", confidence=0.9)
+
+    return None
+
+def get_fast_path_stats() -> dict:
+    """
+    Returns how many classifications were answered by the rule-based fast path.
+    """
+    classified = _fast_path_stats["classified"]
+    short_circuited = _fast_path_stats["short_circuited"]
+    routed = _fast_path_stats["routed"]
+    return {
+        "classified": classified,
+        "short_circuited": short_circuited,
+        "routed": routed,
+        "short_circuit_share": round(short_circuited / classified, 4) if classified else 0.0,
+        "local_share": round((short_circuited + routed) / classified, 4) if classified else 0.0,
+    }
+
+def log_intent_decision(user_message: str, result: Intent):
+    """
+    Log an LLM intent decision as one JSON object per line; intent_router.py retrains from these.
+    """
+    logger.info("PRIMARY INTENT AGENT RESULT: " + json.dumps({
+        "message": user_message,
+        "product": result.product.value,
+        "intent": result.intent,
+        "confidence": result.confidence,
+        "requires_clarification": result.requires_clarification,
+    }, ensure_ascii=False))
+
+def local_intent(user_message: str, chat_history: list) -> Optional[Intent]:
+    """
+    Classify without an LLM: the rule-based fast path first, then the
+    nearest-prototype router. Returns None when both defer to the LLM.
+    """
+    _fast_path_stats["classified"] += 1
+    if INTENT_FAST_PATH_ENABLED:
+        fast_result = _fast_path_intent(user_message, chat_history)
+        if fast_result is not None and fast_result.confidence >= INTENT_FAST_PATH_MIN_CONFIDENCE:
+            _fast_path_stats["short_circuited"] += 1
+            stats = get_fast_path_stats()
+            logger.info(
+                f"⚡ Fast-path intent - Product: {fast_result.product}, Intent: {fast_result.intent} "
+                f"(short-circuited {stats['short_circuited']}/{stats['classified']} = {stats['short_circuit_share']:.1%})"
+            )
+            return fast_result
+
+    # Nearest-prototype router: one mat-vec on a locally embedded message
+    router = get_intent_router() if INTENT_ROUTER_ENABLED else None
+    if router is not None:
+        routed = router.classify(user_message)
+        if routed is not None:
+            intent, product, score = routed
+            _fast_path_stats["routed"] += 1
+            stats = get_fast_path_stats()
+            logger.info(
+                f"🧭 Routed intent - Product: {product}, Intent: {intent}, Similarity: {score:.2f} "
+                f"(handled locally {stats['local_share']:.1%} of {stats['classified']})"
+            )
+            # Report the configured confidence, not the cosine similarity
+            return Intent(product=Product(product), intent=intent, confidence=INTENT_ROUTER_CONFIDENCE)
+    return None
+
 def get_primary_intent(user_message: str, chat_history: list) -> Intent:
     """
     Classifies the user's intent and identifies the product of interest using an LLM.
     """
+    return run_sync(aget_primary_intent(user_message, chat_history))
+
+async def aget_primary_intent(user_message: str, chat_history: list, local_checked: bool = False) -> Intent:
+    """
+    Async variant of get_primary_intent. Pass local_checked=True when the
+    caller already ran local_intent on this message and it deferred.
+    """
     try:
         vr = validate_user_input(user_message)
         if not vr["is_valid"]:
             logger.warning(f"Invalid input detected: {vr['issue_type']} - {user_message[:50]}...")
             return Intent(product=Product.UNKNOWN, intent="invalid_input", confidence=1.0, requires_clarification=False)
 
+        if not local_checked:
+            local_result = local_intent(user_message, chat_history)
+            if local_result is not None:
+                return local_result
+
         prompt = [
             SystemMessage(content="""You are an expert AI assistant for Hong Leong Assurance Singapore (HLAS).
 Classify the message and determine the primary intent and product.
@@ -274,11 +440,11 @@ RULES:
 - Prefer 'informational' over 'unwanted' if the query is about insurance concepts.
 - Return values MUST match the enums exactly.
 """),
-            HumanMessage(content=f"Chat History:\n{chat_history}\n\nUser Message: {user_message}"),
+            HumanMessage(content=f"Chat History:\n{render_history(chat_history)}\n\nUser Message: {user_message}"),
         ]
 
-        result = chain.invoke(prompt)
-        logger.info(f"PRIMARY INTENT AGENT RESULT: {result}")
+        result = await chain.ainvoke(prompt)
+        log_intent_decision(user_message, result)
         logger.info(f"Intent classification - Product: {result.product}, Intent: {result.intent}")
 
         # Backstop: if LLM couldn't set a product but it's clearly an insurance/product message, infer it.
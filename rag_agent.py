@@ -1,33 +1,65 @@
 import logging
-from app.config import llm
-from utils.weaviate_client import get_weaviate_client
+from app.config import (
+    llm, KB_COLLECTION_NAME, RAG_CACHE_ENABLED, RAG_CACHE_SIMILARITY_THRESHOLD, RAG_CACHE_TTL_SECONDS, RAG_CACHE_MAX_ENTRIES
+)
+from utils.llm_services import run_sync
+from utils.weaviate_client import get_async_weaviate_client
+from utils.semantic_cache import SemanticCache
+from utils.kb_version import get_kb_version
 from weaviate.classes.query import Filter, TargetVectors
 from langchain_core.messages import SystemMessage, HumanMessage
 
 logger = logging.getLogger(__name__)
 
 class RAGAgent:
+    def __init__(self):
+        self.answer_cache = SemanticCache(
+            threshold=RAG_CACHE_SIMILARITY_THRESHOLD,
+            ttl_seconds=RAG_CACHE_TTL_SECONDS,
+            max_entries=RAG_CACHE_MAX_ENTRIES,
+        ) if RAG_CACHE_ENABLED else None
+
     def answer_query(self, query: str, chat_history: list, product: str = None):
         """
         Answers a user's query using a native Weaviate hybrid search.
         """
+        return run_sync(self.aanswer_query(query, chat_history, product))
+
+    async def aanswer_query(self, query: str, chat_history: list, product: str = None):
+        """
+        Async variant of answer_query.
+        """
         if not product:
             return "Please specify which insurance product you're asking about (Travel or Maid)."
 
         try:
             logger.info(f"🔍 RAG QUERY - Product: {product}, Query: '{query}'")
-            
-            client = get_weaviate_client()
-            collection = client.collections.get("Insurance_Knowledge_Base")
+            kb_version = get_kb_version(product)
+
+            # Repeat of an already answered question: skip embedding, search and synthesis
+            if self.answer_cache is not None:
+                cached_answer = self.answer_cache.get_exact(product, query, kb_version)
+                if cached_answer is not None:
+                    logger.info(f"⚡ RAG cache hit (exact) for: '{query}'")
+                    return self._add_guidance(cached_answer, product, query)
 
             # Generate embedding for the user query using Azure OpenAI
             from utils.llm_services import embedding_model
             logger.info(f"🔍 Generating query embedding for: '{query}'")
-            query_embedding = embedding_model.embed_query(query)
+            query_embedding = await embedding_model.aembed_query(query)
+
+            if self.answer_cache is not None:
+                cached_answer = self.answer_cache.get(product, query_embedding, kb_version)
+                if cached_answer is not None:
+                    logger.info(f"⚡ RAG cache hit (semantic) for: '{query}'")
+                    return self._add_guidance(cached_answer, product, query)
+            
+            client = await get_async_weaviate_client()
+            collection = client.collections.get(KB_COLLECTION_NAME)
             
             # Perform hybrid search with NAMED VECTORS
             logger.info(f"🔍 Performing hybrid search with named vectors + average join strategy")
-            response = collection.query.hybrid(
+            response = await collection.query.hybrid(
                 query=query,                           # For BM25 keyword matching
                 vector={
                     "content_vector": query_embedding,     # Semantic match with content
@@ -64,7 +96,10 @@ FORMATTING RULES:
                 HumanMessage(content=f"CONTEXT:\n{context_str}\n\nQUERY:\n{query}\n\nBased on the context, please provide a detailed and accurate answer to the query, following all formatting rules.")
             ]
 
-            llm_response = llm.invoke(prompt)
+            llm_response = await llm.ainvoke(prompt)
+            if self.answer_cache is not None:
+                # Cache the raw answer; guidance depends on the exact wording of each query
+                self.answer_cache.put(product, query, query_embedding, llm_response.content, kb_version)
             formatted_response = self._add_guidance(llm_response.content, product, query)
 
             logger.info(f"✅ RAG Response Generated: {len(formatted_response)} characters")
@@ -97,6 +132,14 @@ FORMATTING RULES:
         
         return response_text
 
+    def get_cache_stats(self):
+        """
+        Returns semantic cache metrics for health monitoring.
+        """
+        if self.answer_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.answer_cache.get_stats()}
+
 rag_agent = RAGAgent()
 
 def get_rag_response(query: str, chat_history: list, product: str = None):
@@ -105,4 +148,10 @@ def get_rag_response(query: str, chat_history: list, product: str = None):
     """
     return rag_agent.answer_query(query, chat_history, product)
 
+async def aget_rag_response(query: str, chat_history: list, product: str = None):
+    """
+    Async entry point for answering a user's query.
+    """
+    return await rag_agent.aanswer_query(query, chat_history, product)
+
 # Legacy function removed - use get_rag_response() directly
\ No newline at end of file
@@ -187,17 +187,44 @@
 #endregion
 
 
+import time
+import asyncio
 import logging
-from app.config import llm
-from utils.weaviate_client import get_weaviate_client
+import threading
+from app.config import llm, KB_COLLECTION_NAME
+from utils.llm_services import run_sync
+from utils.weaviate_client import get_async_weaviate_client
+from utils.kb_version import get_kb_version
 from weaviate.classes.query import Filter
 
 logger = logging.getLogger(__name__)
 
 from langchain_core.messages import HumanMessage, SystemMessage
 
+# Alias list so we match how product_name was stored in Weaviate
+PRODUCT_ALIASES = {
+    "TRAVEL": ["TRAVEL", "Travel"],
+    "MAID":   ["MAID", "Maid"],
+    "CAR":    ["CAR", "Car", "Motor", "Auto"],
+    "FAMILY": ["FAMILY", "Family"],
+    "CHOICE": ["CHOICE", "Choice"],
+    "EARLY":  ["EARLY", "Early", "Critical Illness", "CI"],
+}
+
+# Concurrent LLM calls while warming the recommendation cache
+WARM_CONCURRENCY = 4
+
 class RecRetrieverAgent:
 
+    def __init__(self):
+        # (PRODUCT, plan_tier) -> (kb_version, message). The message depends only
+        # on the product, the tier and the static benefit chunks, so it is
+        # rendered once per knowledge-base version and shared by every user.
+        self._message_cache = {}
+        self._cache_lock = threading.Lock()
+        self._cache_hits = 0
+        self._cache_misses = 0
+
     def get_tier_names(self, product: str):
         """
         Get available tier names for the product.
@@ -220,155 +247,87 @@ class RecRetrieverAgent:
         return ["Standard"]
         # <<< /NEW >>>
 
+    def _get_aliases(self, product: str):
+        return PRODUCT_ALIASES.get((product or "").upper(), [product])
+
+    def _get_kb_version(self, product: str) -> str:
+        return "|".join(get_kb_version(alias) for alias in self._get_aliases(product))
+
     def get_recommendation_message(self, product: str, plan_tier: str):
         """
         Generates a comprehensive recommendation message using the LLM.
         """
-        try:
-            client = get_weaviate_client()
-            collection = client.collections.get("Insurance_Knowledge_Base")
-
-            # <<< NEW >>> alias list so we match how product_name was stored in Weaviate
-            PRODUCT_ALIASES = {
-                "TRAVEL": ["TRAVEL", "Travel"],
-                "MAID":   ["MAID", "Maid"],
-                "CAR":    ["CAR", "Car", "Motor", "Auto"],
-                "FAMILY": ["FAMILY", "Family"],
-                "CHOICE": ["CHOICE", "Choice"],
-                "EARLY":  ["EARLY", "Early", "Critical Illness", "CI"],
-            }
-            aliases = PRODUCT_ALIASES.get((product or "").upper(), [product])
-            # <<< /NEW >>>
+        return run_sync(self.aget_recommendation_message(product, plan_tier))
 
-            # Primary (strict) filter for the first alias
-            filters = Filter.all_of([
-                Filter.by_property("product_name").equal(aliases[0]),
+    async def aget_recommendation_message(self, product: str, plan_tier: str):
+        """
+        Async variant of get_recommendation_message.
+
+        Rendered messages are cached per (product, plan_tier, knowledge-base version).
+        """
+        key = ((product or "").upper(), plan_tier)
+        kb_version = self._get_kb_version(product)
+        with self._cache_lock:
+            cached = self._message_cache.get(key)
+            if cached is not None and cached[0] == kb_version:
+                self._cache_hits += 1
+                logger.info(f"⚡ Recommendation cache hit for {product} / {plan_tier}")
+                return cached[1]
+            self._cache_misses += 1
+
+        message, cacheable = await self._agenerate_recommendation_message(product, plan_tier)
+        if cacheable:
+            with self._cache_lock:
+                self._message_cache[key] = (kb_version, message)
+        return message
+
+    async def _afetch_benefits(self, product: str):
+        """
+        Fetch the benefit chunks for a product, trying each stored alias in turn.
+        """
+        client = await get_async_weaviate_client()
+        collection = client.collections.get(KB_COLLECTION_NAME)
+        aliases = self._get_aliases(product)
+
+        seen = set()
+        objects = []
+        for alias in aliases:
+            alias_filters = Filter.all_of([
+                Filter.by_property("product_name").equal(alias),
                 Filter.by_property("doc_type").equal("benefits")
             ])
-
-            logger.info(f"🔍 QUERY DEBUG: Searching for product='{product}', doc_type='benefits', limit=15")
-            logger.info(f"🔍 QUERY DEBUG: Product type: {type(product)}, Product repr: {repr(product)}")
-
-            # <<< NEW >>> dynamic probe logs (previously hardcoded to Travel)
-            if len(aliases) > 1:
-                logger.info(f"🔍 TESTING: Trying broader query over aliases: {aliases}")
-            else:
-                logger.info(f"🔍 TESTING: Only one alias available for '{product}': {aliases}")
-            # <<< /NEW >>>
-
-            # Try a couple of probes for visibility (first two aliases if present)
-            if len(aliases) >= 1:
-                test_response = collection.query.fetch_objects(
-                    filters=Filter.by_property("product_name").equal(aliases[0]),
-                    limit=5
-                )
-                logger.info(f"🔍 TEST RESULT: Found {len(test_response.objects)} objects with product_name='{aliases[0]}'")
-            if len(aliases) >= 2:
-                test_response2 = collection.query.fetch_objects(
-                    filters=Filter.by_property("product_name").equal(aliases[1]),
-                    limit=5
-                )
-                logger.info(f"🔍 TEST RESULT: Found {len(test_response2.objects)} objects with product_name='{aliases[1]}'")
-
-            # First, run the strict filter against the first alias
-            response = collection.query.fetch_objects(
-                filters=filters,
-                limit=15
-            )
-
-            # <<< NEW >>> If nothing found, iterate through remaining aliases and merge results
-            seen = set()
-            objects = []
-            def _extend(resp):
-                if not hasattr(resp, "objects") or not resp.objects:
-                    return
-                for o in resp.objects:
-                    uid = getattr(o, "uuid", None)
-                    if uid and uid in seen:
-                        continue
-                    seen.add(uid)
-                    objects.append(o)
-
-            _extend(response)
-            if not objects and len(aliases) > 1:
-                for alias in aliases[1:]:
-                    alias_filters = Filter.all_of([
-                        Filter.by_property("product_name").equal(alias),
-                        Filter.by_property("doc_type").equal("benefits")
-                    ])
-                    alias_resp = collection.query.fetch_objects(filters=alias_filters, limit=15)
-                    _extend(alias_resp)
-            # Build a small shim to look like the original variable downstream
-            class _RespShim:
-                pass
-            resp_shim = _RespShim()
-            resp_shim.objects = objects
-            response = resp_shim
-            # <<< /NEW >>>
-
-            logger.info(f"🔍 RESPONSE DEBUG: Response type: {type(response)}")
-            logger.info(f"🔍 RESPONSE DEBUG: Response has objects: {hasattr(response, 'objects')}")
-            logger.info(f"🔍 RESPONSE DEBUG: Objects count: {len(response.objects) if hasattr(response, 'objects') else 'N/A'}")
-            logger.info(f"🔍 RESPONSE DEBUG: Objects type: {type(response.objects) if hasattr(response, 'objects') else 'N/A'}")
-
-            if not response.objects:
+            response = await collection.query.fetch_objects(filters=alias_filters, limit=15)
+            for o in response.objects or []:
+                uid = getattr(o, "uuid", None)
+                if uid and uid in seen:
+                    continue
+                seen.add(uid)
+                objects.append(o)
+            if objects:
+                break
+
+        valid_chunks = []
+        for obj in objects:
+            content = obj.properties.get('content') if obj.properties else None
+            if content and content.strip():
+                valid_chunks.append(content)
+        logger.info(f"🔍 Found {len(valid_chunks)} valid benefit chunks out of {len(objects)} for product: {product}")
+        return valid_chunks
+
+    async def _agenerate_recommendation_message(self, product: str, plan_tier: str):
+        """
+        Render the recommendation message. Returns (message, cacheable); messages
+        built without benefit details are not cached.
+        """
+        cacheable = False
+        try:
+            valid_chunks = await self._afetch_benefits(product)
+            if not valid_chunks:
                 logger.warning(f"⚠️ No benefit documents found for product: {product}")
                 retrieved_benefits = f"No specific benefit details found for {product} insurance."
             else:
-                logger.info(f"Retrieved {len(response.objects)} benefit chunks for product: {product}")
-                
-                # Enhanced debugging for Weaviate objects
-                logger.info(f"🔍 DETAILED WEAVIATE OBJECT ANALYSIS:")
-                
-                for i, obj in enumerate(response.objects):
-                    chunk_num = i + 1
-                    
-                    # Log the entire object structure
-                    logger.info(f"  === CHUNK {chunk_num} ANALYSIS ===")
-                    logger.info(f"    Object type: {type(obj)}")
-                    logger.info(f"    Object UUID: {getattr(obj, 'uuid', 'N/A')}")
-                    logger.info(f"    Has properties: {hasattr(obj, 'properties')}")
-                    
-                    if hasattr(obj, 'properties'):
-                        props = obj.properties
-                        logger.info(f"    Properties type: {type(props)}")
-                        logger.info(f"    Properties keys: {list(props.keys()) if props else 'None'}")
-                        
-                        # Check each expected property
-                        content = props.get('content') if props else None
-                        product_name = props.get('product_name') if props else None
-                        doc_type = props.get('doc_type') if props else None
-                        source_file = props.get('source_file') if props else None
-                        
-                        logger.info(f"    Content exists: {content is not None}")
-                        logger.info(f"    Content type: {type(content)}")
-                        logger.info(f"    Content length: {len(content) if content else 0}")
-                        logger.info(f"    Product name: {product_name}")
-                        logger.info(f"    Doc type: {doc_type}")
-                        logger.info(f"    Source file: {source_file}")
-                        
-                        if content:
-                            logger.info(f"    Content preview: {repr(content[:100])}...")
-                        else:
-                            logger.info(f"    Content is: {repr(content)}")
-                    else:
-                        logger.info(f"    No properties attribute found")
-                    
-                    # Original logging for compatibility
-                    content_for_display = obj.properties.get('content', 'N/A') if hasattr(obj, 'properties') and obj.properties else 'NO_PROPERTIES'
-                    logger.info(f"  Chunk {chunk_num}: {content_for_display}")
-                    logger.info(f"  ========================")
-                
-                # Filter and join valid content
-                valid_chunks = []
-                for obj in response.objects:
-                    if hasattr(obj, 'properties') and obj.properties:
-                        content = obj.properties.get('content')
-                        if content and content.strip():
-                            valid_chunks.append(content)
-                
-                logger.info(f"🔍 SUMMARY: Found {len(valid_chunks)} valid chunks out of {len(response.objects)} total")
                 retrieved_benefits = "\n---\n".join(valid_chunks)
+                cacheable = True
 
         except Exception as e:
             logger.error(f"Error retrieving benefits for {product}: {e}")
@@ -417,9 +376,40 @@ INSTRUCTIONS:
             HumanMessage(content="Please generate the recommendation message following the exact format specified."),
         ]
         
-        response = llm.invoke(prompt)
+        response = await llm.ainvoke(prompt)
         
-        return response.content
+        return response.content, cacheable
+
+    async def awarm_cache(self, products=None):
+        """
+        Render and cache the recommendation message for every tier of every product.
+        """
+        products = products or list(PRODUCT_ALIASES)
+        semaphore = asyncio.Semaphore(WARM_CONCURRENCY)
+        started = time.monotonic()
+
+        async def _warm(product, tier):
+            async with semaphore:
+                try:
+                    await self.aget_recommendation_message(product, tier)
+                except Exception as e:
+                    logger.warning(f"Could not warm recommendation for {product} / {tier}: {e}")
+
+        await asyncio.gather(*[
+            _warm(product, tier) for product in products for tier in self.get_tier_names(product)
+        ])
+        logger.info(f"🔥 Recommendation cache warmed: {len(self._message_cache)} messages in {time.monotonic() - started:.1f}s")
+
+    def get_cache_stats(self):
+        """
+        Returns recommendation cache metrics for health monitoring.
+        """
+        with self._cache_lock:
+            return {
+                "entries": len(self._message_cache),
+                "hits": self._cache_hits,
+                "misses": self._cache_misses,
+            }
 
 rec_retriever_agent = RecRetrieverAgent()
 
@@ -428,3 +418,15 @@ def get_recommendation_message(product: str, plan_tier: str):
     Main entry point for generating the recommendation message.
     """
     return rec_retriever_agent.get_recommendation_message(product, plan_tier)
+
+async def aget_recommendation_message(product: str, plan_tier: str):
+    """
+    Async entry point for generating the recommendation message.
+    """
+    return await rec_retriever_agent.aget_recommendation_message(product, plan_tier)
+
+async def awarm_recommendation_cache(products=None):
+    """
+    Pre-render recommendation messages for every product tier.
+    """
+    await rec_retriever_agent.awarm_cache(products)
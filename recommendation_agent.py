@@ -72,7 +72,7 @@
 import logging
 import json
 from app.session_manager import get_collected_info
-from utils.llm_services import llm
+from utils.llm_services import llm, run_sync
 from langchain_core.messages import HumanMessage, SystemMessage
 
 logger = logging.getLogger(__name__)
@@ -82,6 +82,12 @@ class RecommendationAgent:
         """
         Recommends a plan based on the collected information for a given product using an LLM.
         """
+        return run_sync(self.arecommend_plan(session_id, product))
+
+    async def arecommend_plan(self, session_id: str, product: str):
+        """
+        Async variant of recommend_plan.
+        """
         logger.info(f"🔍 RECOMMENDATION DEBUG: Starting recommendation for session {session_id}, product {product}")
         
         collected_info = get_collected_info(session_id)
@@ -130,7 +136,7 @@ Respond with a JSON object containing a single key "plan" whose value is one of:
         
         logger.info(f"🔍 RECOMMENDATION DEBUG: Calling LLM with prompt")
         try:
-            response = llm.invoke(prompt)
+            response = await llm.ainvoke(prompt)
             logger.info(f"🔍 RECOMMENDATION DEBUG: LLM response: {response.content}")
         except Exception as e:
             logger.error(f"🔍 RECOMMENDATION DEBUG: LLM call failed: {str(e)}")
@@ -188,6 +194,12 @@ def get_recommendation(session_id: str, product: str):
     """
     return recommendation_agent.recommend_plan(session_id, product)
 
+async def aget_recommendation(session_id: str, product: str):
+    """
+    Async entry point for getting a plan recommendation.
+    """
+    return await recommendation_agent.arecommend_plan(session_id, product)
+
 # Alias expected by intelligent_orchestrator (kept for backward compatibility)
 def run_recommendation_agent(session_id: str, product: str):
     return recommendation_agent.recommend_plan(session_id, product)
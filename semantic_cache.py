@@ -0,0 +1,193 @@
+"""
+Semantic Response Cache
+=======================
+
+Caches generated answers keyed on (product, query embedding). A lookup
+returns a stored answer when the cosine similarity between the new query and
+a cached query reaches the configured threshold.
+
+Each product keeps its embeddings in one preallocated, L2-normalised numpy
+matrix, so a lookup is a single matrix-vector product. Entries expire after
+a TTL, the least recently used entry is evicted when a product is full, and
+a product's entries are dropped as soon as its knowledge base version changes.
+"""
+
+import time
+import logging
+import threading
+import numpy as np
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+def _normalise_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+class _ProductCache:
+    """Fixed-capacity slot table for one product."""
+
+    def __init__(self, capacity: int, dim: int, version: str):
+        self.version = version
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.created = np.zeros(capacity, dtype=np.float64)
+        self.last_used = np.zeros(capacity, dtype=np.float64)
+        self.valid = np.zeros(capacity, dtype=bool)
+        self.answers: List[Optional[str]] = [None] * capacity
+        self.texts: List[Optional[str]] = [None] * capacity
+        self.by_text: Dict[str, int] = {}
+
+    def clear_slot(self, slot: int):
+        text = self.texts[slot]
+        if text is not None and self.by_text.get(text) == slot:
+            del self.by_text[text]
+        self.valid[slot] = False
+        self.answers[slot] = None
+        self.texts[slot] = None
+
+class SemanticCache:
+    """
+    Thread-safe semantic cache with TTL, per-product LRU eviction and
+    version-based invalidation.
+    """
+
+    def __init__(self, threshold: float = 0.95, ttl_seconds: float = 6 * 3600, max_entries: int = 1000):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._products: Dict[str, _ProductCache] = {}
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._exact_hits = 0
+        self._misses = 0
+        self._inserts = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def _product_cache(self, product: str, version: str, dim: Optional[int] = None) -> Optional[_ProductCache]:
+        """Return the product's table, dropping it if the KB version moved on."""
+        cache = self._products.get(product)
+        if cache is not None and cache.version != version:
+            logger.info(f"🧹 Semantic cache invalidated for {product} (KB version {cache.version} -> {version})")
+            del self._products[product]
+            self._invalidations += 1
+            cache = None
+        if cache is None and dim is not None:
+            cache = self._products[product] = _ProductCache(self.max_entries, dim, version)
+        return cache
+
+    def _live_mask(self, cache: _ProductCache, now: float) -> np.ndarray:
+        return cache.valid & (now - cache.created < self.ttl_seconds)
+
+    def get_exact(self, product: str, query: str, version: str) -> Optional[str]:
+        """
+        Look up a previously seen query by normalised text, without an embedding.
+        Does not count a miss, since the semantic lookup normally follows.
+        """
+        with self._lock:
+            cache = self._product_cache(product, version)
+            if cache is None:
+                return None
+            slot = cache.by_text.get(_normalise_text(query))
+            now = time.time()
+            if slot is None or not self._live_mask(cache, now)[slot]:
+                return None
+            cache.last_used[slot] = now
+            self._hits += 1
+            self._exact_hits += 1
+            return cache.answers[slot]
+
+    def get(self, product: str, query_embedding: List[float], version: str) -> Optional[str]:
+        """
+        Return the cached answer for the most similar live query, if it is
+        similar enough.
+        """
+        query_vector = self._as_unit_vector(query_embedding)
+        with self._lock:
+            cache = self._product_cache(product, version)
+            if cache is None or cache.vectors.shape[1] != query_vector.shape[0]:
+                self._misses += 1
+                return None
+            now = time.time()
+            live = self._live_mask(cache, now)
+            if not live.any():
+                self._misses += 1
+                return None
+            similarities = cache.vectors @ query_vector
+            similarities[~live] = -1.0
+            slot = int(np.argmax(similarities))
+            if similarities[slot] < self.threshold:
+                self._misses += 1
+                return None
+            cache.last_used[slot] = now
+            self._hits += 1
+            logger.debug(f"Semantic cache hit for {product} (similarity {similarities[slot]:.3f})")
+            return cache.answers[slot]
+
+    def put(self, product: str, query: str, query_embedding: List[float], answer: str, version: str):
+        """
+        Store an answer, reusing a free or expired slot before evicting the LRU entry.
+        """
+        query_vector = self._as_unit_vector(query_embedding)
+        with self._lock:
+            cache = self._product_cache(product, version, dim=query_vector.shape[0])
+            if cache.vectors.shape[1] != query_vector.shape[0]:
+                # Embedding model changed; start this product afresh
+                cache = self._products[product] = _ProductCache(self.max_entries, query_vector.shape[0], version)
+            now = time.time()
+            text = _normalise_text(query)
+
+            slot = cache.by_text.get(text)
+            if slot is None:
+                free = np.flatnonzero(~self._live_mask(cache, now))
+                if free.size:
+                    slot = int(free[0])
+                else:
+                    slot = int(np.argmin(cache.last_used))
+                    self._evictions += 1
+                cache.clear_slot(slot)
+
+            cache.vectors[slot] = query_vector
+            cache.created[slot] = now
+            cache.last_used[slot] = now
+            cache.valid[slot] = True
+            cache.answers[slot] = answer
+            cache.texts[slot] = text
+            cache.by_text[text] = slot
+            self._inserts += 1
+
+    def invalidate(self, product: Optional[str] = None):
+        """Drop cached answers for one product, or for all products."""
+        with self._lock:
+            if product is None:
+                self._products.clear()
+            else:
+                self._products.pop(product, None)
+            self._invalidations += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return hit-rate and size metrics for health monitoring.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            now = time.time()
+            return {
+                "entries": {product: int(self._live_mask(cache, now).sum()) for product, cache in self._products.items()},
+                "hits": self._hits,
+                "exact_hits": self._exact_hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "inserts": self._inserts,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "threshold": self.threshold,
+                "ttl_seconds": self.ttl_seconds,
+                "max_entries_per_product": self.max_entries,
+            }
+
+    @staticmethod
+    def _as_unit_vector(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
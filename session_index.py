@@ -0,0 +1,114 @@
+"""
+Session Activity Index
+======================
+
+Time-bucketed index of session ``last_active`` times plus running counters,
+so idle-session expiry and health statistics never scan every session.
+
+Sessions are grouped into one-minute buckets. Touching a session moves it to
+the current bucket (O(1)); expiry pops whole buckets off a min-heap of bucket
+start times (O(log b) per bucket); statistics read counters and at most the
+last hour of buckets.
+"""
+
+import heapq
+import threading
+from typing import Dict, List, Set, Tuple
+
+BUCKET_SECONDS = 60
+
+class SessionActivityIndex:
+    """
+    Tracks which sessions were last active in which minute.
+    """
+
+    def __init__(self, bucket_seconds: int = BUCKET_SECONDS):
+        self.bucket_seconds = bucket_seconds
+        self._buckets: Dict[int, Set[str]] = {}
+        self._bucket_heap: List[int] = []
+        # session_id -> [bucket, message_count]
+        self._entries: Dict[str, List[int]] = {}
+        self._total_messages = 0
+        self._expired = 0
+        self._lock = threading.Lock()
+
+    def _bucket(self, ts: int) -> int:
+        return ts - ts % self.bucket_seconds
+
+    def touch(self, session_id: str, ts: int):
+        """Record activity for a session at epoch second ``ts``."""
+        bucket = self._bucket(ts)
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                if entry[0] >= bucket:
+                    return
+                old = self._buckets.get(entry[0])
+                if old is not None:
+                    old.discard(session_id)
+                    if not old:
+                        del self._buckets[entry[0]]
+                entry[0] = bucket
+            else:
+                self._entries[session_id] = [bucket, 0]
+
+            members = self._buckets.get(bucket)
+            if members is None:
+                members = self._buckets[bucket] = set()
+                heapq.heappush(self._bucket_heap, bucket)
+            members.add(session_id)
+
+    def add_messages(self, session_id: str, count: int = 1):
+        """Count messages exchanged in a tracked session."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                entry[1] += count
+                self._total_messages += count
+
+    def remove(self, session_id: str):
+        """Stop tracking a session (e.g. after an explicit delete)."""
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+            if entry is None:
+                return
+            self._total_messages -= entry[1]
+            members = self._buckets.get(entry[0])
+            if members is not None:
+                members.discard(session_id)
+                if not members:
+                    del self._buckets[entry[0]]
+
+    def pop_expired(self, cutoff_ts: int) -> List[str]:
+        """
+        Remove and return every session whose last activity is before ``cutoff_ts``.
+        """
+        expired: List[str] = []
+        cutoff_bucket = self._bucket(cutoff_ts)
+        with self._lock:
+            while self._bucket_heap and self._bucket_heap[0] < cutoff_bucket:
+                bucket = heapq.heappop(self._bucket_heap)
+                # Buckets emptied by touches are left on the heap and skipped here
+                for session_id in self._buckets.pop(bucket, ()):
+                    entry = self._entries.pop(session_id)
+                    self._total_messages -= entry[1]
+                    expired.append(session_id)
+            self._expired += len(expired)
+        return expired
+
+    def count_active_between(self, since_ts: int, now_ts: int) -> int:
+        """
+        Number of sessions last active between ``since_ts`` and ``now_ts``
+        (bucket granularity). Cost is proportional to the window, not to the
+        number of sessions.
+        """
+        with self._lock:
+            return sum(
+                len(self._buckets.get(bucket, ()))
+                for bucket in range(self._bucket(since_ts), self._bucket(now_ts) + 1, self.bucket_seconds)
+            )
+
+    def snapshot(self) -> Tuple[int, int, int]:
+        """Return (tracked sessions, total messages, sessions expired so far)."""
+        with self._lock:
+            return len(self._entries), self._total_messages, self._expired
@@ -1,67 +1,127 @@
 from typing import Dict, Any, List, Optional
+import copy
+import time
+import asyncio
 import logging
-from datetime import datetime, timedelta
-from app.config import MAX_CONTEXT_MESSAGES
+from contextlib import asynccontextmanager
+from app.config import (
+    MAX_CONTEXT_MESSAGES, SESSION_TTL_SECONDS, SESSION_EXPIRY_INTERVAL_SECONDS,
+    HISTORY_ROLLING_SUMMARY, HISTORY_SUMMARY_USE_LLM, HISTORY_SUMMARY_BATCH_MESSAGES,
+)
+from app.session_model import Session, ChatTurn
+from app.session_store import SessionStore, build_session_store
+from app.session_index import SessionActivityIndex
+from app.conversation_summarizer import get_conversation_summarizer
+from utils.history_renderer import fold_into_summary
 
 logger = logging.getLogger(__name__)
 
-# Enhanced session storage with metadata
-SESSIONS: Dict[str, Dict[str, Any]] = {}
+# Enhanced session storage with metadata (in-memory or shared, see session_store)
+session_store: SessionStore = build_session_store()
 
-def get_session(session_id: str) -> Dict[str, Any]:
+# last_active index and running counters for this process (expiry + stats)
+activity_index = SessionActivityIndex()
+_expiry_task: Optional[asyncio.Task] = None
+
+@asynccontextmanager
+async def session_turn(session_id: str):
+    """
+    Scope one turn (or background job) on a session. Shared stores load the
+    session once on entry and write it back on exit, so the helpers below
+    never wait on the network; nested scopes share the same copy.
+    """
+    await session_store.acheckout(session_id)
+    try:
+        yield
+    finally:
+        await session_store.arelease(session_id)
+
+def get_session(session_id: str) -> Session:
     """
     Retrieves a session or creates a new one if it doesn't exist with enhanced metadata.
     """
-    if session_id not in SESSIONS:
-        now = datetime.now()
-        SESSIONS[session_id] = {
-            "chat_history": [],
-            "stage": "initial",
-            "created_at": now,
-            "last_active": now,
-            "message_count": 0,
-            "user_preferences": {},
-            "collected_info": {},
-            "conversation_context": {
-                "current_agent": None,
-                "primary_product": None,
-                "has_greeted": False,
-                "information_collected": False,
-                "last_intent": None,
-                "error_count": 0
-            }
-        }
+    session = session_store.get(session_id)
+    if session is None:
+        session = Session()
+        session_store.save(session_id, session)
         logger.info(f"Created new session: {session_id}")
+    elif isinstance(session, dict):
+        # Written by an older release before sessions were slotted
+        session = Session.from_dict(session)
+        session_store.save(session_id, session)
     else:
-        # Update last active time
-        SESSIONS[session_id]["last_active"] = datetime.now()
+        # Update last active time (persisted with the next write)
+        session.touch()
     
-    return SESSIONS[session_id]
+    activity_index.touch(session_id, session.last_active_ts)
+    return session
+
+def save_session(session_id: str, session: Session):
+    """
+    Persists a session after it has been modified in place.
+    """
+    session_store.save(session_id, session)
+
+def snapshot_session(session_id: str) -> Dict[str, Any]:
+    """
+    Captures the agent-mutable parts of a session (stage, collected info,
+    conversation context) so speculative work can be rolled back.
+    """
+    session = get_session(session_id)
+    return copy.deepcopy({
+        "stage": session.stage,
+        "collected_info": session.collected_info,
+        "conversation_context": session.conversation_context,
+    })
+
+def restore_session(session_id: str, snapshot: Dict[str, Any]):
+    """
+    Rolls a session back to a snapshot taken with snapshot_session. The session
+    object is updated in place, so references held by callers stay valid.
+    """
+    session = get_session(session_id)
+    session.stage = snapshot["stage"]
+    session["collected_info"] = copy.deepcopy(snapshot["collected_info"])
+    session.conversation_context = copy.deepcopy(snapshot["conversation_context"])
+    save_session(session_id, session)
+    logger.debug(f"Restored session {session_id} from snapshot")
 
 def update_session(session_id: str, user_message: str, agent_response: str):
     """
     Updates the chat history and session metadata for a given session.
     """
     session = get_session(session_id)
-    chat_history = session["chat_history"]
+    now = int(time.time())
     
     # Add messages to history
-    chat_history.append({"role": "user", "content": user_message, "timestamp": datetime.now()})
-    chat_history.append({"role": "assistant", "content": agent_response, "timestamp": datetime.now()})
+    session.add_turn("user", user_message, now)
+    session.add_turn("assistant", agent_response, now)
     
     # Update session metadata
-    session["message_count"] += 1
-    session["last_active"] = datetime.now()
+    session.message_count += 1
+    session.touch(now)
+    activity_index.touch(session_id, now)
+    activity_index.add_messages(session_id)
     
     # Trim history to keep it within the configured limit
-    if len(chat_history) > MAX_CONTEXT_MESSAGES * 2:
+    max_messages = MAX_CONTEXT_MESSAGES * 2
+    summarize_with_llm = HISTORY_ROLLING_SUMMARY and HISTORY_SUMMARY_USE_LLM
+    evicted = []
+    if len(session.chat_history) > max_messages + (HISTORY_SUMMARY_BATCH_MESSAGES if summarize_with_llm else 0):
         # Keep the last MAX_CONTEXT_MESSAGES pairs of messages
-        session["chat_history"] = chat_history[-(MAX_CONTEXT_MESSAGES * 2):]
+        evicted = session.chat_history[:-max_messages]
+        del session.chat_history[:-max_messages]
+        if HISTORY_ROLLING_SUMMARY and not summarize_with_llm:
+            session.conversation_summary = fold_into_summary(session.conversation_summary, evicted)
         logger.debug(f"Trimmed chat history for session {session_id}")
     
-    logger.debug(f"Updated session {session_id}: {session['message_count']} total messages")
+    save_session(session_id, session)
+    if evicted and summarize_with_llm:
+        # Folded into conversation_summary off the response path
+        get_conversation_summarizer().schedule(session_id, evicted)
+    logger.debug(f"Updated session {session_id}: {session.message_count} total messages")
 
-def get_chat_history(session_id: str) -> List[Dict[str, str]]:
+def get_chat_history(session_id: str) -> List[ChatTurn]:
     """
     Returns the chat history for a given session.
     """
@@ -82,6 +142,7 @@ def set_stage(session_id: str, stage: str):
     session = get_session(session_id)
     old_stage = session.get("stage", "initial")
     session["stage"] = stage
+    save_session(session_id, session)
     logger.info(f"Session {session_id} stage changed: {old_stage} -> {stage}")
 
 def update_conversation_context(session_id: str, **kwargs):
@@ -94,6 +155,7 @@ def update_conversation_context(session_id: str, **kwargs):
     for key, value in kwargs.items():
         context[key] = value  # Always update/add the key-value pair
     
+    save_session(session_id, session)
     logger.debug(f"Updated conversation context for session {session_id}: {kwargs}")
 
 def set_collected_info(session_id: str, info_type: str, value: Any):
@@ -101,7 +163,13 @@ def set_collected_info(session_id: str, info_type: str, value: Any):
     Stores collected information for the session.
     """
     session = get_session(session_id)
-    session["collected_info"][info_type] = value
+    collected_info = session["collected_info"]
+    if value is collected_info:
+        # Agents hand back the whole collected_info; nesting it in itself would make
+        # the session circular, which shared stores cannot serialise
+        value = {key: item for key, item in value.items() if key != info_type}
+    collected_info[info_type] = value
+    save_session(session_id, session)
     logger.debug(f"Stored {info_type} for session {session_id}")
 
 def get_collected_info(session_id: str, info_type: str = None) -> Any:
@@ -120,45 +188,95 @@ def increment_error_count(session_id: str):
     session = get_session(session_id)
     session["conversation_context"]["error_count"] += 1
     error_count = session["conversation_context"]["error_count"]
+    save_session(session_id, session)
     
     if error_count > 5:
         logger.warning(f"High error count ({error_count}) for session {session_id}")
     
     return error_count
 
-def cleanup_old_sessions(max_age_hours: int = 24):
+def _pop_expired_sessions(max_age_hours: Optional[float]) -> List[str]:
+    max_age_seconds = SESSION_TTL_SECONDS if max_age_hours is None else int(max_age_hours * 3600)
+    return activity_index.pop_expired(int(time.time()) - max_age_seconds)
+
+def cleanup_old_sessions(max_age_hours: Optional[float] = None):
     """
-    Removes sessions older than specified hours.
+    Removes sessions idle for longer than the given hours (SESSION_TTL_SECONDS by default).
+
+    Only the expired part of the activity index is visited. Backends that expire
+    keys themselves (Redis with a TTL) are left alone; the sessions are just
+    dropped from this process's index.
     """
-    cutoff_time = datetime.now() - timedelta(hours=max_age_hours)
-    to_remove = []
+    expired = _pop_expired_sessions(max_age_hours)
+    
+    if not session_store.expires_natively:
+        for session_id in expired:
+            session_store.delete(session_id)
     
-    for session_id, session in SESSIONS.items():
-        if session.get("last_active", datetime.now()) < cutoff_time:
-            to_remove.append(session_id)
+    if expired:
+        logger.info(f"Cleaned up {len(expired)} idle session(s)")
+    return len(expired)
+
+async def acleanup_old_sessions(max_age_hours: Optional[float] = None):
+    """
+    Async variant of cleanup_old_sessions for the background expiry task.
+    """
+    expired = _pop_expired_sessions(max_age_hours)
     
-    for session_id in to_remove:
-        del SESSIONS[session_id]
-        logger.info(f"Cleaned up old session: {session_id}")
+    if not session_store.expires_natively:
+        for session_id in expired:
+            await session_store.adelete(session_id)
     
-    return len(to_remove)
+    if expired:
+        logger.info(f"Cleaned up {len(expired)} idle session(s)")
+    return len(expired)
+
+async def _run_session_expiry(interval_seconds: float):
+    """
+    Periodically expire idle sessions until cancelled.
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await acleanup_old_sessions()
+        except Exception as e:
+            logger.error(f"Session expiry pass failed: {str(e)}")
+
+def start_session_expiry(interval_seconds: float = SESSION_EXPIRY_INTERVAL_SECONDS):
+    """
+    Start the background expiry task on the running event loop. Safe to call more than once.
+    """
+    global _expiry_task
+    if _expiry_task is not None and not _expiry_task.done():
+        return
+    _expiry_task = asyncio.get_running_loop().create_task(
+        _run_session_expiry(interval_seconds), name="session-expiry"
+    )
+    logger.info(f"Session expiry task started (every {interval_seconds}s, idle timeout {SESSION_TTL_SECONDS}s)")
+
+async def stop_session_expiry():
+    """
+    Cancel the background expiry task.
+    """
+    global _expiry_task
+    if _expiry_task is None:
+        return
+    _expiry_task.cancel()
+    await asyncio.gather(_expiry_task, return_exceptions=True)
+    _expiry_task = None
 
 def get_session_stats() -> Dict[str, Any]:
     """
-    Returns statistics about active sessions.
+    Returns statistics about active sessions from running counters.
     """
-    total_sessions = len(SESSIONS)
-    active_sessions = 0
-    total_messages = 0
-    
-    for session in SESSIONS.values():
-        if session.get("last_active", datetime.min) > datetime.now() - timedelta(hours=1):
-            active_sessions += 1
-        total_messages += session.get("message_count", 0)
+    total_sessions, total_messages, expired_sessions = activity_index.snapshot()
+    now = int(time.time())
+    active_sessions = activity_index.count_active_between(now - 3600, now)
     
     return {
         "total_sessions": total_sessions,
         "active_sessions": active_sessions,
         "total_messages": total_messages,
+        "expired_sessions": expired_sessions,
         "average_messages_per_session": total_messages / max(total_sessions, 1)
-    }
\ No newline at end of file
+    }
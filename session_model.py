@@ -0,0 +1,184 @@
+"""
+Compact Session Model
+=====================
+
+Slotted replacements for the nested session dicts. Sessions and chat turns
+keep the mapping-style accessors the agents already use
+(``session["stage"]``, ``session.get("conversation_context", {})``,
+``turn["content"]``), but store timestamps as integer epoch seconds, intern
+role strings, and only allocate sub-dicts once they are touched.
+"""
+
+import sys
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+def _to_epoch(value: Any) -> int:
+    """Normalise a datetime or number to integer epoch seconds."""
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+def _default_conversation_context() -> Dict[str, Any]:
+    return {
+        "current_agent": None,
+        "primary_product": None,
+        "has_greeted": False,
+        "information_collected": False,
+        "last_intent": None,
+        "error_count": 0
+    }
+
+@dataclass(slots=True, eq=False)
+class ChatTurn(Mapping):
+    """
+    A single chat message. Behaves like the old
+    ``{"role", "content", "timestamp"}`` dict for read access.
+    """
+    role: str
+    content: str
+    ts: int = field(default_factory=lambda: int(time.time()))
+
+    _KEYS = ("role", "content", "timestamp")
+
+    def __post_init__(self):
+        self.role = sys.intern(self.role)
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "role":
+            return self.role
+        if key == "content":
+            return self.content
+        if key == "timestamp":
+            return datetime.fromtimestamp(self.ts)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def __repr__(self) -> str:
+        # Rendered into prompts in places, so keep it as short as the content allows
+        return repr({"role": self.role, "content": self.content})
+
+@dataclass(slots=True, eq=False)
+class Session:
+    """
+    Per-conversation state with dict-style access to the legacy keys.
+    """
+    chat_history: List[ChatTurn] = field(default_factory=list)
+    stage: str = "initial"
+    created_ts: int = field(default_factory=lambda: int(time.time()))
+    last_active_ts: int = 0
+    message_count: int = 0
+    conversation_context: Dict[str, Any] = field(default_factory=_default_conversation_context)
+    # Rolling summary of turns trimmed from chat_history
+    conversation_summary: str = ""
+    # Rarely populated; allocated on first access
+    _collected_info: Optional[Dict[str, Any]] = None
+    _user_preferences: Optional[Dict[str, Any]] = None
+
+    _KEYS = ("chat_history", "stage", "created_at", "last_active", "message_count",
+             "user_preferences", "collected_info", "conversation_context", "conversation_summary")
+
+    def __post_init__(self):
+        if not self.last_active_ts:
+            self.last_active_ts = self.created_ts
+
+    @property
+    def collected_info(self) -> Dict[str, Any]:
+        if self._collected_info is None:
+            self._collected_info = {}
+        return self._collected_info
+
+    @property
+    def user_preferences(self) -> Dict[str, Any]:
+        if self._user_preferences is None:
+            self._user_preferences = {}
+        return self._user_preferences
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Session":
+        """Convert a legacy dict session (e.g. still held in Redis) to a Session."""
+        session = cls(
+            chat_history=[
+                ChatTurn(turn.get("role", ""), turn.get("content", ""),
+                         _to_epoch(turn.get("timestamp") or time.time()))
+                for turn in data.get("chat_history", [])
+            ],
+            stage=data.get("stage", "initial"),
+            created_ts=_to_epoch(data.get("created_at") or time.time()),
+            last_active_ts=_to_epoch(data.get("last_active") or time.time()),
+            message_count=data.get("message_count", 0),
+            conversation_context=data.get("conversation_context") or _default_conversation_context(),
+            conversation_summary=data.get("conversation_summary", ""),
+        )
+        session._collected_info = data.get("collected_info") or None
+        session._user_preferences = data.get("user_preferences") or None
+        return session
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain-dict form (epoch-second timestamps) that from_dict reads back."""
+        return {
+            "chat_history": [{"role": turn.role, "content": turn.content, "timestamp": turn.ts} for turn in self.chat_history],
+            "stage": self.stage,
+            "created_at": self.created_ts,
+            "last_active": self.last_active_ts,
+            "message_count": self.message_count,
+            "user_preferences": self._user_preferences or {},
+            "collected_info": self._collected_info or {},
+            "conversation_context": self.conversation_context,
+            "conversation_summary": self.conversation_summary,
+        }
+
+    def touch(self, now: Optional[int] = None):
+        """Mark the session as active."""
+        self.last_active_ts = int(time.time()) if now is None else now
+
+    def add_turn(self, role: str, content: str, now: Optional[int] = None):
+        """Append a chat message to the history."""
+        self.chat_history.append(ChatTurn(role, content, int(time.time()) if now is None else now))
+
+    # ---- dict-style compatibility ----
+    def __getitem__(self, key: str) -> Any:
+        if key == "created_at":
+            return datetime.fromtimestamp(self.created_ts)
+        if key == "last_active":
+            return datetime.fromtimestamp(self.last_active_ts)
+        if key in self._KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key == "created_at":
+            self.created_ts = _to_epoch(value)
+        elif key == "last_active":
+            self.last_active_ts = _to_epoch(value)
+        elif key == "collected_info":
+            self._collected_info = value
+        elif key == "user_preferences":
+            self._user_preferences = value
+        elif key in self._KEYS:
+            setattr(self, key, value)
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._KEYS
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return list(self._KEYS)
+
+    def items(self):
+        return [(key, self[key]) for key in self._KEYS]
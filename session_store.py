@@ -0,0 +1,448 @@
+"""
+Session Storage Backends
+========================
+
+Pluggable storage for conversation sessions. The session manager talks to a
+``SessionStore``; which concrete store is used is decided by configuration:
+
+- ``memory``: a process-local dict (single worker, lost on restart).
+- ``redis``:  a shared Redis-protocol backend, so several worker processes or
+  nodes can serve the same conversations.
+
+Shared stores are used a turn at a time: ``acheckout`` loads the session once
+(asynchronously) when the turn starts, the session manager's synchronous
+helpers then work on that in-process copy, and ``arelease`` writes it back
+with a versioned compare-and-set when the turn ends. A concurrent write from
+another worker is never overwritten: the two versions are merged and the
+write is retried.
+
+A bounded in-process LRU of recently loaded or written sessions sits in front
+of Redis, so a turn on a session this worker just served starts without a
+round trip. Entries expire after a few seconds, and a compare-and-set
+conflict drops the entry, since it means another worker changed the session.
+"""
+
+import copy
+import json
+import time
+import asyncio
+import logging
+import threading
+import weakref
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from enum import Enum
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+from app.session_model import Session
+
+logger = logging.getLogger(__name__)
+
+class SessionStore(ABC):
+    """
+    Minimal key/value interface for session objects.
+    """
+
+    # True when the backend drops idle sessions by itself (e.g. key TTLs)
+    expires_natively = False
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Session]:
+        """Return the session, or None if it does not exist."""
+
+    @abstractmethod
+    def save(self, session_id: str, session: Session) -> None:
+        """Create or overwrite a session."""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """Remove a session if present."""
+
+    @abstractmethod
+    def items(self) -> Iterator[Tuple[str, Session]]:
+        """Iterate over all (session_id, session) pairs."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of stored sessions."""
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    async def acheckout(self, session_id: str) -> None:
+        """Load a session for the duration of a turn (no-op for in-process stores)."""
+
+    async def arelease(self, session_id: str) -> None:
+        """End a turn started with acheckout, persisting any changes."""
+
+    async def adelete(self, session_id: str) -> None:
+        self.delete(session_id)
+
+class InMemorySessionStore(SessionStore):
+    """
+    Process-local store. Sessions are returned by reference, so in-place
+    mutations are visible immediately and ``save`` is effectively free.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, Session] = {}
+
+    def get(self, session_id: str) -> Optional[Session]:
+        return self._sessions.get(session_id)
+
+    def save(self, session_id: str, session: Session) -> None:
+        self._sessions[session_id] = session
+
+    def delete(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+    def items(self) -> Iterator[Tuple[str, Session]]:
+        return iter(list(self._sessions.items()))
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+# ---- JSON encoding of sessions ----
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (set, tuple)):
+        return list(value)
+    return str(value)
+
+def _json_object_hook(value: Dict[str, Any]) -> Any:
+    if "__datetime__" in value:
+        return datetime.fromisoformat(value["__datetime__"])
+    if "__date__" in value:
+        return date.fromisoformat(value["__date__"])
+    return value
+
+def encode_session(session: Session) -> str:
+    return json.dumps(session.to_dict(), default=_json_default, ensure_ascii=False)
+
+def decode_session(payload) -> Dict[str, Any]:
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8")
+    return json.loads(payload, object_hook=_json_object_hook)
+
+def _merge_dict(base: Dict[str, Any], ours: Dict[str, Any], theirs: Dict[str, Any]) -> Dict[str, Any]:
+    """Three-way merge by key: keys this worker changed win, the rest come from theirs."""
+    merged = dict(theirs)
+    for key in set(base) | set(ours):
+        if ours.get(key) != base.get(key):
+            if key in ours:
+                merged[key] = ours[key]
+            else:
+                merged.pop(key, None)
+    return merged
+
+def merge_sessions(base: Dict[str, Any], ours: Dict[str, Any], theirs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Merge this worker's version of a session with one written concurrently
+    by another worker, both derived from base (all in to_dict form).
+
+    Messages added on either side are kept, counters are combined, and for
+    the remaining fields the values this worker changed win.
+    """
+    def turn_key(turn):
+        return turn["role"], turn["content"], turn["timestamp"]
+
+    seen = {turn_key(turn) for turn in base["chat_history"]}
+    new_turns = [turn for turn in ours["chat_history"] if turn_key(turn) not in seen]
+    history = theirs["chat_history"] + new_turns
+    if len(ours["chat_history"]) < len(base["chat_history"]) + len(new_turns):
+        # This worker trimmed its history; keep the merged one to the same length
+        history = history[-len(ours["chat_history"]):]
+
+    merged = {
+        "chat_history": history,
+        "created_at": theirs["created_at"],
+        "last_active": max(ours["last_active"], theirs["last_active"]),
+        "message_count": theirs["message_count"] + ours["message_count"] - base["message_count"],
+    }
+    for key in ("stage", "conversation_summary"):
+        merged[key] = ours[key] if ours[key] != base[key] else theirs[key]
+    for key in ("conversation_context", "collected_info", "user_preferences"):
+        merged[key] = _merge_dict(base.get(key) or {}, ours.get(key) or {}, theirs.get(key) or {})
+    return merged
+
+_EMPTY_SESSION = {
+    "chat_history": [], "created_at": 0, "last_active": 0, "message_count": 0, "stage": "initial",
+    "conversation_summary": "", "conversation_context": {}, "collected_info": {}, "user_preferences": {},
+}
+
+# Write the session only if its version is still the one this worker loaded
+_COMPARE_AND_SET = """
+local current = redis.call('HGET', KEYS[1], 'version')
+if (current or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'version', ARGV[2], 'data', ARGV[3])
+if tonumber(ARGV[4]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+end
+return 1
+"""
+
+@dataclass
+class _Lease:
+    """A session checked out by the turns currently running in this process."""
+    session: Optional[Session] = None
+    version: int = 0
+    base: Optional[Dict[str, Any]] = None
+    refs: int = 1
+    dirty: bool = False
+    loaded: asyncio.Event = field(default_factory=asyncio.Event)
+
+class RedisSessionStore(SessionStore):
+    """
+    Shared store for any client speaking the Redis protocol (redis-py,
+    fakeredis, or a compatible server).
+
+    Each session is a hash of ``version`` and ``data`` (the session as JSON).
+    Turns go through acheckout/arelease on an asyncio client (one per event
+    loop); the synchronous methods are only used outside a turn (expiry,
+    scripts) and talk to Redis directly with a blocking client.
+
+    Up to ``cache_size`` sessions (as their version and to_dict form) are
+    kept for ``cache_ttl`` seconds after they were loaded or written.
+    Cached dicts are never mutated: turns work on a deep copy.
+    """
+
+    MAX_WRITE_ATTEMPTS = 5
+
+    def __init__(self, url: Optional[str] = None, prefix: str = "hlas:session:", ttl_seconds: Optional[int] = None,
+                 client=None, sync_client=None, cache_size: int = 0, cache_ttl: float = 0.0):
+        self.url = url or "redis://localhost:6379/0"
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+        self.expires_natively = bool(ttl_seconds)
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._client = client
+        self._sync_client = sync_client
+        self._loop_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._leases: Dict[str, _Lease] = {}
+        self._cache: "OrderedDict[str, Tuple[int, Dict[str, Any], float]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}"
+
+    # ---- LRU read tier ----
+    def _cached(self, session_id: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        with self._cache_lock:
+            entry = self._cache.get(session_id)
+            if entry is None:
+                return None
+            version, data, stored_at = entry
+            if time.monotonic() - stored_at >= self.cache_ttl:
+                del self._cache[session_id]
+                return None
+            self._cache.move_to_end(session_id)
+            return version, data
+
+    def _remember(self, session_id: str, version: int, data: Dict[str, Any]) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[session_id] = (version, data, time.monotonic())
+            self._cache.move_to_end(session_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _forget(self, session_id: str) -> None:
+        with self._cache_lock:
+            self._cache.pop(session_id, None)
+
+    def _async_client(self):
+        if self._client is not None:
+            return self._client
+        # redis.asyncio connections belong to the loop that opened them
+        loop = asyncio.get_running_loop()
+        client = self._loop_clients.get(loop)
+        if client is None:
+            try:
+                import redis.asyncio as aioredis
+            except ImportError as e:
+                raise ImportError("The 'redis' package is required for SESSION_BACKEND=redis") from e
+            client = aioredis.Redis.from_url(self.url)
+            self._loop_clients[loop] = client
+        return client
+
+    def _blocking_client(self):
+        if self._sync_client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError("The 'redis' package is required for SESSION_BACKEND=redis") from e
+            self._sync_client = redis.Redis.from_url(self.url)
+        return self._sync_client
+
+    def _decode(self, session_id: str, version, data) -> Tuple[int, Optional[Dict[str, Any]]]:
+        if data is None:
+            return 0, None
+        try:
+            return int(version or 0), decode_session(data)
+        except Exception as e:
+            logger.error(f"Failed to decode session {session_id}: {str(e)}")
+            return int(version or 0), None
+
+    async def _aload(self, session_id: str) -> Tuple[int, Optional[Dict[str, Any]]]:
+        client = self._async_client()
+        try:
+            version, data = await client.hmget(self._key(session_id), "version", "data")
+        except Exception as e:
+            if "WRONGTYPE" not in str(e):
+                raise
+            # Written by the old pickle-based store; start the conversation afresh
+            logger.warning(f"Discarding session {session_id} stored in an outdated format")
+            await client.delete(self._key(session_id))
+            return 0, None
+        return self._decode(session_id, version, data)
+
+    async def acheckout(self, session_id: str) -> None:
+        lease = self._leases.get(session_id)
+        if lease is not None:
+            # Another turn or job in this process already holds it; share the copy
+            lease.refs += 1
+            await lease.loaded.wait()
+            return
+
+        lease = _Lease()
+        self._leases[session_id] = lease
+        try:
+            cached = self._cached(session_id)
+            if cached is not None:
+                lease.version, lease.base = cached
+            else:
+                lease.version, lease.base = await self._aload(session_id)
+                if lease.base is not None:
+                    self._remember(session_id, lease.version, lease.base)
+            if lease.base is not None:
+                # The base stays untouched for merging if the write-back conflicts
+                lease.session = Session.from_dict(copy.deepcopy(lease.base))
+        except Exception:
+            del self._leases[session_id]
+            raise
+        finally:
+            lease.loaded.set()
+
+    async def arelease(self, session_id: str) -> None:
+        lease = self._leases.get(session_id)
+        if lease is None:
+            return
+        lease.refs -= 1
+        if lease.refs > 0:
+            return
+        del self._leases[session_id]
+        if lease.dirty and lease.session is not None:
+            await self._acommit(session_id, lease)
+
+    async def _acommit(self, session_id: str, lease: _Lease) -> None:
+        client = self._async_client()
+        ours = lease.session.to_dict()
+        base = lease.base
+        version = lease.version
+        for attempt in range(self.MAX_WRITE_ATTEMPTS):
+            payload = json.dumps(ours, default=_json_default, ensure_ascii=False)
+            written = await client.eval(_COMPARE_AND_SET, 1, self._key(session_id),
+                                        str(version), str(version + 1), payload, str(self.ttl_seconds or 0))
+            if written:
+                # Decoded again so the cached copy shares nothing with the released session
+                self._remember(session_id, version + 1, decode_session(payload))
+                return
+            # Another worker wrote this session since it was loaded (or cached)
+            self._forget(session_id)
+            version, theirs = await self._aload(session_id)
+            if theirs is None:
+                version, theirs = 0, dict(_EMPTY_SESSION)
+            ours = merge_sessions(base or _EMPTY_SESSION, ours, theirs)
+            base = theirs
+            logger.warning(f"Concurrent update to session {session_id}; merged (attempt {attempt + 1})")
+        logger.error(f"Gave up writing session {session_id} after {self.MAX_WRITE_ATTEMPTS} conflicting updates")
+
+    def get(self, session_id: str) -> Optional[Session]:
+        lease = self._leases.get(session_id)
+        if lease is not None:
+            return lease.session
+        cached = self._cached(session_id)
+        if cached is not None:
+            return Session.from_dict(copy.deepcopy(cached[1]))
+        # Outside a turn: read straight from Redis
+        try:
+            version, data = self._blocking_client().hmget(self._key(session_id), "version", "data")
+        except Exception as e:
+            logger.error(f"Failed to read session {session_id}: {str(e)}")
+            return None
+        _, data = self._decode(session_id, version, data)
+        return Session.from_dict(data) if data is not None else None
+
+    def save(self, session_id: str, session: Session) -> None:
+        lease = self._leases.get(session_id)
+        if lease is not None:
+            # Written back once, when the turn ends
+            lease.session = session
+            lease.dirty = True
+            return
+        # Outside a turn there is no loaded version to compare against
+        self._forget(session_id)
+        client = self._blocking_client()
+        key = self._key(session_id)
+        pipe = client.pipeline()
+        pipe.hincrby(key, "version", 1)
+        pipe.hset(key, "data", encode_session(session))
+        if self.ttl_seconds:
+            pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
+
+    def delete(self, session_id: str) -> None:
+        self._forget(session_id)
+        self._blocking_client().delete(self._key(session_id))
+
+    async def adelete(self, session_id: str) -> None:
+        self._forget(session_id)
+        await self._async_client().delete(self._key(session_id))
+
+    def items(self) -> Iterator[Tuple[str, Session]]:
+        for key in self._blocking_client().scan_iter(match=f"{self.prefix}*"):
+            key = key.decode() if isinstance(key, bytes) else key
+            session_id = key[len(self.prefix):]
+            session = self.get(session_id)
+            if session is not None:
+                yield session_id, session
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self._blocking_client().scan_iter(match=f"{self.prefix}*"))
+
+    def __contains__(self, session_id: str) -> bool:
+        lease = self._leases.get(session_id)
+        if lease is not None:
+            return lease.session is not None
+        return bool(self._blocking_client().exists(self._key(session_id)))
+
+def build_session_store() -> SessionStore:
+    """
+    Create the session store selected by the SESSION_BACKEND environment variable.
+    """
+    from app.config import SESSION_BACKEND, REDIS_URL, SESSION_CACHE_SIZE, SESSION_CACHE_TTL_SECONDS, SESSION_TTL_SECONDS
+
+    backend = SESSION_BACKEND.lower()
+    if backend == "redis":
+        logger.info(f"Using Redis session store (compare-and-set writes, LRU front: {SESSION_CACHE_SIZE} sessions, "
+                    f"{SESSION_CACHE_TTL_SECONDS}s)")
+        return RedisSessionStore(url=REDIS_URL, ttl_seconds=SESSION_TTL_SECONDS,
+                                 cache_size=SESSION_CACHE_SIZE, cache_ttl=SESSION_CACHE_TTL_SECONDS)
+    if backend != "memory":
+        logger.warning(f"Unknown SESSION_BACKEND '{SESSION_BACKEND}', falling back to in-memory sessions")
+    return InMemorySessionStore()
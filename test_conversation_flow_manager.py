@@ -0,0 +1,44 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import app.conversation_flow_manager as flow_module
+from app.conversation_flow_manager import ConversationFlowManager
+from app.session_manager import get_session, update_conversation_context
+
+
+class FlakyLLM:
+    """Fails on the first call, then answers "continue"."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        if self.calls == 1:
+            raise TimeoutError("LLM timed out")
+        return SimpleNamespace(content='{"decision": "continue", "confidence": 0.9, "reason": "same topic"}')
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    fake = FlakyLLM()
+    monkeypatch.setattr(flow_module, "llm", fake)
+    return fake
+
+
+def test_fallback_decision_is_not_memoised(llm):
+    manager = ConversationFlowManager()
+    get_session("flow-1")
+    update_conversation_context("flow-1", primary_product="TRAVEL")
+    history = [{"role": "assistant", "content": "Where are you travelling to?"}]
+
+    first = asyncio.run(manager.aanalyze_conversation_flow("flow-1", "Japan", history))
+    second = asyncio.run(manager.aanalyze_conversation_flow("flow-1", "Japan", history))
+    third = asyncio.run(manager.aanalyze_conversation_flow("flow-1", "Japan", history))
+
+    assert first["reason"] == "Error occurred, defaulting to continue with TRAVEL"
+    assert second == third == {"decision": "continue", "confidence": 0.9, "reason": "same topic"}
+    # The failure was retried; the successful decision was reused
+    assert llm.calls == 2
@@ -0,0 +1,114 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import app.session_manager as session_manager
+import utils.llm_services as llm_services
+from app.conversation_summarizer import ConversationSummarizer
+from app.session_store import InMemorySessionStore
+
+
+class FakeLLM:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.prompts = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def ainvoke(self, prompt):
+        self.prompts.append(prompt[1].content)
+        await self.gate.wait()
+        if self.fail:
+            raise TimeoutError("LLM timed out")
+        return SimpleNamespace(content=f"summary {len(self.prompts)}")
+
+
+@pytest.fixture
+def summarizer(monkeypatch):
+    summarizer = ConversationSummarizer()
+    monkeypatch.setattr(session_manager, "session_store", InMemorySessionStore())
+    monkeypatch.setattr(session_manager, "get_conversation_summarizer", lambda: summarizer)
+    monkeypatch.setattr(session_manager, "HISTORY_ROLLING_SUMMARY", True)
+    monkeypatch.setattr(session_manager, "HISTORY_SUMMARY_USE_LLM", True)
+    return summarizer
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    fake = FakeLLM()
+    monkeypatch.setattr(llm_services, "get_llm", lambda: fake)
+    return fake
+
+
+def chat(session_id, turns, start=0):
+    for i in range(start, start + turns):
+        session_manager.update_session(session_id, f"question {i}", f"answer {i}")
+
+
+async def settle(summarizer):
+    while summarizer._jobs:
+        await asyncio.gather(*list(summarizer._jobs))
+
+
+# History is trimmed to MAX_CONTEXT_MESSAGES pairs once it grows a batch past that
+TURNS_TO_EVICT = session_manager.MAX_CONTEXT_MESSAGES + session_manager.HISTORY_SUMMARY_BATCH_MESSAGES // 2 + 1
+
+
+def test_evicted_turns_are_summarised_in_the_background(summarizer, llm):
+    async def scenario():
+        chat("s1", TURNS_TO_EVICT)
+        # Trimmed right away; the summary follows
+        assert len(session_manager.get_chat_history("s1")) == session_manager.MAX_CONTEXT_MESSAGES * 2
+        await settle(summarizer)
+
+    asyncio.run(scenario())
+
+    assert session_manager.get_session("s1").conversation_summary == "summary 1"
+    assert "question 0" in llm.prompts[0] and "answer 3" in llm.prompts[0]
+    assert "question 4" not in llm.prompts[0]
+    assert summarizer.get_stats() == {"scheduled": 1, "completed": 1, "fallbacks": 0, "in_flight": 0}
+
+
+def test_failed_llm_call_folds_extractively(summarizer, llm):
+    llm.fail = True
+
+    async def scenario():
+        chat("s1", TURNS_TO_EVICT)
+        await settle(summarizer)
+
+    asyncio.run(scenario())
+
+    summary = session_manager.get_session("s1").conversation_summary
+    assert "question 0" in summary and "answer 3" in summary
+    assert summarizer.get_stats()["fallbacks"] == 1
+
+
+def test_turns_evicted_while_a_job_runs_are_folded_by_it_in_order(summarizer, llm):
+    async def scenario():
+        llm.gate.clear()
+        chat("s1", TURNS_TO_EVICT)
+        await asyncio.sleep(0)
+        # A second eviction while the first summary call is in flight
+        chat("s1", session_manager.HISTORY_SUMMARY_BATCH_MESSAGES // 2 + 1, start=TURNS_TO_EVICT)
+        assert len(summarizer._jobs) == 1
+        llm.gate.set()
+        await settle(summarizer)
+
+    asyncio.run(scenario())
+
+    assert len(llm.prompts) == 2
+    assert "Existing summary:\nsummary 1" in llm.prompts[1]
+    assert "question 4" in llm.prompts[1]
+    assert session_manager.get_session("s1").conversation_summary == "summary 2"
+    assert summarizer.get_stats() == {"scheduled": 2, "completed": 2, "fallbacks": 0, "in_flight": 0}
+
+
+def test_extractive_mode_folds_while_trimming(summarizer, llm, monkeypatch):
+    monkeypatch.setattr(session_manager, "HISTORY_SUMMARY_USE_LLM", False)
+
+    chat("s1", session_manager.MAX_CONTEXT_MESSAGES + 1)
+
+    assert len(session_manager.get_chat_history("s1")) == session_manager.MAX_CONTEXT_MESSAGES * 2
+    assert "question 0" in session_manager.get_session("s1").conversation_summary
+    assert llm.prompts == [] and summarizer.get_stats()["scheduled"] == 0
@@ -0,0 +1,159 @@
+from types import SimpleNamespace
+
+import pytest
+
+import embedding_agent
+from utils.ingestion_cache import IngestionCache
+
+
+class FakeQuery:
+    """Serves fetch_objects from (uuid, product_name) pairs, applying the product filter."""
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.calls = []
+
+    def fetch_objects(self, filters=None, limit=None, offset=0, return_properties=None):
+        self.calls.append({"limit": limit, "offset": offset, "return_properties": return_properties})
+        product_name = filters.value
+        matching = [uuid for uuid, product in self.objects if product == product_name]
+        page = matching[offset:offset + limit]
+        return SimpleNamespace(objects=[SimpleNamespace(uuid=uuid, properties={}) for uuid in page])
+
+
+def test_fetch_product_object_ids_pages_a_filtered_query():
+    objects = [(f"travel-{i}", "TRAVEL") for i in range(5)] + [(f"maid-{i}", "MAID") for i in range(3)]
+    collection = SimpleNamespace(query=FakeQuery(objects))
+
+    ids = embedding_agent.fetch_product_object_ids(collection, "TRAVEL", page_size=2)
+
+    assert ids == {f"travel-{i}" for i in range(5)}
+    assert [call["offset"] for call in collection.query.calls] == [0, 2, 4]
+    assert all(call["return_properties"] == [] for call in collection.query.calls)
+
+
+class Recorder:
+    """Stands in for the question generator and embedder, recording what they were asked."""
+
+    def __init__(self):
+        self.questions = []
+        self.embedded = []
+
+    def generate(self, chunks, concurrency=None):
+        self.questions.extend(chunks)
+        return [[f"what about {chunk}?"] for chunk in chunks]
+
+    def embed(self, texts, batch_size=None, concurrency=None):
+        self.embedded.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+def test_enrich_window_only_pays_for_chunks_missing_from_the_cache(tmp_path, monkeypatch):
+    recorder = Recorder()
+    monkeypatch.setattr(embedding_agent, "generate_questions_for_chunks", recorder.generate)
+    monkeypatch.setattr(embedding_agent, "embed_texts", recorder.embed)
+    cache = IngestionCache(str(tmp_path / "cache.sqlite"), chat_model="chat", embedding_model="embed", prompt_version="1")
+
+    first = embedding_agent.enrich_window([{"content": "chunk a"}, {"content": "chunk b"}], cache=cache)
+    recorder.questions.clear()
+    recorder.embedded.clear()
+
+    objects = [{"content": "chunk a"}, {"content": "chunk c"}, {"content": "chunk b"}]
+    second = embedding_agent.enrich_window(objects, cache=cache)
+    cache.close()
+
+    assert recorder.questions == ["chunk c"]
+    assert recorder.embedded == ["chunk c", "what about chunk c?"]
+    assert second[0] == first[0] and second[2] == first[1]
+    assert objects[0]["questions"] == ["what about chunk a?"]
+
+
+class FakeKnowledgeBase:
+    """A collection holding {uuid: properties}, with the batch, query and delete calls embed_product makes."""
+
+    def __init__(self, objects, fail_writes=False):
+        self.objects = dict(objects)
+        self.written = []
+        self.fail_writes = fail_writes
+        self.batch = SimpleNamespace(dynamic=self._dynamic, failed_objects=[])
+        self.data = SimpleNamespace(delete_many=self._delete_many)
+        self.query = self
+
+    def fetch_objects(self, filters=None, limit=None, offset=0, return_properties=None):
+        matching = [uuid for uuid, properties in self.objects.items() if properties["product_name"] == filters.value]
+        return SimpleNamespace(objects=[SimpleNamespace(uuid=uuid, properties={}) for uuid in matching[offset:offset + limit]])
+
+    def _dynamic(self):
+        knowledge_base = self
+
+        class Batch:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc_info):
+                return False
+
+            def add_object(self, properties, uuid, vector):
+                if knowledge_base.fail_writes:
+                    knowledge_base.batch.failed_objects.append(uuid)
+                    return
+                knowledge_base.written.append(str(uuid))
+                knowledge_base.objects[str(uuid)] = dict(properties)
+
+        return Batch()
+
+    def _delete_many(self, where):
+        ids = [str(uuid) for uuid in where.value]
+        for uuid in ids:
+            self.objects.pop(uuid, None)
+        return SimpleNamespace(successful=len(ids), failed=0)
+
+
+def chunk(content, product="Travel"):
+    return {"content": content, "questions": [], "product_name": product, "doc_type": "faq", "source_file": f"{product}_FAQs.txt"}
+
+
+@pytest.fixture
+def ingestion(tmp_path, monkeypatch):
+    enriched = []
+
+    def enrich_window(objects, stop=None, **kwargs):
+        enriched.extend(obj["content"] for obj in objects)
+        for obj in objects:
+            obj["questions"] = [f"what about {obj['content']}?"]
+        return [([1.0], [2.0]) for _ in objects]
+
+    monkeypatch.setattr(embedding_agent, "enrich_window", enrich_window)
+    monkeypatch.setattr(embedding_agent, "bump_kb_version", lambda product: "1")
+    monkeypatch.setattr(embedding_agent, "DEBUG_OUTPUT_PATH", str(tmp_path / "debug"))
+    monkeypatch.setattr(embedding_agent, "iter_product_objects", lambda product: iter([chunk("kept"), chunk("added")]))
+    return enriched
+
+
+def existing_objects():
+    stored = {embedding_agent.chunk_object_id(c): c for c in (chunk("kept"), chunk("removed from source"), chunk("kept", "Maid"))}
+    return {str(uuid): properties for uuid, properties in stored.items()}
+
+
+def test_rerun_writes_new_chunks_and_deletes_vanished_ones(ingestion):
+    knowledge_base = FakeKnowledgeBase(existing_objects())
+    client = SimpleNamespace(collections=SimpleNamespace(get=lambda name: knowledge_base))
+
+    summary = embedding_agent.embed_product("Travel", client, window_size=1)
+
+    assert ingestion == ["added"]
+    assert knowledge_base.written == [str(embedding_agent.chunk_object_id(chunk("added")))]
+    assert sorted(properties["content"] for properties in knowledge_base.objects.values()) == ["added", "kept", "kept"]
+    assert {key: summary[key] for key in ("status", "chunks", "written", "unchanged", "stale_deleted")} == {
+        "status": "ok", "chunks": 2, "written": 1, "unchanged": 1, "stale_deleted": 1,
+    }
+
+
+def test_stale_objects_are_kept_when_writes_fail(ingestion):
+    knowledge_base = FakeKnowledgeBase(existing_objects(), fail_writes=True)
+    client = SimpleNamespace(collections=SimpleNamespace(get=lambda name: knowledge_base))
+
+    summary = embedding_agent.embed_product("Travel", client)
+
+    assert summary["status"] == "partial" and summary["stale_deleted"] == 0
+    assert "removed from source" in [properties["content"] for properties in knowledge_base.objects.values()]
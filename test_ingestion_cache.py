@@ -0,0 +1,50 @@
+import time
+
+import pytest
+
+from utils.ingestion_cache import IngestionCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = IngestionCache(str(tmp_path / "cache.sqlite"), chat_model="gpt-4o", embedding_model="ada", prompt_version="1")
+    yield cache
+    cache.close()
+
+
+def entry(seed):
+    return {"questions": [f"question {seed}?"], "content_vector": [seed, 0.5], "questions_vector": [0.25, seed]}
+
+
+def test_stored_chunks_are_returned_with_their_vectors(cache):
+    cache.put_many({"chunk a": entry(1.0), "chunk b": entry(2.0)})
+
+    hits = cache.get_many(["chunk a", "chunk b", "chunk c"])
+
+    assert set(hits) == {"chunk a", "chunk b"}
+    assert hits["chunk a"] == entry(1.0)
+
+
+def test_model_or_prompt_change_misses(cache, tmp_path):
+    cache.put_many({"chunk a": entry(1.0)})
+    path = str(tmp_path / "cache.sqlite")
+
+    for kwargs in ({"chat_model": "gpt-4o-mini", "embedding_model": "ada", "prompt_version": "1"},
+                   {"chat_model": "gpt-4o", "embedding_model": "ada", "prompt_version": "2"}):
+        other = IngestionCache(path, **kwargs)
+        assert other.get_many(["chunk a"]) == {}
+        other.close()
+    reopened = IngestionCache(path, chat_model="gpt-4o", embedding_model="ada", prompt_version="1")
+    assert "chunk a" in reopened.get_many(["chunk a"])
+    reopened.close()
+
+
+def test_prune_drops_entries_unused_since_the_cutoff(cache, monkeypatch):
+    cache.put_many({"old": entry(1.0), "fresh": entry(2.0)})
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 10 * 86400)
+    cache.get_many(["fresh"])
+
+    assert cache.prune(older_than_days=5) == 1
+    assert set(cache.get_many(["old", "fresh"])) == {"fresh"}
+    assert cache.stats()["entries"] == 1
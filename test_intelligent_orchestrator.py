@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+import agents.intelligent_orchestrator as orchestrator
+import app.session_manager as session_manager
+from agents.primary_intent_agent import Intent, Product
+from app.session_store import InMemorySessionStore
+
+
+class FakeTravelAgent:
+    """Writes to the session straight away, then answers (or hangs until cancelled)."""
+
+    def __init__(self, hang=False):
+        self.hang = hang
+        self.calls = 0
+
+    async def __call__(self, user_message, chat_history, session_id):
+        self.calls += 1
+        session_manager.set_collected_info(session_id, "destination", "Japan")
+        session_manager.set_stage(session_id, "recommendation")
+        if self.hang:
+            await asyncio.sleep(60)
+        return "travel reply"
+
+
+@pytest.fixture
+def travel_session(monkeypatch):
+    monkeypatch.setattr(session_manager, "session_store", InMemorySessionStore())
+    monkeypatch.setattr(orchestrator, "SPECULATIVE_ROUTING", True)
+    monkeypatch.setattr(orchestrator, "TURN_ANALYSIS_MERGED", False)
+
+    async def no_confusion(session_id, user_message, analysis=None):
+        return None
+
+    async def maid_agent(user_message, chat_history, session_id):
+        return "maid reply"
+
+    monkeypatch.setattr(orchestrator, "adetect_confusion", no_confusion)
+    monkeypatch.setattr(orchestrator, "arun_maid_agent", maid_agent)
+    session_manager.get_session("s1")
+    session_manager.update_conversation_context("s1", primary_product=Product.TRAVEL)
+    session_manager.update_session("s1", "I need travel insurance", "Where are you travelling to?")
+    return "s1"
+
+
+def route(monkeypatch, should_continue, local_result=None):
+    async def flow(session_id, user_message, chat_history):
+        # The flow LLM call; the speculative agent runs meanwhile
+        await asyncio.sleep(0.01)
+        return {"should_continue": should_continue, "confidence": 0.9, "reason": "test",
+                "decision": "continue" if should_continue else "switch"}
+
+    monkeypatch.setattr(orchestrator, "ashould_continue_with_current_agent", flow)
+    monkeypatch.setattr(orchestrator, "local_intent", lambda user_message, chat_history: local_result)
+
+
+def test_continuation_reuses_the_speculative_agent_call(travel_session, monkeypatch):
+    travel = FakeTravelAgent()
+    monkeypatch.setattr(orchestrator, "arun_travel_agent", travel)
+    route(monkeypatch, should_continue=True)
+
+    response = asyncio.run(orchestrator.aorchestrate_chat("Japan", travel_session))
+
+    assert response == "travel reply"
+    assert travel.calls == 1
+    assert session_manager.get_collected_info(travel_session, "destination") == "Japan"
+
+
+def test_topic_switch_rolls_back_speculative_writes(travel_session, monkeypatch):
+    travel = FakeTravelAgent(hang=True)
+    monkeypatch.setattr(orchestrator, "arun_travel_agent", travel)
+    route(monkeypatch, should_continue=False,
+          local_result=Intent(product=Product.MAID, intent="product_inquiry", confidence=0.95))
+
+    response = asyncio.run(orchestrator.aorchestrate_chat("actually I need maid insurance", travel_session))
+
+    assert response == "maid reply"
+    assert travel.calls == 1
+    assert session_manager.get_collected_info(travel_session, "destination") is None
+    assert session_manager.get_stage(travel_session) == "initial"
+    context = session_manager.get_session(travel_session).conversation_context
+    assert context["primary_product"] == Product.MAID
+
+
+def test_failed_turn_rolls_back_speculative_writes(travel_session, monkeypatch):
+    travel = FakeTravelAgent(hang=True)
+    monkeypatch.setattr(orchestrator, "arun_travel_agent", travel)
+    route(monkeypatch, should_continue=True)
+
+    async def broken_confusion(session_id, user_message, analysis=None):
+        raise RuntimeError("confusion check failed")
+
+    monkeypatch.setattr(orchestrator, "adetect_confusion", broken_confusion)
+
+    response = asyncio.run(orchestrator.aorchestrate_chat("Japan", travel_session))
+
+    assert response != "travel reply"
+    assert session_manager.get_collected_info(travel_session, "destination") is None
+    assert session_manager.get_stage(travel_session) == "initial"
+    assert session_manager.get_chat_history(travel_session)[-1].content == response
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from agents.intent_router import IntentRouter, SEED_EXAMPLES, _guard_reason, _normalise, read_logged_decisions
+
+
+@pytest.fixture(scope="module")
+def router():
+    return IntentRouter.train(SEED_EXAMPLES, min_similarity=0.8, min_margin=0.15)
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("I need travel insurance", ("product_inquiry", "TRAVEL")),
+    ("maid insurance please", ("product_inquiry", "MAID")),
+    ("hello", ("greeting", "UNKNOWN")),
+    ("check my claim status", ("policy_claim_status", "POLICY_CLAIM_STATUS")),
+    ("tell me a joke", ("unwanted", "UNKNOWN")),
+])
+def test_seed_examples_route_locally(router, message, expected):
+    result = router.classify(message)
+    assert result is not None and result[:2] == expected
+
+
+@pytest.mark.parametrize("message, reason", [
+    ("I don't need travel insurance", "negation or cancellation"),
+    ("cancel my travel insurance", "negation or cancellation"),
+    ("travel insurance without covid cover", "negation or cancellation"),
+    ("i need travel insurance for my maid", "also mentions MAID"),
+])
+def test_negated_and_cross_product_messages_defer_to_the_llm(router, message, reason):
+    assert _guard_reason(_normalise(message), "TRAVEL") == reason
+    assert router.classify(message) is None
+
+
+def test_unknown_product_label_defers_when_a_product_is_named():
+    assert _guard_reason(_normalise("hello, do you sell car cover"), "UNKNOWN") == "mentions CAR"
+    assert _guard_reason(_normalise("hello there"), "UNKNOWN") is None
+
+
+def test_weak_or_ambiguous_matches_defer(router):
+    assert router.classify("what is the weather in japan for my trip") is None
+    assert router.classify("   ") is None
+    strict = IntentRouter(router.labels, router.centroids, min_similarity=1.01)
+    assert strict.classify("I need travel insurance") is None
+
+
+def test_retrain_from_logged_decisions_and_reload(tmp_path):
+    log = tmp_path / "app.log"
+    records = [
+        {"message": "insure my condo", "product": "HOME", "intent": "product_inquiry", "confidence": 0.9},
+        {"message": "home insurance quote", "product": "HOME", "intent": "product_inquiry", "confidence": 0.95},
+        {"message": "maybe home", "product": "HOME", "intent": "product_inquiry", "confidence": 0.4},
+    ]
+    log.write_text("".join(f"2024-01-01 - INFO - PRIMARY INTENT AGENT RESULT: {json.dumps(r)}\n" for r in records)
+                   + "unrelated line\n")
+
+    examples = read_logged_decisions([str(log)], min_confidence=0.8)
+    assert examples == {("product_inquiry", "HOME"): ["insure my condo", "home insurance quote"]}
+
+    path = tmp_path / "router.npz"
+    IntentRouter.train({**SEED_EXAMPLES, **examples}).save(str(path))
+    loaded = IntentRouter.load(str(path))
+    assert loaded.classify("home insurance quote")[:2] == ("product_inquiry", "HOME")
@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+import utils.kb_version as kb_version
+
+
+@pytest.fixture
+def marker(tmp_path, monkeypatch):
+    path = tmp_path / "kb_version.json"
+    monkeypatch.setattr(kb_version, "KB_VERSION_FILE", str(path))
+    monkeypatch.setattr(kb_version, "_versions", {})
+    monkeypatch.setattr(kb_version, "_mtime", None)
+    monkeypatch.setattr(kb_version, "_last_check", 0.0)
+    return path
+
+
+def test_bump_is_seen_under_either_product_spelling(marker):
+    assert kb_version.get_kb_version("TRAVEL") == "0"
+
+    version = kb_version.bump_kb_version("Travel")
+
+    assert kb_version.get_kb_version("TRAVEL") == version
+    assert kb_version.get_kb_version("travel") == version
+    assert kb_version.get_kb_version("MAID") == "0"
+    assert json.loads(marker.read_text()) == {"TRAVEL": version}
+
+
+def test_legacy_marker_keys_keep_the_newest_version(marker):
+    marker.write_text(json.dumps({"Travel": "5", "TRAVEL": "7", "Maid": "3"}))
+
+    assert kb_version.get_kb_version("TRAVEL") == "7"
+    assert kb_version.get_kb_version("MAID") == "3"
@@ -0,0 +1,272 @@
+import json
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+import migrate_schema
+
+
+class FakeBatch:
+    def __init__(self, collection):
+        self.collection = collection
+        self.failed_objects = []
+        self.added = []
+        # uuids rejected once, as a server error would
+        self.reject = set()
+
+    def fixed_size(self, batch_size, concurrent_requests):
+        self.failed_objects = []
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def add_object(self, properties, uuid, vector):
+        self.added.append(str(uuid))
+        if str(uuid) in self.reject:
+            self.reject.discard(str(uuid))
+            self.failed_objects.append(str(uuid))
+            return
+        self.collection.objects[str(uuid)] = (dict(properties), vector)
+
+
+class FakeCollection:
+    """The parts of a Weaviate v4 collection the migration uses, kept in memory."""
+
+    def __init__(self, name, properties):
+        self.name = name
+        self.properties = list(properties)
+        self.objects = {}
+        self.batch = FakeBatch(self)
+        self.aggregate = SimpleNamespace(over_all=lambda total_count: SimpleNamespace(total_count=len(self.objects)))
+        self.config = SimpleNamespace(
+            get=lambda: SimpleNamespace(to_dict=lambda: {"class": self.name, "properties": [{"name": p} for p in self.properties]}),
+            add_property=lambda prop: self.properties.append(prop.name),
+        )
+
+        self.query = SimpleNamespace(fetch_objects=self._fetch_objects, near_vector=self._near_vector, bm25=self._bm25)
+
+    def _vector(self, object_id):
+        # Weaviate returns the default vector under "default", however it was written
+        vector = self.objects[object_id][1]
+        return vector if isinstance(vector, dict) else {"default": vector}
+
+    def _result(self, object_id, distance=None):
+        properties, vector = self.objects[object_id][0], self._vector(object_id)
+        return SimpleNamespace(uuid=object_id, properties=dict(properties), vector=vector,
+                               metadata=SimpleNamespace(distance=distance))
+
+    def _fetch_objects(self, limit, include_vector=False):
+        return SimpleNamespace(objects=[self._result(object_id) for object_id in sorted(self.objects)[:limit]])
+
+    def _near_vector(self, near_vector, target_vector, limit, return_metadata):
+        name = target_vector or "default"
+        matches = [object_id for object_id in sorted(self.objects) if self._vector(object_id).get(name) == near_vector]
+        return SimpleNamespace(objects=[self._result(object_id, distance=0.0) for object_id in matches[:limit]])
+
+    def _bm25(self, query, limit):
+        words = set(query.lower().split())
+        matches = [object_id for object_id, (properties, _) in sorted(self.objects.items())
+                   if words & set(properties.get("content", "").lower().split())]
+        return SimpleNamespace(objects=[self._result(object_id) for object_id in matches[:limit]])
+
+    def iterator(self, include_vector=False, after=None, cache_size=None):
+        for object_id in sorted(self.objects):
+            if after is None or object_id > after:
+                yield self._result(object_id)
+
+
+class FakeCollections:
+    def __init__(self):
+        self.by_name = {}
+        self.fail_delete = set()
+
+    def get(self, name):
+        return self.by_name[name]
+
+    def exists(self, name):
+        return name in self.by_name
+
+    def delete(self, name):
+        self.by_name.pop(name, None)
+        if name in self.fail_delete:
+            # The server deleted it, but the process dies before hearing back
+            self.fail_delete.discard(name)
+            raise ConnectionError(f"lost connection while deleting {name}")
+
+    def create_from_dict(self, config):
+        self.by_name[config["class"]] = FakeCollection(config["class"], [p["name"] for p in config["properties"]])
+
+    def list_all(self, simple=True):
+        return list(self.by_name)
+
+
+class FakeAliases:
+    def __init__(self):
+        self.targets = {}
+
+    def get(self, alias_name):
+        target = self.targets.get(alias_name)
+        return SimpleNamespace(collection=target) if target else None
+
+    def create(self, alias_name, target_collection):
+        self.targets[alias_name] = target_collection
+
+    def update(self, alias_name, new_target_collection):
+        self.targets[alias_name] = new_target_collection
+
+
+class FakeClient:
+    def __init__(self):
+        self.collections = FakeCollections()
+        self.alias = FakeAliases()
+
+    def close(self):
+        pass
+
+
+def make_collection(client, name, count):
+    client.collections.create_from_dict({"class": name, "properties": [{"name": "content"}, {"name": "product_name"}]})
+    collection = client.collections.get(name)
+    for i in range(count):
+        collection.objects[str(uuid.UUID(int=i + 1))] = ({"content": f"chunk {i}", "product_name": "TRAVEL"}, {"default": [float(i)]})
+    return collection
+
+
+def reject_in_new_collection(client, object_id):
+    create = client.collections.create_from_dict
+
+    def create_from_dict(config):
+        create(config)
+        if config["class"] == "Docs_new":
+            client.collections.get("Docs_new").batch.reject.add(object_id)
+
+    return create_from_dict
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = FakeClient()
+    monkeypatch.setattr(migrate_schema, "get_weaviate_client", lambda: fake)
+    monkeypatch.setattr(migrate_schema, "CHECKPOINT_EVERY", 3)
+    monkeypatch.setenv("WEAVIATE_COLLECTION_NAME", "Docs")
+    return fake
+
+
+def run_migration(monkeypatch, checkpoint_path):
+    monkeypatch.setattr("sys.argv", ["migrate_schema.py", "--checkpoint", str(checkpoint_path)])
+    migrate_schema.main()
+
+
+def test_crash_after_deleting_original_resumes_copy_back(client, monkeypatch, tmp_path):
+    checkpoint_path = tmp_path / "checkpoint.json"
+    make_collection(client, "Docs", 7)
+    client.collections.fail_delete.add("Docs")
+
+    with pytest.raises(ConnectionError):
+        run_migration(monkeypatch, checkpoint_path)
+    assert json.loads(checkpoint_path.read_text())["phase"] == "copy_back"
+
+    run_migration(monkeypatch, checkpoint_path)
+
+    docs = client.collections.get("Docs")
+    assert len(docs.objects) == 7
+    assert "possible_queries" in docs.properties
+    assert all(properties["possible_queries"] == [] for properties, _ in docs.objects.values())
+    assert not client.collections.exists("Docs_new")
+    assert not checkpoint_path.exists()
+
+
+def test_failed_page_resumes_from_the_last_checkpoint(client, monkeypatch, tmp_path):
+    checkpoint_path = tmp_path / "checkpoint.json"
+    make_collection(client, "Docs", 8)
+    # Fails the second page (objects 4-6) of the copy into Docs_new
+    client.collections.create_from_dict = reject_in_new_collection(client, str(uuid.UUID(int=5)))
+
+    with pytest.raises(RuntimeError, match="failed to copy"):
+        run_migration(monkeypatch, checkpoint_path)
+    checkpoint = json.loads(checkpoint_path.read_text())
+    assert checkpoint == {"collection": "Docs", "phase": "copy_to_new", "last_uuid": str(uuid.UUID(int=3)), "copied": 3}
+
+    new_batch = client.collections.get("Docs_new").batch
+    new_batch.added.clear()
+    run_migration(monkeypatch, checkpoint_path)
+
+    # Only objects after the checkpoint were copied again
+    assert new_batch.added == [str(uuid.UUID(int=i)) for i in range(4, 9)]
+    docs = client.collections.get("Docs")
+    assert sorted(docs.objects) == [str(uuid.UUID(int=i)) for i in range(1, 9)]
+    assert docs.objects[str(uuid.UUID(int=2))][1] == [1.0]
+    assert not checkpoint_path.exists()
+
+
+def test_named_vectors_are_carried_across(client):
+    source = make_collection(client, "Docs", 2)
+    source.objects[str(uuid.UUID(int=1))] = ({"content": "a"}, {"content_vector": [1.0], "questions_vector": [2.0]})
+    migrate_schema.create_new_collection(client, "Docs", target_name="Docs_copy")
+
+    assert migrate_schema.copy_objects(client, "Docs", "Docs_copy") == 2
+
+    copied = client.collections.get("Docs_copy").objects
+    assert copied[str(uuid.UUID(int=1))][1] == {"content_vector": [1.0], "questions_vector": [2.0]}
+    assert copied[str(uuid.UUID(int=2))][1] == [1.0]
+
+
+def test_short_copy_fails_verification(client):
+    make_collection(client, "Docs", 3)
+    migrate_schema.create_new_collection(client, "Docs", target_name="Docs_copy")
+    client.collections.get("Docs").aggregate = SimpleNamespace(over_all=lambda total_count: SimpleNamespace(total_count=4))
+
+    with pytest.raises(RuntimeError, match="verification failed"):
+        migrate_schema.copy_objects(client, "Docs", "Docs_copy")
+
+
+SAMPLE_QUERIES = ["chunk"]
+
+
+def test_blue_green_reindex_swaps_the_alias_and_rolls_back(client, tmp_path):
+    make_collection(client, "Docs", 4)
+
+    # First run converts the plain collection into an alias over Docs_v1, then builds Docs_v2
+    assert migrate_schema.reindex_blue_green(client, "Docs", SAMPLE_QUERIES, keep_versions=2) == "Docs_v2"
+    assert client.alias.targets == {"Docs": "Docs_v2"}
+    assert not client.collections.exists("Docs")
+    assert len(client.collections.get("Docs_v2").objects) == 4
+
+    assert migrate_schema.reindex_blue_green(client, "Docs", SAMPLE_QUERIES, keep_versions=2) == "Docs_v3"
+    assert migrate_schema.list_versions(client, "Docs") == {2: "Docs_v2", 3: "Docs_v3"}
+
+    migrate_schema.rollback(client, "Docs")
+    assert client.alias.targets == {"Docs": "Docs_v2"}
+    with pytest.raises(ValueError, match="No version older"):
+        migrate_schema.rollback(client, "Docs")
+
+
+def test_candidate_failing_validation_leaves_the_alias_alone(client, monkeypatch):
+    make_collection(client, "Docs", 4)
+    migrate_schema.bootstrap_alias(client, "Docs", SAMPLE_QUERIES)
+
+    # The new version loses its content, so keyword sample queries find nothing
+    def drop_content(properties):
+        properties["content"] = ""
+        return properties
+
+    monkeypatch.setattr(migrate_schema, "_add_possible_queries", drop_content)
+    with pytest.raises(RuntimeError, match="failed validation"):
+        migrate_schema.reindex_blue_green(client, "Docs", SAMPLE_QUERIES)
+
+    assert client.alias.targets == {"Docs": "Docs_v1"}
+
+
+def test_rollback_never_goes_past_the_first_version(client):
+    make_collection(client, "Docs", 2)
+    migrate_schema.bootstrap_alias(client, "Docs", SAMPLE_QUERIES)
+
+    with pytest.raises(ValueError, match="No version older than Docs_v1"):
+        migrate_schema.rollback(client, "Docs")
+    with pytest.raises(ValueError, match="not an alias"):
+        migrate_schema.rollback(client, "Other")
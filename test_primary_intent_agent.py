@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+import agents.primary_intent_agent as primary_intent_agent
+from agents.primary_intent_agent import Intent, Product, aget_primary_intent, local_intent
+
+
+class FakeChain:
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        return self.result
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    counters = {"classified": 0, "short_circuited": 0, "routed": 0}
+    monkeypatch.setattr(primary_intent_agent, "_fast_path_stats", counters)
+    # No router: messages the fast path defers on go to the (fake) LLM
+    monkeypatch.setattr(primary_intent_agent, "get_intent_router", lambda: None)
+    return counters
+
+
+def test_fast_path_turn_counted_once(stats):
+    result = asyncio.run(aget_primary_intent("hello", []))
+
+    assert result.intent == "greeting"
+    assert stats == {"classified": 1, "short_circuited": 1, "routed": 0}
+
+
+def test_deferred_turn_counted_once_when_caller_ran_local_pass(stats, monkeypatch):
+    chain = FakeChain(Intent(product=Product.TRAVEL, intent="informational", confidence=0.8))
+    monkeypatch.setattr(primary_intent_agent, "chain", chain)
+    message = "does my policy cover lost luggage on a cruise?"
+    history = [{"role": "assistant", "content": "How can I help?"}]
+
+    assert local_intent(message, history) is None
+    result = asyncio.run(aget_primary_intent(message, history, local_checked=True))
+
+    assert result.product == Product.TRAVEL
+    assert chain.calls == 1
+    assert stats["classified"] == 1
+    assert primary_intent_agent.get_fast_path_stats()["local_share"] == 0.0
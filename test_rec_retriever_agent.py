@@ -0,0 +1,78 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import agents.rec_retriever_agent as rec_module
+from agents.rec_retriever_agent import RecRetrieverAgent
+
+
+class FakeLLM:
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        return SimpleNamespace(content=f"recommendation #{self.calls}")
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    fake = FakeLLM()
+    monkeypatch.setattr(rec_module, "llm", fake)
+    return fake
+
+
+@pytest.fixture
+def kb_versions(monkeypatch):
+    versions = {}
+    monkeypatch.setattr(rec_module, "get_kb_version", lambda product: versions.get(product, "0"))
+    return versions
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    agent = RecRetrieverAgent()
+    agent.benefits = ["Medical expenses overseas: up to $500,000"]
+
+    async def fetch_benefits(product):
+        return list(agent.benefits)
+
+    monkeypatch.setattr(agent, "_afetch_benefits", fetch_benefits)
+    return agent
+
+
+def test_second_request_for_a_tier_costs_no_llm_call(agent, llm, kb_versions):
+    first = asyncio.run(agent.aget_recommendation_message("travel", "Gold"))
+    second = asyncio.run(agent.aget_recommendation_message("TRAVEL", "Gold"))
+    other_tier = asyncio.run(agent.aget_recommendation_message("TRAVEL", "Silver"))
+
+    assert first == second == "recommendation #1"
+    assert other_tier == "recommendation #2"
+    assert agent.get_cache_stats() == {"entries": 2, "hits": 1, "misses": 2}
+
+
+def test_reingest_invalidates_cached_messages(agent, llm, kb_versions):
+    asyncio.run(agent.aget_recommendation_message("TRAVEL", "Gold"))
+    kb_versions["Travel"] = "2"
+
+    assert asyncio.run(agent.aget_recommendation_message("TRAVEL", "Gold")) == "recommendation #2"
+    assert asyncio.run(agent.aget_recommendation_message("TRAVEL", "Gold")) == "recommendation #2"
+    assert llm.calls == 2
+
+
+def test_message_without_benefits_is_not_cached(agent, llm, kb_versions):
+    agent.benefits = []
+    asyncio.run(agent.aget_recommendation_message("MAID", "Basic"))
+    asyncio.run(agent.aget_recommendation_message("MAID", "Basic"))
+
+    assert llm.calls == 2
+    assert agent.get_cache_stats()["entries"] == 0
+
+
+def test_warm_renders_every_tier(agent, llm, kb_versions):
+    asyncio.run(agent.awarm_cache(["TRAVEL", "CAR"]))
+
+    assert llm.calls == 7
+    asyncio.run(agent.aget_recommendation_message("CAR", "TPFT"))
+    assert llm.calls == 7
@@ -0,0 +1,76 @@
+import pytest
+
+import utils.semantic_cache as semantic_cache
+from utils.semantic_cache import SemanticCache
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr(semantic_cache.time, "time", fake)
+    return fake
+
+
+def test_similar_query_hits_and_dissimilar_misses(clock):
+    cache = SemanticCache(threshold=0.95)
+    cache.put("TRAVEL", "What countries are covered?", [1.0, 0.0, 0.0], "All countries.", version="1")
+
+    assert cache.get("TRAVEL", [0.99, 0.05, 0.0], version="1") == "All countries."
+    assert cache.get("TRAVEL", [0.0, 1.0, 0.0], version="1") is None
+    # Entries are per product
+    assert cache.get("MAID", [1.0, 0.0, 0.0], version="1") is None
+    assert cache.get_exact("TRAVEL", "  what COUNTRIES are covered? ", version="1") == "All countries."
+
+    stats = cache.get_stats()
+    assert stats["hits"] == 2 and stats["exact_hits"] == 1 and stats["misses"] == 2
+    assert stats["hit_rate"] == 0.5
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = SemanticCache(threshold=0.9, ttl_seconds=60)
+    cache.put("TRAVEL", "q", [1.0, 0.0], "a", version="1")
+
+    clock.now += 59
+    assert cache.get("TRAVEL", [1.0, 0.0], version="1") == "a"
+    clock.now += 2
+    assert cache.get("TRAVEL", [1.0, 0.0], version="1") is None
+    assert cache.get_exact("TRAVEL", "q", version="1") is None
+    assert cache.get_stats()["entries"] == {"TRAVEL": 0}
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = SemanticCache(threshold=0.99, max_entries=2)
+    cache.put("TRAVEL", "first", [1.0, 0.0, 0.0], "a1", version="1")
+    clock.now += 1
+    cache.put("TRAVEL", "second", [0.0, 1.0, 0.0], "a2", version="1")
+    clock.now += 1
+    assert cache.get("TRAVEL", [1.0, 0.0, 0.0], version="1") == "a1"
+
+    clock.now += 1
+    cache.put("TRAVEL", "third", [0.0, 0.0, 1.0], "a3", version="1")
+
+    assert cache.get("TRAVEL", [0.0, 1.0, 0.0], version="1") is None
+    assert cache.get("TRAVEL", [1.0, 0.0, 0.0], version="1") == "a1"
+    assert cache.get("TRAVEL", [0.0, 0.0, 1.0], version="1") == "a3"
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_new_kb_version_drops_the_products_entries(clock):
+    cache = SemanticCache(threshold=0.9)
+    cache.put("TRAVEL", "q", [1.0, 0.0], "old answer", version="1")
+    cache.put("MAID", "q", [1.0, 0.0], "maid answer", version="1")
+
+    assert cache.get("TRAVEL", [1.0, 0.0], version="2") is None
+    cache.put("TRAVEL", "q", [1.0, 0.0], "new answer", version="2")
+
+    assert cache.get("TRAVEL", [1.0, 0.0], version="2") == "new answer"
+    assert cache.get("MAID", [1.0, 0.0], version="1") == "maid answer"
+    assert cache.get_stats()["invalidations"] == 1
@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+import pytest
+
+import app.session_manager as session_manager
+from app.session_index import SessionActivityIndex
+from app.session_store import InMemorySessionStore
+
+
+def test_touch_moves_session_to_its_latest_bucket():
+    index = SessionActivityIndex(bucket_seconds=60)
+    index.touch("a", 1000)
+    index.touch("b", 1000)
+    index.touch("a", 1500)
+    # An older timestamp never moves a session back
+    index.touch("a", 1100)
+
+    assert index.pop_expired(1200) == ["b"]
+    assert index.pop_expired(1500) == []
+    assert index.pop_expired(1600) == ["a"]
+    assert index.snapshot() == (0, 0, 2)
+
+
+def test_counters_follow_touches_removals_and_expiry():
+    index = SessionActivityIndex(bucket_seconds=60)
+    index.touch("a", 0)
+    index.touch("b", 3000)
+    index.add_messages("a", 2)
+    index.add_messages("b")
+    index.add_messages("untracked")
+    assert index.snapshot() == (2, 3, 0)
+    assert index.count_active_between(2400, 3000) == 1
+
+    index.remove("b")
+    assert index.snapshot() == (1, 2, 0)
+    assert index.pop_expired(60) == ["a"]
+    assert index.snapshot() == (0, 0, 1)
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    store = InMemorySessionStore()
+    monkeypatch.setattr(session_manager, "session_store", store)
+    monkeypatch.setattr(session_manager, "activity_index", SessionActivityIndex())
+    return store
+
+
+def test_cleanup_deletes_only_idle_sessions(sessions, monkeypatch):
+    session_manager.get_session("idle")
+    session_manager.get_session("busy")
+    session_manager.update_session("busy", "hi", "hello")
+    later = int(time.time()) + session_manager.SESSION_TTL_SECONDS + 120
+    session_manager.activity_index.touch("busy", later)
+
+    monkeypatch.setattr(session_manager.time, "time", lambda: later + 1)
+    assert session_manager.cleanup_old_sessions() == 1
+
+    assert "idle" not in sessions and "busy" in sessions
+    stats = session_manager.get_session_stats()
+    assert stats["total_sessions"] == 1 and stats["total_messages"] == 1
+    assert stats["expired_sessions"] == 1 and stats["active_sessions"] == 1
+
+
+def test_background_task_expires_sessions(sessions):
+    async def scenario():
+        session_manager.get_session("idle")
+        # Last active at the epoch, long past any idle timeout
+        session_manager.activity_index.remove("idle")
+        session_manager.activity_index.touch("idle", 0)
+        session_manager.start_session_expiry(interval_seconds=0.01)
+        await asyncio.sleep(0.05)
+        await session_manager.stop_session_expiry()
+
+    asyncio.run(scenario())
+    assert "idle" not in sessions
+    assert session_manager._expiry_task is None
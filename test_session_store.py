@@ -0,0 +1,190 @@
+import asyncio
+import copy
+import time
+
+import fakeredis
+import pytest
+
+import app.session_manager as session_manager
+from app.session_model import Session
+from app.session_store import RedisSessionStore, encode_session, decode_session, merge_sessions
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+def make_store(server, **kwargs):
+    return RedisSessionStore(
+        ttl_seconds=3600,
+        client=fakeredis.FakeAsyncRedis(server=server),
+        sync_client=fakeredis.FakeRedis(server=server),
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def redis_sessions(server, monkeypatch):
+    store = make_store(server)
+    monkeypatch.setattr(session_manager, "session_store", store)
+    return store
+
+
+def test_agent_shaped_session_round_trips(redis_sessions, server):
+    async def travel_turn():
+        async with session_manager.session_turn("s1"):
+            # What travel_agent.py does with the session's collected_info
+            session = session_manager.get_session("s1")
+            collected_info = session.get("collected_info", {})
+            collected_info["destination"] = "Japan"
+            collected_info["travel_duration"] = "7 days"
+            session_manager.set_collected_info("s1", "travel_info", collected_info)
+            session_manager.update_session("s1", "Japan for a week", "Great, who is travelling?")
+
+    asyncio.run(travel_turn())
+    asyncio.run(travel_turn())
+
+    stored = make_store(server).get("s1")
+    assert stored is not None
+    assert stored.collected_info["destination"] == "Japan"
+    assert stored.collected_info["travel_info"] == {"destination": "Japan", "travel_duration": "7 days"}
+    assert [turn.content for turn in stored.chat_history][-2:] == ["Japan for a week", "Great, who is travelling?"]
+
+
+def test_encode_session_round_trips_context_values():
+    session = Session()
+    session.add_turn("user", "hi")
+    session.conversation_context["primary_product"] = "TRAVEL"
+    session.collected_info["payment_info"] = {"name": "Tan", "email": "tan@example.com"}
+
+    decoded = Session.from_dict(decode_session(encode_session(session)))
+
+    assert decoded.chat_history[0].content == "hi"
+    assert decoded.conversation_context["primary_product"] == "TRAVEL"
+    assert decoded.collected_info["payment_info"]["email"] == "tan@example.com"
+
+
+def add_message(store, session_id, content):
+    async def turn():
+        await store.acheckout(session_id)
+        try:
+            session = store.get(session_id) or Session()
+            session.add_turn("user", content)
+            store.save(session_id, session)
+        finally:
+            await store.arelease(session_id)
+
+    asyncio.run(turn())
+
+
+def test_cached_session_skips_redis_load(server, monkeypatch):
+    store = make_store(server, cache_size=10, cache_ttl=60)
+    add_message(store, "s1", "first")
+
+    loads = []
+    original_aload = store._aload
+
+    async def counting_aload(session_id):
+        loads.append(session_id)
+        return await original_aload(session_id)
+
+    monkeypatch.setattr(store, "_aload", counting_aload)
+    add_message(store, "s1", "second")
+
+    assert loads == []
+    assert [turn.content for turn in make_store(server).get("s1").chat_history] == ["first", "second"]
+
+
+def test_conflict_drops_cached_entry_and_merges(server):
+    ours = make_store(server, cache_size=10, cache_ttl=60)
+    theirs = make_store(server)
+    add_message(ours, "s1", "first")
+    # Another worker writes while this worker still holds the session in its cache
+    add_message(theirs, "s1", "from another worker")
+
+    add_message(ours, "s1", "from this worker")
+
+    contents = [turn.content for turn in make_store(server).get("s1").chat_history]
+    assert contents == ["first", "from another worker", "from this worker"]
+    version, data = ours._cached("s1")
+    assert version == 3
+    assert [turn["content"] for turn in data["chat_history"]] == contents
+
+
+def test_cache_is_bounded_and_expires(server, monkeypatch):
+    store = make_store(server, cache_size=2, cache_ttl=5)
+    for session_id in ("a", "b", "c"):
+        add_message(store, session_id, "hi")
+    assert list(store._cache) == ["b", "c"]
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 10)
+    assert store._cached("c") is None
+    assert "c" not in store._cache
+
+
+def test_merge_keeps_both_sides_changes():
+    base = Session()
+    base.add_turn("user", "hi")
+    base.message_count = 1
+    base.collected_info["destination"] = "Japan"
+    base.conversation_context["primary_product"] = "TRAVEL"
+    base = base.to_dict()
+
+    ours = Session.from_dict(copy.deepcopy(base))
+    ours.add_turn("assistant", "Where to?")
+    ours.message_count += 1
+    ours.collected_info["travellers"] = 2
+    ours.conversation_context["primary_product"] = "MAID"
+    ours = ours.to_dict()
+
+    theirs = Session.from_dict(copy.deepcopy(base))
+    theirs.add_turn("user", "also my maid")
+    theirs.message_count += 1
+    theirs.collected_info["destination"] = "Korea"
+    theirs.conversation_summary = "Customer asked about travel."
+    theirs = theirs.to_dict()
+
+    merged = merge_sessions(base, ours, theirs)
+
+    assert [turn["content"] for turn in merged["chat_history"]] == ["hi", "also my maid", "Where to?"]
+    assert merged["message_count"] == 3
+    assert merged["collected_info"] == {"destination": "Korea", "travellers": 2}
+    assert merged["conversation_context"]["primary_product"] == "MAID"
+    assert merged["conversation_summary"] == "Customer asked about travel."
+    assert [turn["content"] for turn in base["chat_history"]] == ["hi"]
+
+
+def test_concurrent_turns_from_two_workers_both_land(server):
+    first, second = make_store(server), make_store(server)
+    add_message(first, "s1", "hi")
+
+    async def two_workers():
+        await first.acheckout("s1")
+        await second.acheckout("s1")
+        for store, key, content in ((first, "destination", "Japan"), (second, "travellers", "2")):
+            session = store.get("s1")
+            session.add_turn("user", content)
+            session.collected_info[key] = content
+            store.save("s1", session)
+        await second.arelease("s1")
+        # This write's compare-and-set fails, so it is merged with the second worker's
+        await first.arelease("s1")
+
+    asyncio.run(two_workers())
+
+    stored = make_store(server).get("s1")
+    assert [turn.content for turn in stored.chat_history] == ["hi", "2", "Japan"]
+    assert stored.collected_info == {"destination": "Japan", "travellers": "2"}
+    assert int(fakeredis.FakeRedis(server=server).hget("hlas:session:s1", "version")) == 3
+
+
+def test_legacy_pickled_session_is_discarded(server):
+    fakeredis.FakeRedis(server=server).set("hlas:session:old", b"\x80\x04legacy pickle")
+    store = make_store(server)
+
+    add_message(store, "old", "hello again")
+
+    stored = make_store(server).get("old")
+    assert [turn.content for turn in stored.chat_history] == ["hello again"]
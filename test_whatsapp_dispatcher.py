@@ -0,0 +1,96 @@
+import asyncio
+
+from utils.whatsapp_dispatcher import WhatsAppDispatcher
+
+
+class Recorder:
+    """process_job stand-in that records calls and can be held at a gate."""
+
+    def __init__(self):
+        self.calls = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def __call__(self, message, user_phone, metadata):
+        await self.gate.wait()
+        self.calls.append((user_phone, message))
+
+
+def test_submit_drops_when_full_and_drain_finishes_queued():
+    async def scenario():
+        recorder = Recorder()
+        recorder.gate.clear()
+        dispatcher = WhatsAppDispatcher(recorder, num_workers=1, max_queue_size=2, drain_timeout=5)
+        await dispatcher.start()
+
+        # The worker takes the first message; two more fill the queue and the fourth is rejected
+        assert dispatcher.submit("one", "6591", {})
+        await asyncio.sleep(0)
+        assert dispatcher.submit("two", "6592", {})
+        assert dispatcher.submit("three", "6593", {})
+        assert not dispatcher.submit("four", "6594", {})
+        metrics = dispatcher.get_metrics()
+        assert metrics["queue_depth"] == 2 and metrics["in_flight"] == 1 and metrics["dropped"] == 1
+
+        recorder.gate.set()
+        await dispatcher.stop(drain=True)
+        assert [message for _, message in recorder.calls] == ["one", "two", "three"]
+        assert not dispatcher.submit("five", "6595", {})
+        return dispatcher.get_metrics()
+
+    metrics = asyncio.run(scenario())
+    assert metrics["running"] is False
+    assert metrics["processed"] == 3 and metrics["dropped"] == 2
+
+
+def test_failed_job_is_counted_and_worker_keeps_going():
+    async def scenario():
+        processed = []
+
+        async def process_job(message, user_phone, metadata):
+            if message == "boom":
+                raise RuntimeError("orchestration failed")
+            processed.append(message)
+
+        dispatcher = WhatsAppDispatcher(process_job, num_workers=1, max_queue_size=10)
+        await dispatcher.start()
+        dispatcher.submit("boom", "6591", {})
+        dispatcher.submit("after", "6591", {})
+        await dispatcher.stop(drain=True)
+        return processed, dispatcher.get_metrics()
+
+    processed, metrics = asyncio.run(scenario())
+    assert processed == ["after"]
+    assert metrics["failed"] == 1 and metrics["processed"] == 1
+
+
+def test_messages_for_one_session_run_in_order_and_sessions_run_in_parallel():
+    async def scenario():
+        running = {}
+        max_parallel = 0
+        order = []
+
+        async def process_job(message, user_phone, metadata):
+            nonlocal max_parallel
+            running[user_phone] = running.get(user_phone, 0) + 1
+            assert running[user_phone] == 1, f"two messages for {user_phone} ran at once"
+            max_parallel = max(max_parallel, sum(running.values()))
+            # Later messages finish faster, so ordering only holds if they are serialised
+            await asyncio.sleep(0.01 / (1 + int(message[-1])))
+            order.append(message)
+            running[user_phone] -= 1
+
+        dispatcher = WhatsAppDispatcher(process_job, num_workers=4, max_queue_size=100)
+        await dispatcher.start()
+        for i in range(4):
+            dispatcher.submit(f"a{i}", "6591", {}, session_key="whatsapp_6591")
+            dispatcher.submit(f"b{i}", "6592", {}, session_key="whatsapp_6592")
+        await dispatcher.stop(drain=True)
+        return order, max_parallel, dispatcher.get_metrics()
+
+    order, max_parallel, metrics = asyncio.run(scenario())
+    assert [m for m in order if m.startswith("a")] == ["a0", "a1", "a2", "a3"]
+    assert [m for m in order if m.startswith("b")] == ["b0", "b1", "b2", "b3"]
+    assert max_parallel == 2
+    assert metrics["max_session_backlog"] == 4
+    assert metrics["sessions_queued"] == 0
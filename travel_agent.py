@@ -6,7 +6,6 @@ from dotenv import load_dotenv
 from pydantic import BaseModel, Field, validator
 from typing import List, Type, Optional
 
-from app.config import llm
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.tools import tool
 from langchain.tools import Tool
@@ -20,7 +19,8 @@ logger = logging.getLogger(__name__)
 
 
 from app.session_manager import get_session, update_session
-from utils.llm_services import llm
+from utils.llm_services import run_sync, get_structured_chain
+from utils.history_renderer import render_history
 from langchain_core.messages import HumanMessage, SystemMessage
 from pydantic import BaseModel, Field
 import json
@@ -37,6 +37,12 @@ def run_travel_agent(user_message: str, chat_history: list, session_id: str):
     """
     Handles the conversation for travel insurance inquiries using an LLM.
     """
+    return run_sync(arun_travel_agent(user_message, chat_history, session_id))
+
+async def arun_travel_agent(user_message: str, chat_history: list, session_id: str):
+    """
+    Async variant of run_travel_agent.
+    """
     session = get_session(session_id)
     collected_info = session.get("collected_info", {})
     
@@ -44,7 +50,7 @@ def run_travel_agent(user_message: str, chat_history: list, session_id: str):
     required_info = ["destination", "start_date", "end_date", "party_size"]
     
     # Use an LLM to have a conversation and collect the information
-    chain = llm.with_structured_output(TravelInfo, method="function_calling")
+    chain = get_structured_chain(TravelInfo)
     
     today_date = datetime.now().strftime("%Y-%m-%d")
     prompt = [
@@ -54,7 +60,8 @@ def run_travel_agent(user_message: str, chat_history: list, session_id: str):
 Today's date is {today_date}. All travel dates must be in the future.
 
 Current collected information: {collected_info}
-Conversation history: {chat_history}
+Conversation history:
+{render_history(chat_history, summary=session.get("conversation_summary"))}
 
 IMPORTANT EXTRACTION RULES:
 - If user just says a number (like "2", "3", "4") when you asked about party size, extract it as party_size
@@ -68,7 +75,7 @@ Ask for the next piece of information in a conversational way. If the user provi
         HumanMessage(content=user_message),
     ]
     
-    response = chain.invoke(prompt)
+    response = await chain.ainvoke(prompt)
     
     # Update the collected information
     for key, value in response.model_dump().items():
@@ -91,11 +98,11 @@ Ask for the next piece of information in a conversational way. If the user provi
         
         # Automatically move to recommendation flow
         try:
-            from .recommendation_agent import get_recommendation
-            from .rec_retriever_agent import get_recommendation_message
+            from .recommendation_agent import aget_recommendation
+            from .rec_retriever_agent import aget_recommendation_message
             
             # Get AI recommendation
-            recommendation = get_recommendation(session_id, "TRAVEL")
+            recommendation = await aget_recommendation(session_id, "TRAVEL")
             
             plan_tier = recommendation.get("plan", "Standard")
             
@@ -104,7 +111,7 @@ Ask for the next piece of information in a conversational way. If the user provi
             update_conversation_context(session_id, recommended_plan=plan_tier)
             
             # Get comprehensive recommendation message with benefits
-            recommendation_message = get_recommendation_message("TRAVEL", plan_tier)
+            recommendation_message = await aget_recommendation_message("TRAVEL", plan_tier)
             
             # Add purchase guidance to the recommendation
             recommendation_message += "\n\n" + """**What's Next?**
@@ -0,0 +1,123 @@
+"""
+Merged Turn Analysis
+====================
+
+On a non-staged turn with chat history the orchestrator needs three
+judgements: whether the user is continuing the current conversation, the
+primary intent/product, and whether the user is confused. This module asks
+for all three in a single structured-output request and hands the result to
+the existing consumers, instead of three prompts that each resend the history.
+"""
+
+import logging
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from langchain_core.messages import SystemMessage, HumanMessage
+from app.session_manager import get_session
+from utils.llm_services import get_structured_chain
+from .primary_intent_agent import Product, Intent, log_intent_decision, _keyword_backstop_product
+from .conversation_flow_manager import conversation_flow_manager
+from .fallback_system import ConfusionAnalysis
+
+logger = logging.getLogger(__name__)
+
+class TurnAnalysis(BaseModel):
+    """Combined flow, intent and confusion classification for one user turn."""
+    decision: str = Field(..., description="'continue' if the user is continuing the current conversation, 'switch' if they start a new topic, 'clarify' if ambiguous.")
+    decision_confidence: float = Field(..., description="Confidence in the decision (0.0 to 1.0).")
+    reason: str = Field(..., description="Brief explanation of the decision.")
+    product: Product = Field(default=Product.UNKNOWN, description="The identified product the user is interested in.")
+    intent: str = Field(..., description="One of 'product_inquiry', 'greeting', 'informational', 'policy_claim_status', 'unwanted'.")
+    intent_confidence: float = Field(default=0.8, description="Confidence in the intent classification (0.0 to 1.0).")
+    requires_clarification: bool = Field(default=False, description="Whether the user's intent requires clarification.")
+    is_confused: bool = Field(default=False, description="Whether the user appears confused or needs help.")
+    confusion_type: str = Field(default="none", description="Type of confusion: what, how, help, unclear, repeat, or none.")
+    confusion_confidence: float = Field(default=0.0, description="Confidence in the confusion assessment (0.0 to 1.0).")
+
+    def to_flow_decision(self) -> dict:
+        return {"decision": self.decision, "confidence": self.decision_confidence, "reason": self.reason}
+
+    def to_intent(self) -> Intent:
+        return Intent(
+            product=self.product,
+            intent=self.intent,
+            confidence=self.intent_confidence,
+            requires_clarification=self.requires_clarification,
+        )
+
+    def to_confusion(self) -> ConfusionAnalysis:
+        return ConfusionAnalysis(
+            is_confused=self.is_confused,
+            confusion_type=self.confusion_type,
+            confidence=self.confusion_confidence,
+        )
+
+TURN_ANALYSIS_PROMPT = """You are the routing analyser for the HLAS Insurance chatbot. For the user's latest message, answer three questions in one response.
+
+CONVERSATION CONTEXT:
+- Current Agent: {current_agent}
+- Last Agent Message: "{last_agent_message}"
+
+CONVERSATION HISTORY (last 3 exchanges):
+{conversation_history}
+
+1. FLOW DECISION ('decision', 'decision_confidence', 'reason')
+- 'continue' if the message answers the last agent question or is a short contextual reply ("yes", "to the US", "next week", "just two of us").
+- 'switch' only if the user explicitly introduces a new, unrelated topic (e.g. a different type of insurance).
+- If the current agent is None or UNKNOWN and the user names an insurance type, the decision is 'continue'.
+- If ambiguous, prefer 'continue'.
+
+2. PRIMARY INTENT ('intent', 'product', 'intent_confidence', 'requires_clarification')
+INTENTS:
+- 'greeting'            : hello/hi/etc.
+- 'unwanted'            : clearly off-topic or spam.
+- 'informational'       : asks about terms/coverage/benefits from docs (e.g., "what is curtailment?", "what countries are covered?").
+- 'policy_claim_status' : user wants to check real policy/claim status (NRIC/policy number context).
+- 'product_inquiry'     : wants to buy/quote a policy (e.g., "I need travel insurance").
+PRODUCTS (exactly one): 'TRAVEL', 'MAID', 'CAR', 'FAMILY', 'CHOICE', 'EARLY', 'POLICY_CLAIM_STATUS', 'UNKNOWN'.
+- Use the conversation history for context; prefer 'informational' over 'unwanted' for insurance concepts.
+
+3. CONFUSION ('is_confused', 'confusion_type', 'confusion_confidence')
+- confusion_type is one of 'what', 'how', 'help', 'unclear', 'repeat', 'none'.
+- Corrections after validation errors and short contextual replies ("2", "Japan", "yes", date ranges) are NOT confusion.
+- Only flag confusion if the user genuinely seems lost or explicitly asks for clarification.
+"""
+
+async def aanalyze_turn(session_id: str, user_message: str, chat_history: List) -> Optional[TurnAnalysis]:
+    """
+    Run the merged analysis and seed the flow-decision memo with its result.
+
+    Returns None on failure so callers can fall back to the individual helpers.
+    """
+    try:
+        session = get_session(session_id)
+        current_agent = session.get("conversation_context", {}).get("primary_product", "None")
+
+        prompt = [
+            SystemMessage(content=TURN_ANALYSIS_PROMPT.format(
+                current_agent=current_agent,
+                last_agent_message=conversation_flow_manager._extract_last_agent_message(chat_history),
+                conversation_history=conversation_flow_manager._format_conversation_history(chat_history),
+            )),
+            HumanMessage(content=f"User Message: {user_message}"),
+        ]
+        analysis = await get_structured_chain(TurnAnalysis).ainvoke(prompt)
+
+        # Same backstop as the standalone intent classifier
+        if analysis.product == Product.UNKNOWN and analysis.intent in {"product_inquiry", "informational"}:
+            inferred = _keyword_backstop_product(user_message, chat_history)
+            if inferred != Product.UNKNOWN:
+                logger.info(f"Backstop product inference applied: {inferred}")
+                analysis.product = inferred
+
+        conversation_flow_manager.remember_decision(session_id, user_message, chat_history, analysis.to_flow_decision())
+        log_intent_decision(user_message, analysis.to_intent())
+        logger.info(
+            f"🧩 Turn analysis for session {session_id} - Decision: {analysis.decision} ({analysis.decision_confidence}), "
+            f"Product: {analysis.product}, Intent: {analysis.intent}, Confused: {analysis.is_confused}"
+        )
+        return analysis
+
+    except Exception as e:
+        logger.error(f"Merged turn analysis failed for session {session_id}: {str(e)}")
+        return None
@@ -0,0 +1,122 @@
+"""
+Vector Index Profiles
+=====================
+
+Named vector index configurations for the knowledge base collection. A
+profile picks the index type (HNSW or flat) and an optional quantizer:
+
+    hnsw      uncompressed HNSW (the original configuration)
+    hnsw_pq   HNSW with product quantization
+    hnsw_bq   HNSW with binary quantization
+    hnsw_sq   HNSW with scalar quantization
+    flat      brute-force flat index, no graph
+    flat_bq   flat index over binary-quantized vectors
+
+HNSW tuning (ef, ef_construction, max_connections) and quantizer training and
+rescoring limits can be overridden per call or through the environment.
+PQ and SQ only compress once QUANTIZER_TRAINING_LIMIT objects exist; the
+default is sized for the knowledge base, which is far below Weaviate's own
+default of 100000, and the benchmark builds with the same limit.
+Compressed profiles rescore candidates with the full vectors, which stay on
+disk. Use bench_vector_index.py to compare recall and latency before
+switching the live collection.
+"""
+
+import os
+from typing import Dict, List, Optional, Sequence
+
+from weaviate.classes.config import Configure, VectorDistances
+
+VECTOR_NAMES = ("content_vector", "questions_vector")
+
+INDEX_PROFILES: Dict[str, Dict[str, Optional[str]]] = {
+    "hnsw": {"index": "hnsw", "quantizer": None},
+    "hnsw_pq": {"index": "hnsw", "quantizer": "pq"},
+    "hnsw_bq": {"index": "hnsw", "quantizer": "bq"},
+    "hnsw_sq": {"index": "hnsw", "quantizer": "sq"},
+    "flat": {"index": "flat", "quantizer": None},
+    "flat_bq": {"index": "flat", "quantizer": "bq"},
+}
+
+VECTOR_INDEX_PROFILE = os.getenv("VECTOR_INDEX_PROFILE", "hnsw")
+# Unset values keep Weaviate's defaults (ef -1 is dynamic ef)
+HNSW_EF = int(os.getenv("HNSW_EF", "0")) or None
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "0")) or None
+HNSW_MAX_CONNECTIONS = int(os.getenv("HNSW_MAX_CONNECTIONS", "0")) or None
+# PQ/SQ compress once this many objects exist (keep it below the collection size); BQ needs no training
+QUANTIZER_TRAINING_LIMIT = int(os.getenv("QUANTIZER_TRAINING_LIMIT", "1000"))
+QUANTIZER_RESCORE_LIMIT = int(os.getenv("QUANTIZER_RESCORE_LIMIT", "0")) or None
+PQ_SEGMENTS = int(os.getenv("PQ_SEGMENTS", "0")) or None
+
+def _quantizer(kind, training_limit=None, rescore_limit=None, segments=None, cache=None):
+    training_limit = training_limit or QUANTIZER_TRAINING_LIMIT
+    rescore_limit = rescore_limit or QUANTIZER_RESCORE_LIMIT
+    if kind == "pq":
+        return Configure.VectorIndex.Quantizer.pq(segments=segments or PQ_SEGMENTS, training_limit=training_limit)
+    if kind == "bq":
+        return Configure.VectorIndex.Quantizer.bq(cache=cache, rescore_limit=rescore_limit)
+    if kind == "sq":
+        return Configure.VectorIndex.Quantizer.sq(training_limit=training_limit, rescore_limit=rescore_limit)
+    return None
+
+def vector_index_config(profile: Optional[str] = None, ef: Optional[int] = None, ef_construction: Optional[int] = None,
+                        max_connections: Optional[int] = None, training_limit: Optional[int] = None,
+                        rescore_limit: Optional[int] = None, segments: Optional[int] = None):
+    """
+    Build the Weaviate vector index configuration for a profile.
+    """
+    name = profile or VECTOR_INDEX_PROFILE
+    if name not in INDEX_PROFILES:
+        raise ValueError(f"Unknown vector index profile '{name}'. Choose from: {', '.join(INDEX_PROFILES)}")
+    spec = INDEX_PROFILES[name]
+    if spec["index"] == "flat":
+        # A flat index keeps nothing in memory unless its compressed vectors are cached
+        quantizer = _quantizer(spec["quantizer"], training_limit, rescore_limit, segments, cache=True)
+        return Configure.VectorIndex.flat(distance_metric=VectorDistances.COSINE, quantizer=quantizer)
+
+    quantizer = _quantizer(spec["quantizer"], training_limit, rescore_limit, segments)
+    return Configure.VectorIndex.hnsw(
+        distance_metric=VectorDistances.COSINE,
+        ef=ef or HNSW_EF,
+        ef_construction=ef_construction or HNSW_EF_CONSTRUCTION,
+        max_connections=max_connections or HNSW_MAX_CONNECTIONS,
+        quantizer=quantizer,
+    )
+
+def vector_index_dict(profile: Optional[str] = None, **tuning) -> dict:
+    """
+    The same index configuration in the schema dict form used by
+    create_from_dict, for cloning a collection under another profile.
+    """
+    config = vector_index_config(profile, **tuning)
+    return {"vectorIndexType": config.vector_index_type().value, "vectorIndexConfig": config._to_dict()}
+
+def named_vector_configs(profile: Optional[str] = None, vector_names: Sequence[str] = VECTOR_NAMES, **tuning) -> List[dict]:
+    """
+    Named vector definitions (manual embeddings) using one index profile for every vector.
+    """
+    return [
+        {
+            "name": name,
+            "vectorizer": Configure.Vectorizer.none(),  # Manual embeddings
+            "vector_index_config": vector_index_config(profile, **tuning),
+        }
+        for name in vector_names
+    ]
+
+def estimate_index_bytes(profile: str, dimensions: int, objects: int, max_connections: Optional[int] = None,
+                         segments: Optional[int] = None) -> int:
+    """
+    Rough in-memory size of one named vector index: the vectors searched in
+    memory plus, for HNSW, the layer-0 graph links.
+    """
+    spec = INDEX_PROFILES[profile]
+    per_vector = {
+        None: dimensions * 4,
+        "sq": dimensions,
+        "pq": segments or PQ_SEGMENTS or max(1, dimensions // 8),
+        "bq": (dimensions + 7) // 8,
+    }[spec["quantizer"]]
+    if spec["index"] == "hnsw":
+        per_vector += 2 * (max_connections or HNSW_MAX_CONNECTIONS or 32) * 8
+    return per_vector * objects
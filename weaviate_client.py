@@ -1,5 +1,7 @@
 import os
+import asyncio
 import logging
+import weakref
 import weaviate
 from typing import Optional
 from urllib.parse import urlparse
@@ -8,8 +10,29 @@ from weaviate.classes.query import Filter
 
 logger = logging.getLogger(__name__)
 
-# Global Weaviate client instance
+# Global Weaviate client instances; async clients belong to the loop that connected them
 _weaviate_client = None
+_async_weaviate_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_async_client_locks: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+def create_weaviate_client():
+    """
+    Open a new (non-shared) Weaviate client, e.g. one per ingestion worker.
+    """
+    parsed_url = urlparse(os.getenv("WEAVIATE_URL"))
+    auth_credentials = None
+    if os.getenv("WEAVIATE_API_KEY"):
+        auth_credentials = AuthApiKey(api_key=os.getenv("WEAVIATE_API_KEY"))
+    
+    return weaviate.connect_to_custom(
+        http_host=parsed_url.hostname,
+        http_port=parsed_url.port,
+        http_secure=parsed_url.scheme == "https",
+        grpc_host=parsed_url.hostname,
+        grpc_port=50051,
+        grpc_secure=False,
+        auth_credentials=auth_credentials,
+    )
 
 def get_weaviate_client():
     """
@@ -18,23 +41,54 @@ def get_weaviate_client():
     global _weaviate_client
     if _weaviate_client is None:
         try:
-            parsed_url = urlparse(os.getenv("WEAVIATE_URL"))
-            auth_credentials = None
-            if os.getenv("WEAVIATE_API_KEY"):
-                auth_credentials = AuthApiKey(api_key=os.getenv("WEAVIATE_API_KEY"))
-            
-            _weaviate_client = weaviate.connect_to_custom(
-                http_host=parsed_url.hostname,
-                http_port=parsed_url.port,
-                http_secure=parsed_url.scheme == "https",
-                grpc_host=parsed_url.hostname,
-                grpc_port=50051,
-                grpc_secure=False,
-                auth_credentials=auth_credentials,
-            )
+            _weaviate_client = create_weaviate_client()
             logger.info("Successfully connected to Weaviate.")
         except Exception as e:
             logger.error(f"Failed to connect to Weaviate: {e}")
             raise
     return _weaviate_client
 
+async def get_async_weaviate_client():
+    """
+    Get the async Weaviate client for the running event loop, connecting it on
+    first use. Its connections cannot be shared across loops, so each loop
+    gets its own client.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_weaviate_clients.get(loop)
+    if client is not None:
+        return client
+    lock = _async_client_locks.setdefault(loop, asyncio.Lock())
+    async with lock:
+        if loop not in _async_weaviate_clients:
+            try:
+                parsed_url = urlparse(os.getenv("WEAVIATE_URL"))
+                auth_credentials = None
+                if os.getenv("WEAVIATE_API_KEY"):
+                    auth_credentials = AuthApiKey(api_key=os.getenv("WEAVIATE_API_KEY"))
+
+                client = weaviate.use_async_with_custom(
+                    http_host=parsed_url.hostname,
+                    http_port=parsed_url.port,
+                    http_secure=parsed_url.scheme == "https",
+                    grpc_host=parsed_url.hostname,
+                    grpc_port=50051,
+                    grpc_secure=False,
+                    auth_credentials=auth_credentials,
+                )
+                await client.connect()
+                _async_weaviate_clients[loop] = client
+                logger.info("Successfully connected async client to Weaviate.")
+            except Exception as e:
+                logger.error(f"Failed to connect async client to Weaviate: {e}")
+                raise
+    return _async_weaviate_clients[loop]
+
+async def close_async_weaviate_client():
+    """
+    Close the running loop's async Weaviate client if it was opened.
+    """
+    client = _async_weaviate_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+        logger.info("Async Weaviate client closed.")
@@ -0,0 +1,203 @@
+"""
+WhatsApp Dispatch Subsystem
+===========================
+
+Decouples webhook acknowledgement from message processing. Inbound messages
+are put on a bounded in-process queue and handled by a fixed pool of async
+workers, so the webhook endpoint only parses the payload and enqueues.
+
+Messages are grouped into per-session mailboxes. A session is handed to at
+most one worker at a time, so messages from the same user are processed in
+arrival order while different sessions still run fully in parallel.
+"""
+
+import time
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, Callable, Awaitable, List
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class DispatchJob:
+    """A single inbound WhatsApp message waiting to be processed."""
+    message: str
+    user_phone: str
+    session_key: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+class WhatsAppDispatcher:
+    """
+    Bounded set of per-session mailboxes feeding a configurable pool of workers.
+
+    ``submit`` never blocks: when the total number of pending messages reaches
+    the capacity the job is rejected and counted as dropped, which keeps
+    webhook acknowledgement constant-time no matter how busy the workers are.
+
+    The ready queue holds session keys, not messages. A key is either on the
+    ready queue or owned by exactly one worker whenever its mailbox is
+    non-empty, which is what serialises processing per session.
+    """
+
+    def __init__(
+        self,
+        process_job: Callable[[str, str, Dict[str, Any]], Awaitable[None]],
+        num_workers: int = 16,
+        max_queue_size: int = 1000,
+        drain_timeout: float = 30.0,
+    ):
+        self.process_job = process_job
+        self.num_workers = max(1, num_workers)
+        self.max_queue_size = max_queue_size
+        self.drain_timeout = drain_timeout
+
+        self._ready: Optional[asyncio.Queue] = None
+        self._mailboxes: Dict[str, deque] = {}
+        self._pending = 0
+        self._workers: List[asyncio.Task] = []
+        self._accepting = False
+
+        # Backpressure metrics
+        self._enqueued = 0
+        self._processed = 0
+        self._failed = 0
+        self._dropped = 0
+        self._in_flight = 0
+        self._max_depth = 0
+        self._max_mailbox_depth = 0
+        self._total_wait = 0.0
+        self._total_processing = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self):
+        """
+        Start the worker pool. Safe to call more than once.
+        """
+        if self.is_running:
+            return
+        self._ready = asyncio.Queue()
+        # Reschedule sessions left over from a previous run that did not fully drain
+        for key in self._mailboxes:
+            self._ready.put_nowait(key)
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"whatsapp-worker-{i}")
+            for i in range(self.num_workers)
+        ]
+        self._accepting = True
+        logger.info(f"WhatsApp dispatcher started with {self.num_workers} workers (queue size {self.max_queue_size})")
+
+    def submit(self, message: str, user_phone: str, metadata: Dict[str, Any], session_key: Optional[str] = None) -> bool:
+        """
+        Enqueue a message for background processing without blocking.
+
+        Messages sharing a ``session_key`` (defaults to the phone number) are
+        processed one at a time, in the order they were submitted.
+
+        Returns False if the dispatcher is not accepting work or the queue is full.
+        """
+        if not self._accepting or self._ready is None:
+            logger.warning(f"Dispatcher not accepting messages; dropping message from {user_phone}")
+            self._dropped += 1
+            return False
+
+        if self._pending >= self.max_queue_size:
+            self._dropped += 1
+            logger.warning(f"Dispatch queue full ({self.max_queue_size}); dropping message from {user_phone}")
+            return False
+
+        key = session_key or user_phone
+        job = DispatchJob(message, user_phone, key, metadata)
+        mailbox = self._mailboxes.get(key)
+        if mailbox is None:
+            # Idle session: create its mailbox and make it available to a worker
+            self._mailboxes[key] = deque([job])
+            self._ready.put_nowait(key)
+        else:
+            # Session already queued or being processed; its worker picks this up next
+            mailbox.append(job)
+            self._max_mailbox_depth = max(self._max_mailbox_depth, len(mailbox))
+
+        self._pending += 1
+        self._enqueued += 1
+        self._max_depth = max(self._max_depth, self._pending)
+        return True
+
+    async def _worker(self, worker_id: int):
+        """
+        Take ownership of ready sessions and process their next message until cancelled.
+        """
+        while True:
+            key = await self._ready.get()
+            mailbox = self._mailboxes[key]
+            job = mailbox.popleft()
+            self._pending -= 1
+            started = time.monotonic()
+            self._total_wait += started - job.enqueued_at
+            self._in_flight += 1
+            try:
+                await self.process_job(job.message, job.user_phone, job.metadata)
+                self._processed += 1
+            except Exception as e:
+                self._failed += 1
+                logger.error(f"Worker {worker_id} failed to process message from {job.user_phone}: {str(e)}")
+            finally:
+                self._in_flight -= 1
+                self._total_processing += time.monotonic() - started
+                if mailbox:
+                    # Requeue behind other sessions so one chatty user cannot starve the rest
+                    self._ready.put_nowait(key)
+                else:
+                    del self._mailboxes[key]
+                self._ready.task_done()
+
+    async def stop(self, drain: bool = True):
+        """
+        Stop accepting new messages, optionally wait for queued ones to finish,
+        then cancel the workers.
+        """
+        if not self.is_running:
+            return
+        self._accepting = False
+
+        if drain:
+            pending = self._pending + self._in_flight
+            logger.info(f"Draining WhatsApp dispatcher: {pending} message(s) pending")
+            try:
+                await asyncio.wait_for(self._ready.join(), timeout=self.drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Drain timed out after {self.drain_timeout}s with {self._pending} message(s) still queued")
+
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("WhatsApp dispatcher stopped")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Return queue and worker statistics for health monitoring.
+        """
+        started = self._processed + self._failed
+        return {
+            "running": self.is_running,
+            "accepting": self._accepting,
+            "workers": len(self._workers),
+            "queue_depth": self._pending,
+            "queue_capacity": self.max_queue_size,
+            "max_queue_depth": self._max_depth,
+            "sessions_queued": len(self._mailboxes),
+            "max_session_backlog": self._max_mailbox_depth,
+            "in_flight": self._in_flight,
+            "enqueued": self._enqueued,
+            "processed": self._processed,
+            "failed": self._failed,
+            "dropped": self._dropped,
+            "avg_queue_wait_ms": round(self._total_wait / max(started + self._in_flight, 1) * 1000, 2),
+            "avg_processing_ms": round(self._total_processing / max(started, 1) * 1000, 2),
+        }
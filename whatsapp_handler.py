@@ -14,9 +14,15 @@ from datetime import datetime
 import asyncio
 from fastapi import Request, Response
 import requests
-from agents.intelligent_orchestrator import orchestrate_chat
+from agents.intelligent_orchestrator import aorchestrate_chat
 from agents.fallback_system import get_fallback_response
-from app.session_manager import get_session_stats, cleanup_old_sessions
+from agents.rag_agent import rag_agent
+from agents.rec_retriever_agent import rec_retriever_agent
+from app.session_manager import get_session_stats, session_turn
+from app.conversation_summarizer import get_conversation_summarizer
+from app.config import WHATSAPP_WORKER_COUNT, WHATSAPP_QUEUE_MAXSIZE, WHATSAPP_DRAIN_TIMEOUT_SECONDS
+from utils.llm_services import run_sync
+from utils.whatsapp_dispatcher import WhatsAppDispatcher
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +39,28 @@ class WhatsAppMessageHandler:
         self.rate_limit_window = 60  # seconds
         self.rate_limit_max_messages = 10  # per window
         self.message_counts = {}  # Simple rate limiting storage
+        self.busy_message = "We're receiving a lot of messages right now. 🙏 Please try again in a minute."
+        self.dispatcher = WhatsAppDispatcher(
+            self._process_and_respond,
+            num_workers=WHATSAPP_WORKER_COUNT,
+            max_queue_size=WHATSAPP_QUEUE_MAXSIZE,
+            drain_timeout=WHATSAPP_DRAIN_TIMEOUT_SECONDS,
+        )
+        # Busy notices in flight; referenced so they are not garbage collected mid-send
+        self._notice_tasks = set()
+    
+    async def start(self):
+        """
+        Start the background worker pool.
+        """
+        await self.dispatcher.start()
+    
+    async def shutdown(self):
+        """
+        Gracefully drain queued messages and stop the worker pool.
+        """
+        await self.dispatcher.stop(drain=True)
+        await asyncio.gather(*self._notice_tasks, return_exceptions=True)
         
     def verify_webhook(self, request: Request) -> Response:
         """
@@ -214,22 +242,35 @@ class WhatsAppMessageHandler:
             logger.error(f"Error in rate limiting: {str(e)}")
             return True  # Allow on error
     
+    def get_session_id(self, user_phone: str) -> str:
+        """
+        Map a WhatsApp phone number to its orchestrator session ID.
+        """
+        return f"whatsapp_{user_phone}"
+    
     def handle_message(self, message: str, user_phone: str, metadata: Dict[str, Any]) -> str:
         """
         Process the message through the intelligent orchestrator with error handling.
         """
+        return run_sync(self.ahandle_message(message, user_phone, metadata))
+    
+    async def ahandle_message(self, message: str, user_phone: str, metadata: Dict[str, Any]) -> str:
+        """
+        Async variant of handle_message; awaits the orchestrator without blocking the event loop.
+        """
         try:
             logger.info(f"Processing message from {user_phone}: {message[:100]}...")
             
             # Use phone number as session ID (could be enhanced with user mapping)
-            session_id = f"whatsapp_{user_phone}"
+            session_id = self.get_session_id(user_phone)
             
-            # Process through orchestrator
-            response = orchestrate_chat(message, session_id)
-            
-            # Validate response
-            if not response:
-                response = get_fallback_response("general_error", session_id)
+            async with session_turn(session_id):
+                # Process through orchestrator
+                response = await aorchestrate_chat(message, session_id)
+                
+                # Validate response
+                if not response:
+                    response = get_fallback_response("general_error", session_id)
             
             # Ensure response fits WhatsApp limits
             if len(response) > self.max_message_length:
@@ -240,7 +281,8 @@ class WhatsAppMessageHandler:
             
         except Exception as e:
             logger.error(f"Error processing message from {user_phone}: {str(e)}")
-            return get_fallback_response("general_error", user_phone)
+            # No session here: the turn failed, possibly because the store is unreachable
+            return get_fallback_response("general_error")
     
     def _send_message(self, recipient_number: str, message_body: str):
         """
@@ -267,7 +309,7 @@ class WhatsAppMessageHandler:
         }
 
         try:
-            response = requests.post(url, headers=headers, json=payload)
+            response = requests.post(url, headers=headers, json=payload, timeout=15)
             response.raise_for_status()
             logger.info(f"Message sent successfully to {recipient_number}. Response: {response.json()}")
         except requests.exceptions.RequestException as e:
@@ -276,6 +318,12 @@ class WhatsAppMessageHandler:
                 logger.error(f"Response status code: {e.response.status_code}")
                 logger.error(f"Response content: {e.response.text}")
     
+    async def _asend_message(self, recipient_number: str, message_body: str):
+        """
+        Sends a WhatsApp message from a worker thread so the event loop is never blocked.
+        """
+        await asyncio.to_thread(self._send_message, recipient_number, message_body)
+    
     async def _process_and_respond(self, message: str, user_phone: str, metadata: Dict[str, Any]):
         """
         Handles the actual processing and sending of the response asynchronously.
@@ -283,19 +331,19 @@ class WhatsAppMessageHandler:
         # Rate limiting check
         if not self.check_rate_limit(user_phone):
             rate_limit_msg = "You're sending messages too quickly! 😅 Please wait a moment and try again."
-            self._send_message(user_phone, rate_limit_msg)
+            await self._asend_message(user_phone, rate_limit_msg)
             return
 
         # Process message
-        response = self.handle_message(message, user_phone, metadata)
+        response = await self.ahandle_message(message, user_phone, metadata)
         
         # Send response
-        self._send_message(user_phone, response)
+        await self._asend_message(user_phone, response)
 
     async def process_webhook(self, request: Request) -> Response:
         """
         Main webhook processing function. It acknowledges the request immediately
-        and then processes the message in the background.
+        and hands the message to the dispatcher queue for background processing.
         """
         try:
             data = await request.json()
@@ -305,7 +353,13 @@ class WhatsAppMessageHandler:
             
             if message and user_phone:
                 # Acknowledge immediately and process in the background
-                asyncio.create_task(self._process_and_respond(message, user_phone, metadata))
+                if not self.dispatcher.is_running:
+                    await self.dispatcher.start()
+                # Keyed by session so one user's messages are handled in arrival order
+                if not self.dispatcher.submit(message, user_phone, metadata, session_key=self.get_session_id(user_phone)):
+                    task = asyncio.create_task(self._asend_message(user_phone, self.busy_message))
+                    self._notice_tasks.add(task)
+                    task.add_done_callback(self._notice_tasks.discard)
             
             # Always return 200 to acknowledge receipt of the event
             return Response(status_code=200)
@@ -320,10 +374,7 @@ class WhatsAppMessageHandler:
         Get health status for monitoring.
         """
         try:
-            # Clean up old sessions periodically
-            cleanup_old_sessions(max_age_hours=24)
-            
-            # Get session statistics
+            # Get session statistics (idle sessions are expired in the background)
             session_stats = get_session_stats()
             
             # Get rate limiting stats
@@ -337,6 +388,10 @@ class WhatsAppMessageHandler:
                 "timestamp": datetime.now().isoformat(),
                 "sessions": session_stats,
                 "active_rate_limited_users": active_users,
+                "dispatcher": self.dispatcher.get_metrics(),
+                "rag_cache": rag_agent.get_cache_stats(),
+                "recommendation_cache": rec_retriever_agent.get_cache_stats(),
+                "conversation_summaries": get_conversation_summarizer().get_stats(),
                 "webhook_verification_token_configured": bool(self.verify_token)
             }
             